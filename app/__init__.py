@@ -155,6 +155,11 @@ def create_app(config_object='config.Config'):
     from app.upload import bp as upload_bp
     app.register_blueprint(upload_bp, url_prefix='/upload')
 
+    # Uploaded documents are hashed and spooled into the store while the
+    # request body is parsed (single pass, see app/upload/storage.py)
+    from app.upload.storage import UploadRequest
+    app.request_class = UploadRequest
+
     # Document viewing blueprint (search, preview, favorites)
     from app.view import bp as view_bp
     app.register_blueprint(view_bp, url_prefix='/view')
@@ -163,6 +168,54 @@ def create_app(config_object='config.Config'):
     from app.form import bp as form_bp
     app.register_blueprint(form_bp, url_prefix='/form')
 
+    # =============================================================================
+    # CLI COMMANDS
+    # =============================================================================
+
+    # Full-text search index maintenance (flask search-index rebuild)
+    from app.view.search_index import search_index_cli
+    app.cli.add_command(search_index_cli)
+
+    # Materialized facet counts maintenance (flask facets rebuild)
+    from app.view.facets import facets_cli
+    app.cli.add_command(facets_cli)
+
+    # Trending rollup maintenance (flask trending compact)
+    from app.view.trending import trending_cli
+    app.cli.add_command(trending_cli)
+
+    # Background job worker and queue inspection (flask jobs worker/status/retry)
+    from app.jobs import jobs_cli
+    app.cli.add_command(jobs_cli)
+
+    # Content-addressed document store (flask storage migrate)
+    from app.upload.storage import storage_cli
+    app.cli.add_command(storage_cli)
+
+    # Sharded counter maintenance (flask counters fold)
+    from app.counters import counters_cli
+    app.cli.add_command(counters_cli)
+
+    # Schema upgrades of existing databases (flask upgrade ratings)
+    from app.upgrade import upgrade_cli
+    app.cli.add_command(upgrade_cli)
+
+    # =============================================================================
+    # IN-MEMORY SEARCH STRUCTURES
+    # =============================================================================
+
+    # Prefix index behind the autocomplete API, built once at startup
+    from app.view.autocomplete import init_autocomplete
+    init_autocomplete(app)
+
+    # =============================================================================
+    # WRITE-BEHIND COUNTERS
+    # =============================================================================
+
+    # Download/view increments buffered per worker and flushed in batches
+    from app.counters import init_counters
+    init_counters(app)
+
     # =============================================================================
     # TEMPLATE CONTEXT PROCESSORS AND CUSTOM FILTERS
     # =============================================================================
@@ -43,6 +43,7 @@ from app.auth.form import (
     LoginForm, RegistrationForm, EditProfileForm, UpdateProfileForm
 )
 from app.models import User, Document
+from app.view.utils import load_listing, enforce_query_budget
 
 # ============================================================================
 # UTILITY FUNCTIONS
@@ -207,6 +208,7 @@ def register():
 
 @bp.route('/profile', methods=['GET', 'POST'])
 @login_required
+@enforce_query_budget
 def profile():
     """
     Display and manage user profile information and settings.
@@ -351,11 +353,11 @@ def profile():
         # Use default avatar from static assets
         image_file = url_for('static', filename='profile_pics/default_avatar.jpg')
     
-    # Load user's uploaded documents for display
-    user_uploads = current_user.documents.all()
+    # Load user's uploaded documents for display (with card relationships)
+    user_uploads = load_listing(current_user.documents).all()
 
-    # Load user's favorited documents for display
-    user_favorites = current_user.favorites.all()
+    # Load user's favorited documents for display (with card relationships)
+    user_favorites = load_listing(current_user.favorites).all()
 
     # Render profile template with all necessary data
     return render_template(
@@ -364,7 +366,8 @@ def profile():
         form=form,
         image_file=image_file,
         my_uploads=user_uploads,     # Pass uploaded documents
-        favorites=user_favorites     # Pass favorited documents
+        favorites=user_favorites,    # Pass favorited documents
+        favorite_ids={doc.id for doc in user_favorites}  # Ids for membership checks
     )
 
 # ============================================================================
@@ -0,0 +1,192 @@
+"""
+StudyHub In-Process Caching
+
+This module provides a small, thread-safe, process-local cache with
+least-recently-used (LRU) eviction and a time-to-live (TTL) per entry.
+It is used to avoid recomputing expensive but rarely changing query
+results on every request.
+
+Each worker process holds its own cache instance, so cached values must
+either be cheap to recompute or be keyed/invalidated in a way that is
+safe across workers (for example by including the catalog generation
+from CatalogState in the key).
+
+Classes:
+    - LRUCache: Bounded TTL cache with hit/miss counters
+
+Functions:
+    - get_cache: Named per-application cache instance
+    - cache_stats: Hit/miss statistics of every named cache in this worker
+
+Author: StudyHub Development Team
+License: MIT
+"""
+
+# =============================================================================
+# IMPORTS
+# =============================================================================
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+# =============================================================================
+# LRU CACHE WITH TTL
+# =============================================================================
+
+class LRUCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed TTL.
+
+    Attributes:
+        maxsize (int): Maximum number of entries kept
+        ttl (float): Seconds an entry stays valid
+        hits (int): Number of successful lookups
+        misses (int): Number of lookups that found no valid entry
+
+    Example:
+        >>> cache = LRUCache(maxsize=128, ttl=60)
+        >>> cache.set(('physics', 1), [3, 2, 1])
+        >>> cache.get(('physics', 1))
+        [3, 2, 1]
+    """
+
+    # Sentinel distinguishing "not cached" from cached None values
+    MISSING = object()
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for key, or default if missing/expired.
+
+        Args:
+            key: Hashable cache key
+            default: Value returned on a miss
+
+        Returns:
+            Cached value or default
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]  # Drop expired entry
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)  # Mark as most recently used
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """
+        Store a value, evicting the least recently used entry if full.
+
+        Args:
+            key: Hashable cache key
+            value: Value to cache
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Args:
+            key: Hashable cache key
+            compute (callable): Zero-argument function producing the value
+
+        Returns:
+            Cached or freshly computed value
+        """
+        value = self.get(key, self.MISSING)
+        if value is self.MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def delete(self, key):
+        """
+        Remove a single entry if present.
+
+        Args:
+            key: Hashable cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Get cache usage statistics for this worker process.
+
+        Returns:
+            dict: size, maxsize, ttl, hits, misses and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+# =============================================================================
+# NAMED APPLICATION CACHES
+# =============================================================================
+
+def get_cache(name, maxsize, ttl):
+    """
+    Get a named cache of the current application, creating it on first use.
+
+    Caches are stored in app.extensions['caches'] so every worker process
+    has its own instances and their statistics can be listed together.
+
+    Args:
+        name (str): Cache name (e.g. 'search')
+        maxsize (int): Maximum number of entries (used on creation)
+        ttl (float): Seconds an entry stays valid (used on creation)
+
+    Returns:
+        LRUCache: Cache instance for this name
+    """
+    caches = current_app.extensions.setdefault('caches', {})
+    cache = caches.get(name)
+    if cache is None:
+        cache = caches.setdefault(name, LRUCache(maxsize=maxsize, ttl=ttl))
+    return cache
+
+
+def cache_stats():
+    """
+    Get the statistics of every named cache of this worker process.
+
+    Returns:
+        dict: Cache name -> LRUCache.stats()
+    """
+    caches = current_app.extensions.get('caches', {})
+    return {name: cache.stats() for name, cache in sorted(caches.items())}
@@ -0,0 +1,603 @@
+"""
+StudyHub Write-Behind Usage Counters
+
+This module buffers document download and view increments in memory and
+writes them to the database in batches, instead of running an UPDATE
+and a commit on the document row for every request. Concurrent downloads
+of a popular document then no longer serialize on that row, and SQLite's
+write lock is taken once per batch rather than once per request.
+
+Downloads by logged-in users are also appended to their download history
+(user_downloads) in the same batches, with INSERT OR IGNORE so that only
+the first download of a document by a user is kept.
+
+Distinct viewers (users who previewed or downloaded a document) are
+counted with a HyperLogLog sketch per document: the buffer keeps one
+in-memory sketch per pending document and each flush merges it into the
+stored ViewerSketch blob.
+
+Flushing:
+    - Every COUNTER_FLUSH_INTERVAL_MS milliseconds (background thread)
+    - As soon as COUNTER_FLUSH_EVENTS increments are pending
+    - On interpreter shutdown (atexit)
+    - Each flush runs one executemany UPDATE of the documents table, one
+      executemany INSERT OR IGNORE into user_downloads, the viewer sketch
+      merges and the matching trending events, in a single transaction
+
+Loss window:
+    A crash that skips the atexit hook (e.g. SIGKILL) loses at most the
+    increments of the last COUNTER_FLUSH_INTERVAL_MS milliseconds, and
+    never more than COUNTER_FLUSH_EVENTS of them. Setting either value to
+    0 writes every increment through immediately (used by TestingConfig).
+
+Each worker process holds its own buffer, so displayed counters lag the
+true totals by at most one flush interval per worker.
+
+Sharding (COUNTER_SHARDS > 0):
+    Flushes add to one of N CounterShard rows per document, picked by a
+    hash of the worker (host and process id), instead of updating the
+    document row, so workers flushing at the same time do not contend for
+    one hot row. The fold job (`flask counters fold`, and every
+    COUNTER_FOLD_INTERVAL seconds in each worker) moves shard totals into
+    Document.downloads/views; exact reads use Document.total_downloads.
+    Row-level locking databases (PostgreSQL, MySQL) benefit; SQLite locks
+    the whole database per write transaction, so there sharding mostly
+    measures its own overhead (see benchmark_counters.py).
+
+Classes:
+    - CounterBuffer: Thread-safe per-document increment buffer
+
+Functions:
+    - init_counters: Attach a buffer to the application
+    - fold_counter_shards: Move shard totals into the document rows
+    - remove_counter_shards: Drop the shards and viewer sketch of a deleted document
+    - count_download / count_view: Buffer one download (and history row) or view
+    - flush_counters: Write pending increments now
+
+Author: StudyHub Development Team
+License: MIT
+"""
+
+# =============================================================================
+# IMPORTS
+# =============================================================================
+
+import atexit
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.hyperloglog import HyperLogLog
+
+# =============================================================================
+# COUNTER BUFFER
+# =============================================================================
+
+class CounterBuffer:
+    """
+    Aggregates per-document download/view increments between flushes.
+
+    Attributes:
+        app (Flask): Application whose database receives the increments
+        interval (float): Seconds between timed flushes (0 = write-through)
+        max_events (int): Pending increments that trigger a flush (0 = write-through)
+        fold_interval (float): Seconds between shard folds by the flush thread (0 = never)
+        flushes (int): Number of batches written by this worker
+        events (int): Number of increments recorded by this worker
+
+    Example:
+        >>> buffer = CounterBuffer(app, interval_ms=1000, max_events=200)
+        >>> buffer.add(42, downloads=1)
+        >>> buffer.flush()  # One UPDATE for every pending document
+    """
+
+    # Counter columns of the documents table and their trending event names
+    COLUMNS = {'downloads': 'download', 'views': 'view'}
+
+    def __init__(self, app, interval_ms, max_events, fold_interval=0):
+        self.app = app
+        self.interval = interval_ms / 1000.0
+        self.max_events = max_events
+        self.fold_interval = fold_interval
+        self.flushes = 0
+        self.events = 0
+        self._pending = {}             # document id -> {column: increment}
+        self._history = {}             # (user id, document id) -> first download time
+        self._sketches = {}            # document id -> HyperLogLog of new viewers
+        self._pending_events = 0
+        self._lock = threading.Lock()        # Guards the pending increments
+        self._flush_lock = threading.Lock()  # Serializes database writes
+        self._thread = None
+        self._pid = None
+        self._stopped = threading.Event()
+        self._last_fold = time.monotonic()
+
+    @property
+    def write_through(self):
+        """bool: True if increments are written immediately."""
+        return self.interval <= 0 or self.max_events <= 0
+
+    def add(self, document_id, downloads=0, views=0, user_id=None):
+        """
+        Buffer increments for one document, flushing if the batch is full.
+
+        Args:
+            document_id (int): Id of the document
+            downloads (int): Downloads to add
+            views (int): Views to add
+            user_id (int): Viewing/downloading user, added to the document's
+                           viewer sketch and (for downloads) their history
+        """
+        with self._lock:
+            counts = self._pending.setdefault(document_id, dict.fromkeys(self.COLUMNS, 0))
+            counts['downloads'] += downloads
+            counts['views'] += views
+            if user_id is not None:
+                self._sketches.setdefault(document_id, HyperLogLog()).add(user_id)
+                if downloads:
+                    self._history.setdefault((user_id, document_id), datetime.utcnow())
+            self._pending_events += downloads + views
+            self.events += downloads + views
+            full = self.write_through or self._pending_events >= self.max_events
+
+        if full:
+            self.flush()
+        else:
+            self._ensure_thread()
+
+    def pending(self):
+        """
+        Get the number of increments not yet written.
+
+        Returns:
+            int: Pending increments in this worker
+        """
+        with self._lock:
+            return self._pending_events
+
+    def _take(self):
+        """Remove and return every pending increment, history row and sketch."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            history, self._history = self._history, {}
+            sketches, self._sketches = self._sketches, {}
+            self._pending_events = 0
+            return pending, history, sketches
+
+    def _restore(self, pending, history, sketches):
+        """Put increments back after a failed flush so they are retried."""
+        with self._lock:
+            for document_id, counts in pending.items():
+                merged = self._pending.setdefault(document_id, dict.fromkeys(self.COLUMNS, 0))
+                for column, value in counts.items():
+                    merged[column] += value
+                    self._pending_events += value
+            for key, downloaded_at in history.items():
+                self._history.setdefault(key, downloaded_at)
+            for document_id, sketch in sketches.items():
+                self._sketches.setdefault(document_id, HyperLogLog()).merge(sketch)
+
+    def flush(self):
+        """
+        Write all pending increments in one transaction.
+
+        Runs in its own application context (and therefore its own
+        database session), so it is safe to call from a request without
+        committing the request's unfinished work.
+
+        Returns:
+            int: Number of documents updated
+        """
+        with self._flush_lock:
+            pending, history, sketches = self._take()
+            if not pending:
+                return 0
+            try:
+                with self.app.app_context():
+                    _write_counts(pending, history, sketches)
+            except Exception as e:
+                self._restore(pending, history, sketches)
+                self.app.logger.error(f'Counter flush failed, will retry: {e}')
+                return 0
+            self.flushes += 1
+            return len(pending)
+
+    # -------------------------------------------------------------------------
+    # Background flushing
+    # -------------------------------------------------------------------------
+
+    def _ensure_thread(self):
+        """Start the timed flush thread in this process if it is not running."""
+        # Threads do not survive fork(): pre-forking servers start one per worker
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='counter-flush', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Flush pending increments every interval until stopped."""
+        while not self._stopped.wait(self.interval):
+            self.flush()
+            if self.fold_interval and time.monotonic() - self._last_fold >= self.fold_interval:
+                self._last_fold = time.monotonic()
+                self.fold()
+
+    def fold(self):
+        """
+        Fold counter shards into the document rows (no-op without shards).
+
+        Returns:
+            int: Number of shard rows folded
+        """
+        if not self.app.config['COUNTER_SHARDS']:
+            return 0
+        with self._flush_lock:
+            try:
+                with self.app.app_context():
+                    return fold_counter_shards()
+            except Exception as e:
+                self.app.logger.error(f'Counter shard fold failed: {e}')
+                return 0
+
+    def close(self):
+        """Stop the flush thread and write what is still pending."""
+        self._stopped.set()
+        self.flush()
+
+
+def _insert_ignore(table):
+    """
+    Build an INSERT that skips rows whose primary key already exists.
+
+    Args:
+        table (Table): Target table
+
+    Returns:
+        Insert: INSERT OR IGNORE on SQLite, ON CONFLICT DO NOTHING on PostgreSQL
+    """
+    from app import db
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing()
+    if dialect == 'mysql':
+        return db.insert(table).prefix_with('IGNORE')
+    return db.insert(table).prefix_with('OR IGNORE')
+
+
+def _worker_shard(shards):
+    """
+    Pick the counter shard of the current worker process.
+
+    Args:
+        shards (int): Number of shards per document
+
+    Returns:
+        int: Shard number in [0, shards)
+    """
+    worker = f'{socket.gethostname()}:{os.getpid()}'.encode()
+    return zlib.crc32(worker) % shards
+
+
+def _shard_upsert(table):
+    """
+    Build an INSERT that adds to the counters of an existing shard row.
+
+    Args:
+        table (Table): The counter_shard table
+
+    Returns:
+        Insert: INSERT ... ON CONFLICT DO UPDATE (ON DUPLICATE KEY UPDATE on MySQL)
+    """
+    from app import db
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update(
+            downloads=table.c.downloads + stmt.inserted.downloads,
+            views=table.c.views + stmt.inserted.views
+        )
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.document_id, table.c.shard],
+        set_={
+            'downloads': table.c.downloads + stmt.excluded.downloads,
+            'views': table.c.views + stmt.excluded.views,
+        }
+    )
+
+
+def _merge_sketches(sketches):
+    """
+    Merge in-memory viewer sketches into the stored ones.
+
+    The stored rows are locked (SELECT ... FOR UPDATE where supported)
+    so concurrent flushes by other workers cannot overwrite each other;
+    rows whose registers did not change are not written.
+
+    Args:
+        sketches (dict): Document id -> HyperLogLog of new viewers
+    """
+    from app import db
+    from app.models import ViewerSketch
+
+    stored = {
+        row.document_id: row for row in
+        ViewerSketch.query.filter(ViewerSketch.document_id.in_(list(sketches)))
+        .with_for_update()
+    }
+    for document_id, sketch in sketches.items():
+        row = stored.get(document_id)
+        if row is None:
+            db.session.add(ViewerSketch(document_id=document_id, registers=sketch.to_bytes()))
+            continue
+        merged = HyperLogLog.from_bytes(row.registers).merge(sketch).to_bytes()
+        if merged != row.registers:
+            row.registers = merged
+
+
+def _write_counts(pending, history, sketches):
+    """
+    Apply buffered increments to the database (inside an app context).
+
+    Args:
+        pending (dict): Document id -> {column: increment}
+        history (dict): (user id, document id) -> first download time
+        sketches (dict): Document id -> HyperLogLog of new viewers
+    """
+    from app import db
+    from app.models import Document, CounterShard, user_downloads
+    from app.view.trending import record_event
+
+    # Skip documents deleted since they were counted
+    existing = {
+        row.id for row in
+        db.session.query(Document.id).filter(Document.id.in_(list(pending)))
+    }
+
+    shards = current_app.config['COUNTER_SHARDS']
+    if shards:
+        # Add to this worker's shard row of each document
+        shard = _worker_shard(shards)
+        shard_rows = [
+            {'document_id': document_id, 'shard': shard,
+             'downloads': pending[document_id]['downloads'],
+             'views': pending[document_id]['views']}
+            for document_id in existing
+        ]
+        if shard_rows:
+            db.session.execute(_shard_upsert(CounterShard.__table__), shard_rows)
+    else:
+        table = Document.__table__
+        db.session.execute(
+            db.update(table)
+            .where(table.c.id == db.bindparam('b_id'))
+            .values(
+                downloads=table.c.downloads + db.bindparam('b_downloads'),
+                views=table.c.views + db.bindparam('b_views')
+            ),
+            [
+                {'b_id': document_id, 'b_downloads': counts['downloads'], 'b_views': counts['views']}
+                for document_id, counts in pending.items()
+            ]
+        )
+
+    # Download history: keep the first download of each document per user
+    history_rows = [
+        {'user_id': user_id, 'document_id': document_id, 'downloaded_at': downloaded_at}
+        for (user_id, document_id), downloaded_at in history.items()
+        if document_id in existing
+    ]
+    if history_rows:
+        db.session.execute(_insert_ignore(user_downloads), history_rows)
+
+    # Distinct viewers
+    live_sketches = {
+        document_id: sketch for document_id, sketch in sketches.items()
+        if document_id in existing
+    }
+    if live_sketches:
+        _merge_sketches(live_sketches)
+
+    # Trending events
+    for document_id in existing:
+        for column, event in CounterBuffer.COLUMNS.items():
+            if pending[document_id][column]:
+                record_event(document_id, event, count=pending[document_id][column])
+    db.session.commit()
+
+# =============================================================================
+# SHARD FOLDING
+# =============================================================================
+
+def fold_counter_shards():
+    """
+    Move the counts held in shard rows into Document.downloads/views.
+
+    Reads a snapshot of the shard rows, adds it to the documents and
+    subtracts the same amounts from the shards (rather than deleting
+    them), so increments written by other workers while folding are kept
+    for the next fold. Emptied shard rows are then deleted. Runs in one
+    transaction and commits.
+
+    Returns:
+        int: Number of shard rows folded
+    """
+    from app import db
+    from app.models import Document, CounterShard
+
+    rows = db.session.query(
+        CounterShard.document_id, CounterShard.shard,
+        CounterShard.downloads, CounterShard.views
+    ).filter(db.or_(CounterShard.downloads != 0, CounterShard.views != 0)).all()
+    if not rows:
+        return 0
+
+    # Per-document totals of the snapshot
+    totals = {}
+    for row in rows:
+        downloads, views = totals.get(row.document_id, (0, 0))
+        totals[row.document_id] = (downloads + row.downloads, views + row.views)
+
+    documents = Document.__table__
+    db.session.execute(
+        db.update(documents)
+        .where(documents.c.id == db.bindparam('b_id'))
+        .values(
+            downloads=documents.c.downloads + db.bindparam('b_downloads'),
+            views=documents.c.views + db.bindparam('b_views')
+        ),
+        [
+            {'b_id': document_id, 'b_downloads': downloads, 'b_views': views}
+            for document_id, (downloads, views) in totals.items()
+        ]
+    )
+
+    shards = CounterShard.__table__
+    db.session.execute(
+        db.update(shards)
+        .where(shards.c.document_id == db.bindparam('b_id'))
+        .where(shards.c.shard == db.bindparam('b_shard'))
+        .values(
+            downloads=shards.c.downloads - db.bindparam('b_downloads'),
+            views=shards.c.views - db.bindparam('b_views')
+        ),
+        [
+            {'b_id': row.document_id, 'b_shard': row.shard,
+             'b_downloads': row.downloads, 'b_views': row.views}
+            for row in rows
+        ]
+    )
+    db.session.execute(
+        db.delete(shards).where(shards.c.downloads == 0).where(shards.c.views == 0)
+    )
+    db.session.commit()
+    return len(rows)
+
+
+def remove_counter_shards(document_id):
+    """
+    Delete the counter shards and viewer sketch of a deleted document.
+
+    Runs in the current transaction; the caller commits.
+
+    Args:
+        document_id (int): Id of the document
+    """
+    from app import db
+    from app.models import CounterShard, ViewerSketch
+    db.session.execute(
+        db.delete(CounterShard).where(CounterShard.document_id == document_id)
+    )
+    db.session.execute(
+        db.delete(ViewerSketch).where(ViewerSketch.document_id == document_id)
+    )
+
+# =============================================================================
+# APPLICATION INTEGRATION
+# =============================================================================
+
+def init_counters(app):
+    """
+    Attach a counter buffer to the application and flush it on shutdown.
+
+    Args:
+        app (Flask): Application being created
+    """
+    buffer = CounterBuffer(
+        app,
+        interval_ms=app.config['COUNTER_FLUSH_INTERVAL_MS'],
+        max_events=app.config['COUNTER_FLUSH_EVENTS'],
+        fold_interval=app.config['COUNTER_FOLD_INTERVAL']
+    )
+    app.extensions['counter_buffer'] = buffer
+    atexit.register(buffer.close)
+
+
+def _buffer():
+    """Get the counter buffer of the current application."""
+    return current_app.extensions['counter_buffer']
+
+
+def count_download(document_id, user_id=None):
+    """
+    Record one download of a document (written behind).
+
+    Args:
+        document_id (int): Id of the downloaded document
+        user_id (int): Downloading user, added to their download history
+    """
+    _buffer().add(document_id, downloads=1, user_id=user_id)
+
+
+def count_view(document_id, user_id=None):
+    """
+    Record one view of a document (written behind).
+
+    Args:
+        document_id (int): Id of the viewed document
+        user_id (int): Viewing user, added to the document's viewer sketch
+    """
+    _buffer().add(document_id, views=1, user_id=user_id)
+
+
+def flush_counters():
+    """
+    Write the pending increments of this worker now.
+
+    Returns:
+        int: Number of documents updated
+    """
+    return _buffer().flush()
+
+
+def counter_stats():
+    """
+    Get write-behind statistics of this worker process.
+
+    Returns:
+        dict: shards, pending, events, flushes, interval_ms and max_events
+    """
+    buffer = _buffer()
+    return {
+        'shards': current_app.config['COUNTER_SHARDS'],
+        'pending': buffer.pending(),
+        'events': buffer.events,
+        'flushes': buffer.flushes,
+        'interval_ms': int(buffer.interval * 1000),
+        'max_events': buffer.max_events,
+    }
+
+# =============================================================================
+# CLI COMMANDS
+# =============================================================================
+
+# Command group registered in the application factory:
+#   flask counters fold
+counters_cli = AppGroup('counters', help='Maintain download and view counters.')
+
+
+@counters_cli.command('fold')
+def fold_command():
+    """Fold sharded counter rows into the document counters."""
+    folded = fold_counter_shards()
+    click.echo(f'Folded {folded} counter shard rows.')
@@ -0,0 +1,666 @@
+"""
+StudyHub Background Jobs
+
+This module runs heavy post-upload work (page counting today; text
+extraction or thumbnails later) outside the request that uploaded the
+document. The upload only inserts Job rows in its own transaction and
+returns; a separate worker process executes them.
+
+Queue:
+    Jobs live in the job table of the application database, so they
+    survive restarts and are queued atomically with their document.
+    A worker claims a due job with a conditional UPDATE
+    (queued -> running), so several workers can share one queue.
+
+Worker (`flask jobs worker`):
+    - Runs handlers in a concurrent.futures.ProcessPoolExecutor of
+      JOBS_PROCESSES processes, so CPU-bound parsing of uploaded files
+      neither blocks the web workers nor holds the GIL
+    - Handlers get the file path and return plain data; only the worker's
+      main process touches the database
+    - A failed attempt is retried after JOBS_RETRY_BASE * 2^(attempt - 1)
+      seconds (capped at JOBS_RETRY_MAX), up to JOBS_MAX_ATTEMPTS attempts
+    - The worker renews the lease of its running jobs on every loop;
+      jobs left running by a worker that died are requeued once their
+      lease (JOBS_LEASE seconds) expires
+    - An attempt is only recorded by the worker that still owns the job,
+      so a run whose lease was lost cannot overwrite a newer run
+    - Every UPLOAD_GC_INTERVAL seconds the worker also removes abandoned
+      chunked uploads (see app.upload.storage.collect_stale_uploads)
+    - Finished jobs are kept for JOBS_KEEP_DONE seconds for inspection
+
+Handlers:
+    Registered with @job_handler('kind'); called as handler(path, payload)
+    in a pool process, without an application context. They return a
+    dict of Document attributes to set (e.g. {'page_count': 12}).
+
+Functions:
+    - enqueue_job / enqueue_document_jobs: Queue work (caller commits)
+    - remove_document_jobs: Drop the jobs of a deleted document
+    - run_worker: Claim and execute jobs until stopped
+    - jobs_cli: `flask jobs worker|status|retry`
+
+Author: StudyHub Development Team
+License: MIT
+"""
+
+# =============================================================================
+# IMPORTS
+# =============================================================================
+
+import os
+import re
+import socket
+import time
+import traceback
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+# =============================================================================
+# HANDLER REGISTRY
+# =============================================================================
+
+# Job kind -> handler(path, payload) -> dict of Document attributes
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """
+    Register a function as the handler of a job kind.
+
+    Handlers run in pool processes: they must be module-level functions
+    and must not use the database or the application context.
+
+    Args:
+        kind (str): Job kind (Job.kind)
+
+    Returns:
+        function: Decorator registering the handler
+
+    Example:
+        >>> @job_handler('page_count')
+        ... def count_pages(path, payload):
+        ...     return {'page_count': 12}
+    """
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def _execute(kind, path, payload):
+    """Run a handler (inside a pool process)."""
+    return JOB_HANDLERS[kind](path, payload)
+
+# =============================================================================
+# PAGE COUNTING
+# =============================================================================
+
+# Largest decompressed PDF object stream inspected (guards against zip bombs)
+MAX_INFLATED_STREAM = 16 * 1024 * 1024
+
+# PDF files are read PDF_READ_SIZE bytes at a time; objects larger than
+# MAX_PDF_OBJECT (images, fonts, never page tree nodes) are skipped, so
+# memory use does not grow with the file size
+PDF_READ_SIZE = 1024 * 1024
+MAX_PDF_OBJECT = 16 * 1024 * 1024
+
+PDF_OBJECT = re.compile(rb'\d+\s+\d+\s+obj\b(.*?)\bendobj', re.S)
+PDF_OBJECT_START = re.compile(rb'\d+\s+\d+\s+obj\b')
+PDF_OBJECT_END = b'endobj'
+PDF_STREAM = re.compile(rb'stream\r?\n(.*?)\r?\n?endstream', re.S)
+PDF_PAGES_NODE = re.compile(rb'/Type\s*/Pages\b')
+PDF_PAGE = re.compile(rb'/Type\s*/Page\b(?!s)')
+PDF_COUNT = re.compile(rb'/Count\s+(\d+)')
+PDF_FIRST = re.compile(rb'/First\s+(\d+)')
+
+
+def _read_pdf_objects(f):
+    """
+    Iterate over the top-level object bodies of a PDF file.
+
+    Reads the file in PDF_READ_SIZE chunks and keeps at most one
+    unfinished object in memory.
+
+    Args:
+        f: PDF file opened in binary mode
+
+    Yields:
+        bytes: Body of each object (dictionary and stream)
+    """
+    buffer = b''
+    unfinished = False  # buffer starts with an object whose end was not read yet
+    skipping = False    # Inside an object larger than MAX_PDF_OBJECT
+    for chunk in iter(lambda: f.read(PDF_READ_SIZE), b''):
+        tail = buffer[-len(PDF_OBJECT_END):]
+        buffer += chunk
+        if skipping:
+            end = buffer.find(PDF_OBJECT_END)
+            if end < 0:
+                buffer = buffer[-len(PDF_OBJECT_END):]
+                continue
+            buffer, skipping = buffer[end + len(PDF_OBJECT_END):], False
+        elif unfinished and PDF_OBJECT_END not in tail + chunk:
+            # Still inside the same object: no need to scan it again
+            if len(buffer) > MAX_PDF_OBJECT:
+                buffer, skipping, unfinished = b'', True, False
+            continue
+
+        position = 0
+        for match in PDF_OBJECT.finditer(buffer):
+            yield match.group(1)
+            position = match.end()
+        buffer = buffer[position:]
+
+        # Keep the unfinished object, or a header cut by the chunk boundary
+        start = PDF_OBJECT_START.search(buffer)
+        unfinished = start is not None
+        if start is None:
+            buffer = buffer[-64:]
+        elif len(buffer) - start.start() > MAX_PDF_OBJECT:
+            buffer, skipping, unfinished = b'', True, False
+        else:
+            buffer = buffer[start.start():]
+
+
+def _pdf_objects(f):
+    """
+    Iterate over the object bodies of a PDF file.
+
+    Includes the objects packed in compressed object streams (PDF 1.5+),
+    where the page tree of most current PDFs lives.
+
+    Args:
+        f: PDF file opened in binary mode
+
+    Yields:
+        bytes: Body of each object (dictionary and stream)
+    """
+    for body in _read_pdf_objects(f):
+        yield body
+        if b'/ObjStm' not in body:
+            continue
+        stream, first = PDF_STREAM.search(body), PDF_FIRST.search(body)
+        if stream is None or first is None:
+            continue
+        try:
+            inflated = zlib.decompressobj().decompress(stream.group(1), MAX_INFLATED_STREAM)
+        except zlib.error:
+            continue
+        # Header: pairs of (object number, offset from /First)
+        first = int(first.group(1))
+        offsets = [int(n) for n in inflated[:first].split()[1::2]]
+        for start, end in zip(offsets, offsets[1:] + [len(inflated) - first]):
+            yield inflated[first + start:first + end]
+
+
+def pdf_page_count(path):
+    """
+    Count the pages of a PDF file without a PDF library.
+
+    Reads the /Count of the page tree root (the largest count of any
+    /Pages node); falls back to counting /Page objects. The file is
+    scanned in bounded chunks, never loaded whole.
+
+    Args:
+        path (str): Path of the PDF file
+
+    Returns:
+        int: Number of pages, or None if no page tree was found
+    """
+    counts, pages = [], 0
+    with open(path, 'rb') as f:
+        for body in _pdf_objects(f):
+            if PDF_PAGES_NODE.search(body):
+                count = PDF_COUNT.search(body)
+                if count:
+                    counts.append(int(count.group(1)))
+            elif PDF_PAGE.search(body):
+                pages += 1
+    return max(counts) if counts else (pages or None)
+
+
+def ooxml_page_count(path, file_type):
+    """
+    Count the slides of a PPTX file or read the page count of a DOCX file.
+
+    Args:
+        path (str): Path of the file
+        file_type (str): 'pptx' or 'docx'
+
+    Returns:
+        int: Number of slides/pages, or None if unknown (DOCX files only
+             record it when saved by a word processor that paginates)
+    """
+    with zipfile.ZipFile(path) as archive:
+        if file_type == 'pptx':
+            slide = re.compile(r'ppt/slides/slide\d+\.xml$')
+            return sum(1 for name in archive.namelist() if slide.match(name)) or None
+        try:
+            properties = archive.read('docProps/app.xml')
+        except KeyError:
+            return None
+    match = re.search(rb'<Pages>(\d+)</Pages>', properties)
+    return int(match.group(1)) if match else None
+
+
+@job_handler('page_count')
+def count_pages(path, payload):
+    """
+    Job handler: store the number of pages (slides) of a document.
+
+    Args:
+        path (str): Path of the document's file
+        payload (dict): {'file_type': detected type}
+
+    Returns:
+        dict: {'page_count': n}, or {} for formats that are not supported
+    """
+    file_type = payload.get('file_type')
+    if file_type == 'pdf':
+        pages = pdf_page_count(path)
+    elif file_type in ('docx', 'pptx'):
+        pages = ooxml_page_count(path, file_type)
+    else:
+        return {}
+    return {'page_count': pages} if pages else {}
+
+# =============================================================================
+# QUEUEING
+# =============================================================================
+
+def enqueue_job(kind, document=None, max_attempts=None):
+    """
+    Queue a job in the current transaction (the caller commits).
+
+    Args:
+        kind (str): Registered job kind
+        document (Document): Document to process, if any
+        max_attempts (int): Attempts before the job fails (default JOBS_MAX_ATTEMPTS)
+
+    Returns:
+        Job: The new job
+
+    Raises:
+        ValueError: If no handler is registered for kind
+    """
+    from app import db
+    from app.models import Job
+
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind {kind!r}')
+    job = Job(
+        kind=kind,
+        document_id=document.id if document is not None else None,
+        max_attempts=max_attempts or current_app.config['JOBS_MAX_ATTEMPTS']
+    )
+    db.session.add(job)
+    return job
+
+
+def enqueue_document_jobs(doc):
+    """
+    Queue the JOBS_ON_UPLOAD jobs of a newly created document.
+
+    Args:
+        doc (Document): New document (flushed, so it has an id)
+    """
+    for kind in current_app.config['JOBS_ON_UPLOAD']:
+        enqueue_job(kind, doc)
+
+
+def remove_document_jobs(document_id):
+    """
+    Delete the jobs of a deleted document.
+
+    Runs in the current transaction; the caller commits. A job already
+    running finishes and then finds no document to update.
+
+    Args:
+        document_id (int): Id of the document
+    """
+    from app import db
+    from app.models import Job
+    db.session.execute(db.delete(Job).where(Job.document_id == document_id))
+
+# =============================================================================
+# WORKER
+# =============================================================================
+
+def _worker_id():
+    """Identify this worker process in Job.locked_by."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _retry_delay(attempts):
+    """
+    Get the backoff before the next attempt of a failed job.
+
+    Args:
+        attempts (int): Attempts made so far (>= 1)
+
+    Returns:
+        timedelta: JOBS_RETRY_BASE * 2^(attempts - 1), capped at JOBS_RETRY_MAX
+    """
+    config = current_app.config
+    return timedelta(seconds=min(config['JOBS_RETRY_MAX'], config['JOBS_RETRY_BASE'] * 2 ** (attempts - 1)))
+
+
+def _claim_jobs(limit, worker_id):
+    """
+    Claim up to limit due jobs for this worker.
+
+    Each job is claimed with a conditional UPDATE, so a job picked by two
+    workers at once runs only in the one whose update succeeds.
+
+    Args:
+        limit (int): Maximum number of jobs to claim
+        worker_id (str): This worker's id
+
+    Returns:
+        list: Claimed Job objects
+    """
+    from app import db
+    from app.models import Job
+
+    now = datetime.utcnow()
+    candidates = db.session.execute(
+        db.select(Job.id)
+        .where(Job.state == Job.QUEUED, Job.run_after <= now)
+        .order_by(Job.run_after, Job.id)
+        .limit(limit)
+    ).scalars().all()
+
+    claimed = []
+    for job_id in candidates:
+        updated = db.session.execute(
+            db.update(Job)
+            .where(Job.id == job_id, Job.state == Job.QUEUED)
+            .values(state=Job.RUNNING, locked_by=worker_id, locked_at=now,
+                    attempts=Job.attempts + 1)
+        ).rowcount
+        if updated:
+            claimed.append(job_id)
+    db.session.commit()
+    return [db.session.get(Job, job_id) for job_id in claimed]
+
+
+def _job_arguments(job):
+    """
+    Get the handler arguments of a job.
+
+    Args:
+        job (Job): Claimed job
+
+    Returns:
+        tuple: (path, payload), or None if its document no longer exists
+    """
+    from app import db
+    from app.models import Document
+    from app.view.file_serving import document_path
+
+    if job.document_id is None:
+        return None, {}
+    doc = db.session.get(Document, job.document_id)
+    if doc is None:
+        return None
+    return document_path(doc), {'file_type': doc.file_type}
+
+
+def _finish_job(job_id, worker_id, result=None, error=None):
+    """
+    Record the outcome of a job attempt.
+
+    On success the handler's result is applied to the document. On error
+    the job is requeued with backoff, or marked failed after its last
+    attempt. Nothing is recorded if the job is no longer running on this
+    worker (its lease expired and it was requeued or claimed elsewhere).
+
+    Args:
+        job_id (int): Id of the job
+        worker_id (str): This worker's id
+        result (dict): Document attributes returned by the handler
+        error (str): Error description if the attempt failed
+    """
+    from app import db
+    from app.models import Job, Document
+
+    job = db.session.get(Job, job_id)
+    if job is None or job.state != Job.RUNNING or job.locked_by != worker_id:
+        db.session.rollback()
+        return  # Deleted with its document, or no longer ours
+    now = datetime.utcnow()
+    if error is None:
+        outcome = dict(state=Job.DONE, finished_at=now, last_error=None)
+    elif job.attempts < job.max_attempts:
+        outcome = dict(state=Job.QUEUED, run_after=now + _retry_delay(job.attempts), last_error=error)
+    else:
+        outcome = dict(state=Job.FAILED, finished_at=now, last_error=error)
+
+    # Conditional on ownership, so a concurrent requeue wins over a stale run
+    owned = db.session.execute(
+        db.update(Job)
+        .where(Job.id == job_id, Job.state == Job.RUNNING, Job.locked_by == worker_id)
+        .values(locked_by=None, locked_at=None, **outcome)
+    ).rowcount
+    if owned and error is None and result and job.document_id:
+        db.session.execute(
+            db.update(Document).where(Document.id == job.document_id).values(**result)
+        )
+    db.session.commit()
+
+
+def _renew_leases(job_ids, worker_id):
+    """
+    Extend the lease of the jobs running on this worker.
+
+    Args:
+        job_ids (iterable): Ids of the running jobs
+        worker_id (str): This worker's id
+    """
+    from app import db
+    from app.models import Job
+
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+    db.session.execute(
+        db.update(Job)
+        .where(Job.id.in_(job_ids), Job.state == Job.RUNNING, Job.locked_by == worker_id)
+        .values(locked_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def _maintain_queue():
+    """
+    Requeue jobs of dead workers and delete old finished jobs.
+
+    Returns:
+        int: Number of requeued jobs
+    """
+    from app import db
+    from app.models import Job
+
+    config = current_app.config
+    now = datetime.utcnow()
+    requeued = db.session.execute(
+        db.update(Job)
+        .where(Job.state == Job.RUNNING,
+               Job.locked_at < now - timedelta(seconds=config['JOBS_LEASE']))
+        .values(state=Job.QUEUED, locked_by=None, locked_at=None, run_after=now,
+                last_error='Worker lease expired')
+    ).rowcount
+    db.session.execute(
+        db.delete(Job)
+        .where(Job.state == Job.DONE,
+               Job.finished_at < now - timedelta(seconds=config['JOBS_KEEP_DONE']))
+    )
+    db.session.commit()
+    return requeued
+
+
+def run_worker(processes=None, once=False):
+    """
+    Claim and execute queued jobs until interrupted.
+
+    Must run inside an application context (the CLI provides one).
+
+    Args:
+        processes (int): Pool size (default JOBS_PROCESSES)
+        once (bool): Stop as soon as no job is due (used for draining
+                     the queue from scripts and cron)
+
+    Returns:
+        int: Number of job attempts completed
+    """
+    from app import db
+
+    config = current_app.config
+    processes = processes or config['JOBS_PROCESSES']
+    worker_id = _worker_id()
+    executor = ProcessPoolExecutor(max_workers=processes)
+    running = {}  # Future -> job id
+    completed = 0
+    next_maintenance = 0.0
+    next_upload_gc = 0.0
+
+    try:
+        while True:
+            # Jobs still running are not requeued by _maintain_queue
+            _renew_leases(running.values(), worker_id)
+            if time.monotonic() >= next_maintenance:
+                _maintain_queue()
+                next_maintenance = time.monotonic() + config['JOBS_LEASE'] / 2
+
+            # Abandoned chunked uploads are collected here rather than in
+            # the upload requests
+            if config['UPLOAD_GC_INTERVAL'] and time.monotonic() >= next_upload_gc:
+                # Imported here: app.upload imports this module for enqueueing
+                from app.upload.storage import collect_stale_uploads
+                collect_stale_uploads()
+                next_upload_gc = time.monotonic() + config['UPLOAD_GC_INTERVAL']
+
+            # Keep every pool process busy
+            for job in _claim_jobs(processes - len(running), worker_id):
+                arguments = _job_arguments(job)
+                if arguments is None:
+                    _finish_job(job.id, worker_id)  # Document deleted: nothing to do
+                    completed += 1
+                    continue
+                path, payload = arguments
+                running[executor.submit(_execute, job.kind, path, payload)] = job.id
+            db.session.remove()  # Do not hold a transaction while waiting
+
+            if not running:
+                if once:
+                    break
+                time.sleep(config['JOBS_POLL_INTERVAL'])
+                continue
+
+            done, _ = wait(running, timeout=config['JOBS_POLL_INTERVAL'], return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                job_id = running.pop(future)
+                try:
+                    _finish_job(job_id, worker_id, result=future.result())
+                except BrokenProcessPool:
+                    broken = True
+                    _finish_job(job_id, worker_id, error='Worker process died')
+                except Exception:
+                    _finish_job(job_id, worker_id, error=traceback.format_exc(limit=5))
+                completed += 1
+            if broken:
+                # A pool process crashed (e.g. out of memory); start a new pool
+                for future, job_id in running.items():
+                    _finish_job(job_id, worker_id, error='Worker process died')
+                    completed += 1
+                running.clear()
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=processes)
+    finally:
+        # Give unfinished jobs back to the queue without using an attempt
+        from app.models import Job
+        db.session.rollback()
+        if running:
+            db.session.execute(
+                db.update(Job)
+                .where(Job.id.in_(list(running.values())), Job.state == Job.RUNNING,
+                       Job.locked_by == worker_id)
+                .values(state=Job.QUEUED, locked_by=None, locked_at=None,
+                        attempts=Job.attempts - 1)
+            )
+            db.session.commit()
+        executor.shutdown(wait=False, cancel_futures=True)
+    return completed
+
+# =============================================================================
+# CLI COMMANDS
+# =============================================================================
+
+# Command group registered in the application factory:
+#   flask jobs worker / flask jobs status / flask jobs retry
+jobs_cli = AppGroup('jobs', help='Run and inspect background job workers.')
+
+
+@jobs_cli.command('worker')
+@click.option('--processes', type=int, default=None, help='Pool processes (default JOBS_PROCESSES).')
+@click.option('--once', is_flag=True, help='Exit when no job is due instead of polling.')
+def worker_command(processes, once):
+    """Run queued jobs in a process pool."""
+    click.echo(f'Job worker {_worker_id()} started.')
+    try:
+        completed = run_worker(processes, once=once)
+    except KeyboardInterrupt:
+        click.echo('Job worker stopped.')
+        return
+    click.echo(f'Completed {completed} job attempts.')
+
+
+@jobs_cli.command('status')
+@click.option('--failed', 'show_failed', is_flag=True, help='List failed jobs with their last error.')
+def status_command(show_failed):
+    """Show queue counts and the jobs running on each worker."""
+    from app import db
+    from app.models import Job
+
+    counts = dict(db.session.execute(
+        db.select(Job.state, db.func.count()).group_by(Job.state)
+    ).all())
+    click.echo('  '.join(f'{state}: {counts.get(state, 0)}'
+                         for state in (Job.QUEUED, Job.RUNNING, Job.DONE, Job.FAILED)))
+
+    running = Job.query.filter_by(state=Job.RUNNING).order_by(Job.locked_by, Job.locked_at)
+    for job in running:
+        click.echo(f'  {job.locked_by}: job {job.id} {job.kind} (document {job.document_id}, '
+                   f'attempt {job.attempts}, since {job.locked_at:%Y-%m-%d %H:%M:%S})')
+
+    if show_failed:
+        for job in Job.query.filter_by(state=Job.FAILED).order_by(Job.finished_at.desc()):
+            error = (job.last_error or '').strip().splitlines()
+            click.echo(f'  job {job.id} {job.kind} (document {job.document_id}): '
+                       f'{error[-1] if error else "unknown error"}')
+
+
+@jobs_cli.command('retry')
+@click.argument('job_ids', nargs=-1, type=int)
+def retry_command(job_ids):
+    """Requeue failed jobs (all of them, or the given ids)."""
+    from app import db
+    from app.models import Job
+
+    query = db.update(Job).where(Job.state == Job.FAILED)
+    if job_ids:
+        query = query.where(Job.id.in_(job_ids))
+    requeued = db.session.execute(
+        query.values(state=Job.QUEUED, attempts=0, run_after=datetime.utcnow(), finished_at=None)
+    ).rowcount
+    db.session.commit()
+    click.echo(f'Requeued {requeued} failed jobs.')
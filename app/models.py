@@ -11,6 +11,14 @@ Database Schema Overview:
     - Category: Document categorization system
     - Tag: Flexible document labeling system
     - Question: Contact form submissions and support requests
+    - CatalogState: Catalog generation counter for cache invalidation
+    - FacetCount: Materialized per-facet document counts
+    - TrendingScore / TrendingState: Time-decayed trending rollup
+    - CounterShard: Unfolded download/view increments of sharded counters
+    - ViewerSketch: HyperLogLog sketch of a document's distinct viewers
+    - StoredBlob: Reference-counted content-addressed file of the upload store
+    - UploadSession: Resumable chunked upload in progress
+    - Job: Persistent queue of background post-upload processing
 
 Key Relationships:
     - One-to-Many: User → Documents (users can upload multiple documents)
@@ -65,10 +73,15 @@ user_favorites = db.Table(
 # Tracks download history for analytics and user activity
 # Many-to-many: users can download multiple documents,
 # documents can be downloaded by multiple users
+# Append-only: one row per user and document, stamped with the first
+# download (written in batches by app.counters)
 user_downloads = db.Table(
     'user_downloads',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('document_id', db.Integer, db.ForeignKey('document.id'), primary_key=True)
+    db.Column('document_id', db.Integer, db.ForeignKey('document.id'), primary_key=True),
+    db.Column('downloaded_at', db.DateTime, nullable=False, default=datetime.utcnow),
+    # Per-user history, newest first, with keyset pagination
+    db.Index('ix_user_downloads_user_date', 'user_id', 'downloaded_at', 'document_id')
 )
 
 # =============================================================================
@@ -260,6 +273,74 @@ class User(UserMixin, db.Model):
         """
         return self.favorites.filter_by(id=document.id).first() is not None
     
+    def add_favorite(self, document_id):
+        """
+        Add a document to user's favorites (idempotent).
+
+        Works directly on the user_favorites association table: one
+        primary key lookup, plus an INSERT only if the pair is missing.
+        The caller is responsible for committing the session.
+
+        Args:
+            document_id (int): Id of the document to favorite
+
+        Returns:
+            bool: True if the favorite was added, False if it already existed
+        """
+        exists = db.session.query(user_favorites.c.document_id).filter(
+            user_favorites.c.user_id == self.id,
+            user_favorites.c.document_id == document_id
+        ).first() is not None
+        if exists:
+            return False
+        db.session.execute(
+            user_favorites.insert().values(user_id=self.id, document_id=document_id)
+        )
+        return True
+    
+    def remove_favorite(self, document_id):
+        """
+        Remove a document from user's favorites (idempotent).
+
+        Issues a single DELETE by primary key on user_favorites.
+        The caller is responsible for committing the session.
+
+        Args:
+            document_id (int): Id of the document to unfavorite
+
+        Returns:
+            bool: True if a favorite was removed, False if none existed
+        """
+        result = db.session.execute(
+            user_favorites.delete().where(
+                user_favorites.c.user_id == self.id,
+                user_favorites.c.document_id == document_id
+            )
+        )
+        return result.rowcount > 0
+    
+    def favorite_document_ids(self, document_ids=None):
+        """
+        Get the ids of documents in user's favorites.
+
+        Runs a single query against the user_favorites association table
+        (no Document rows are loaded), so templates can test membership
+        with `doc.id in favorite_ids` in constant time. When document_ids
+        is given, only those ids are checked with one indexed IN query.
+
+        Args:
+            document_ids (iterable): Optional ids to restrict the check to
+
+        Returns:
+            set: Ids of favorited documents
+        """
+        rows = db.session.query(user_favorites.c.document_id).filter(
+            user_favorites.c.user_id == self.id
+        )
+        if document_ids is not None:
+            rows = rows.filter(user_favorites.c.document_id.in_(list(document_ids)))
+        return {document_id for (document_id,) in rows}
+    
     def has_downloaded(self, document):
         """
         Check if user has downloaded a specific document.
@@ -409,10 +490,12 @@ class Tag(db.Model):
     
     # Many-to-Many: Tags can be applied to multiple documents,
     # documents can have multiple tags
+    # Document.tags is a plain list (lazy='select') so listings can
+    # eager-load it with selectinload instead of one query per document
     documents = db.relationship(
         'Document', 
         secondary=document_tags,
-        backref=db.backref('tags', lazy='dynamic'),
+        backref=db.backref('tags', lazy='select'),
         lazy='dynamic'
     )
     
@@ -491,6 +574,11 @@ class Document(db.Model):
     - User ownership tracking for access control
     """
     
+    # Bayesian rating prior: every document is scored as if it also had
+    # RATING_PRIOR_COUNT ratings of RATING_PRIOR_MEAN stars
+    RATING_PRIOR_MEAN = 3.0
+    RATING_PRIOR_COUNT = 5
+    
     # =========================================================================
     # CORE DOCUMENT INFORMATION
     # =========================================================================
@@ -503,7 +591,9 @@ class Document(db.Model):
     filename = db.Column(db.String(200), nullable=False)
     original_filename = db.Column(db.String(200), nullable=True)
     file_size = db.Column(db.Integer, nullable=True)  # Size in bytes
-    file_type = db.Column(db.String(10), nullable=True)  # Extension (pdf, jpg, etc.)
+    file_type = db.Column(db.String(10), nullable=True)  # Detected type (pdf, docx, etc.)
+    content_hash = db.Column(db.String(64), nullable=True)  # SHA-256 of the file (hex)
+    page_count = db.Column(db.Integer, nullable=True)  # Filled in by a background job
     
     # =========================================================================
     # ACADEMIC METADATA
@@ -535,6 +625,11 @@ class Document(db.Model):
     views = db.Column(db.Integer, default=0, nullable=False)
     rating = db.Column(db.Float, default=0.0, nullable=False)
     rating_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Precomputed rating aggregates, kept up to date by add_rating() so that
+    # rating filters and ordering run in SQL on indexes
+    rating_average = db.Column(db.Float, default=0.0, nullable=False, index=True)
+    rating_score = db.Column(db.Float, default=RATING_PRIOR_MEAN, nullable=False)  # Bayesian
     
     # Content flags and moderation
     is_public = db.Column(db.Boolean, default=True, nullable=False)
@@ -560,6 +655,13 @@ class Document(db.Model):
         index=True
     )
     
+    # Composite index backing keyset pagination of listings,
+    # which are ordered by (upload_date DESC, id DESC)
+    __table_args__ = (
+        db.Index('ix_document_upload_date_id', 'upload_date', 'id'),
+        db.Index('ix_document_rating_score_id', 'rating_score', 'id'),
+    )
+    
     # =========================================================================
     # COMPUTED PROPERTIES
     # =========================================================================
@@ -585,11 +687,13 @@ class Document(db.Model):
         if not self.file_size:
             return "Unknown size"
         
+        # Scale a copy: the stored size must not change
+        size = float(self.file_size)
         for unit in ['B', 'KB', 'MB', 'GB']:
-            if self.file_size < 1024.0:
-                return f"{self.file_size:.1f} {unit}"
-            self.file_size /= 1024.0
-        return f"{self.file_size:.1f} TB"
+            if size < 1024.0:
+                return f"{size:.1f} {unit}"
+            size /= 1024.0
+        return f"{size:.1f} TB"
     
     @property
     def category_name(self):
@@ -609,7 +713,7 @@ class Document(db.Model):
         Returns:
             list: List of tag names
         """
-        return [tag.name for tag in self.tags.all()]
+        return [tag.name for tag in self.tags]
     
     @property
     def average_rating(self):
@@ -619,9 +723,7 @@ class Document(db.Model):
         Returns:
             float: Average rating (0.0 if no ratings)
         """
-        if self.rating_count > 0:
-            return round(self.rating / self.rating_count, 1)
-        return 0.0
+        return round(self.rating_average or 0.0, 1)
     
     @property
     def is_recently_uploaded(self):
@@ -639,27 +741,140 @@ class Document(db.Model):
     # UTILITY METHODS
     # =========================================================================
     
-    def increment_downloads(self):
-        """Safely increment download counter."""
-        self.downloads += 1
-        db.session.commit()
+    @property
+    def total_downloads(self):
+        """int: Downloads including increments not yet folded from counter shards."""
+        return self.downloads + self._unfolded('downloads')
+
+    @property
+    def total_views(self):
+        """int: Views including increments not yet folded from counter shards."""
+        return self.views + self._unfolded('views')
+
+    @classmethod
+    def load_counter_totals(cls, documents):
+        """
+        Load the unfolded shard increments of several documents in one query.
+
+        Listings call this before reading total_downloads/total_views, so
+        that those do not cost one query per document (N+1).
+
+        Args:
+            documents (iterable): Documents of the listing
+
+        Returns:
+            list: The documents, with their shard sums attached
+        """
+        documents = list(documents)
+        pending = CounterShard.unfolded_totals(doc.id for doc in documents)
+        for doc in documents:
+            doc._shard_totals = pending.get(doc.id, {'downloads': 0, 'views': 0})
+        return documents
+
+    def _unfolded(self, column):
+        """
+        Sum a counter column over this document's shard rows.
+
+        Uses the sums loaded by load_counter_totals() when available.
+
+        Args:
+            column (str): 'downloads' or 'views'
+
+        Returns:
+            int: Increments waiting to be folded into the document row
+        """
+        totals = getattr(self, '_shard_totals', None)
+        if totals is not None:
+            return totals[column]
+        return db.session.query(
+            db.func.coalesce(db.func.sum(getattr(CounterShard, column)), 0)
+        ).filter(CounterShard.document_id == self.id).scalar()
+    
+    def increment_downloads(self, user=None):
+        """
+        Count a download (buffered; written in the next counter flush).
+        
+        Args:
+            user (User): Downloading user, added to their download history
+        """
+        from app.counters import count_download
+        count_download(self.id, user_id=user.id if user is not None else None)
     
-    def increment_views(self):
-        """Safely increment view counter."""
-        self.views += 1
-        db.session.commit()
+    def increment_views(self, user=None):
+        """
+        Count a view (buffered; written in the next counter flush).
+        
+        Args:
+            user (User): Viewing user, added to the distinct viewer estimate
+        """
+        from app.counters import count_view
+        count_view(self.id, user_id=user.id if user is not None else None)
     
     def add_rating(self, rating_value):
         """
         Add a new rating to the document.
         
+        Updates the rating totals, the average and the Bayesian score in a
+        single atomic UPDATE, so concurrent ratings are never lost and the
+        indexed aggregate columns always match the totals.
+        
+        The Bayesian score pulls documents with few ratings towards
+        RATING_PRIOR_MEAN, as if each had RATING_PRIOR_COUNT extra ratings
+        of that value, so one 5-star vote does not outrank fifty 4.8s.
+        
         Args:
             rating_value (float): Rating value (1.0 to 5.0)
         """
         if 1.0 <= rating_value <= 5.0:
-            self.rating += rating_value
-            self.rating_count += 1
+            cls = type(self)
+            new_total = cls.rating + rating_value
+            new_count = cls.rating_count + 1
+            db.session.execute(
+                db.update(cls)
+                .where(cls.id == self.id)
+                .values(
+                    rating=new_total,
+                    rating_count=new_count,
+                    rating_average=new_total / new_count,
+                    rating_score=(
+                        (self.RATING_PRIOR_MEAN * self.RATING_PRIOR_COUNT + new_total)
+                        / (self.RATING_PRIOR_COUNT + new_count)
+                    )
+                )
+            )
+            # Rating order and min_rating results changed
+            CatalogState.bump()
             db.session.commit()
+            db.session.refresh(self)
+    
+    @classmethod
+    def recompute_rating_aggregates(cls):
+        """
+        Recompute the average and Bayesian score of every document.
+
+        Derives both aggregate columns from the rating totals with the
+        same formulas as add_rating(), in a single UPDATE. Used to fill
+        the columns of documents rated before they existed; the caller
+        commits.
+
+        Returns:
+            int: Number of documents updated
+        """
+        updated = db.session.execute(
+            db.update(cls).values(
+                rating_average=db.case(
+                    (cls.rating_count > 0, cls.rating / cls.rating_count),
+                    else_=0.0
+                ),
+                rating_score=(
+                    (cls.RATING_PRIOR_MEAN * cls.RATING_PRIOR_COUNT + cls.rating)
+                    / (cls.RATING_PRIOR_COUNT + cls.rating_count)
+                )
+            )
+        ).rowcount
+        # Rating order and min_rating results changed
+        CatalogState.bump()
+        return updated
     
     def add_tag(self, tag_name):
         """
@@ -669,8 +884,9 @@ class Document(db.Model):
             tag_name (str): Name of the tag to add
         """
         tag = Tag.get_or_create(tag_name)
-        if tag not in self.tags.all():
+        if tag not in self.tags:
             self.tags.append(tag)
+            self._metadata_changed(added_tags=[tag.name])
             tag.increment_usage()
             db.session.commit()
     
@@ -682,10 +898,27 @@ class Document(db.Model):
             tag_name (str): Name of the tag to remove
         """
         tag = Tag.query.filter_by(name=tag_name.lower()).first()
-        if tag and tag in self.tags.all():
+        if tag and tag in self.tags:
             self.tags.remove(tag)
+            self._metadata_changed(removed_tags=[tag.name])
             db.session.commit()
     
+    def _metadata_changed(self, added_tags=(), removed_tags=()):
+        """
+        Propagate a change of searchable metadata in the current transaction.
+
+        Delegates to the catalog hooks, which refresh the search index,
+        facet counts and catalog generation (see app/view/catalog.py).
+
+        Args:
+            added_tags (iterable): Names of tags added to the document
+            removed_tags (iterable): Names of tags removed from the document
+        """
+        # Imported here to avoid a circular import (view modules import models)
+        from app.view.catalog import document_tags_changed
+        db.session.flush()
+        document_tags_changed(self, added=added_tags, removed=removed_tags)
+    
     def is_owned_by(self, user):
         """
         Check if document is owned by specific user.
@@ -703,6 +936,398 @@ class Document(db.Model):
         return f'<Document {self.title} by {self.author_name}>'
 
 
+# =============================================================================
+# CATALOG STATE
+# =============================================================================
+
+class CatalogState(db.Model):
+    """
+    Single-row table holding the catalog generation counter.
+
+    The generation is incremented in the same transaction as every change
+    that can alter search results (document upload, deletion, metadata
+    edits). Caches include the generation in their keys, so results
+    computed for an older catalog are never served again, across all
+    worker processes sharing the database.
+    """
+
+    # Fixed primary key of the single state row
+    SINGLETON_ID = 1
+
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, default=0, nullable=False)
+
+    @classmethod
+    def current_generation(cls):
+        """
+        Read the current catalog generation.
+
+        Returns:
+            int: Current generation (0 if the catalog was never modified)
+        """
+        generation = db.session.query(cls.generation).filter_by(
+            id=cls.SINGLETON_ID
+        ).scalar()
+        return generation or 0
+
+    @classmethod
+    def bump(cls):
+        """
+        Increment the catalog generation.
+
+        Runs in the current transaction; the caller commits. Uses an
+        atomic UPDATE so concurrent bumps are never lost, creating the
+        state row on first use.
+        """
+        updated = db.session.execute(
+            db.update(cls)
+            .where(cls.id == cls.SINGLETON_ID)
+            .values(generation=cls.generation + 1)
+        ).rowcount
+        if not updated:
+            db.session.add(cls(id=cls.SINGLETON_ID, generation=1))
+
+    def __repr__(self):
+        """String representation for debugging."""
+        return f'<CatalogState generation={self.generation}>'
+
+
+class FacetCount(db.Model):
+    """
+    Materialized document counts per facet value for the whole catalog.
+
+    Stores how many documents have each institute, course, subject,
+    category and tag value. Rows are adjusted incrementally (+1/-1) in the
+    same transaction as uploads, deletions and tag edits, so the search
+    page can show unfiltered facet counts with a single indexed read
+    instead of aggregating the document table.
+
+    Facets:
+        institute, course, subject: value is the document field
+        category: value is the category id (as string)
+        tag: value is the tag name
+    """
+
+    facet = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Top-N values per facet are read ordered by count
+    __table_args__ = (
+        db.Index('ix_facet_count_facet_count', 'facet', 'count'),
+    )
+
+    def __repr__(self):
+        """String representation for debugging."""
+        return f'<FacetCount {self.facet}={self.value}: {self.count}>'
+
+
+# =============================================================================
+# TRENDING MODELS
+# =============================================================================
+
+class TrendingScore(db.Model):
+    """
+    Time-decayed popularity score of a document (trending rollup).
+
+    Scores use forward decay: an event at time t adds
+    weight * exp(decay_rate * (t - epoch)) instead of decaying every row
+    over time. All rows share the epoch stored in TrendingState, so the
+    stored scores are proportional to the decayed scores and the top N
+    trending documents are a single read of the score index.
+
+    Only documents with recent activity have a row; compaction removes
+    rows whose decayed score became negligible (see app/view/trending.py).
+    """
+
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True)
+    score = db.Column(db.Float, default=0.0, nullable=False, index=True)
+
+    def __repr__(self):
+        """String representation for debugging."""
+        return f'<TrendingScore document={self.document_id} score={self.score}>'
+
+
+class TrendingState(db.Model):
+    """
+    Single-row table holding the reference time of the trending scores.
+
+    Compaction moves the epoch forward and rescales all scores, which
+    keeps the exponential weights of new events within float range.
+    """
+
+    # Fixed primary key of the single state row
+    SINGLETON_ID = 1
+
+    id = db.Column(db.Integer, primary_key=True)
+    epoch = db.Column(db.Float, nullable=False)  # Unix timestamp
+
+    @classmethod
+    def current_epoch(cls, default):
+        """
+        Read the score epoch, creating the state row on first use.
+
+        Args:
+            default (float): Epoch to store if none exists yet
+
+        Returns:
+            float: Unix timestamp the stored scores are relative to
+        """
+        state = db.session.get(cls, cls.SINGLETON_ID)
+        if state is None:
+            state = cls(id=cls.SINGLETON_ID, epoch=default)
+            db.session.add(state)
+            db.session.flush()
+        return state.epoch
+
+    def __repr__(self):
+        """String representation for debugging."""
+        return f'<TrendingState epoch={self.epoch}>'
+
+
+# =============================================================================
+# COUNTER MODELS
+# =============================================================================
+
+class CounterShard(db.Model):
+    """
+    One shard of a document's download and view counters.
+
+    With COUNTER_SHARDS > 0, counter flushes add to one of N shard rows
+    per document (chosen by worker) instead of the document row, so
+    concurrent workers do not contend for the same row. The fold job
+    (`flask counters fold`) moves the shard totals into Document.downloads
+    and Document.views; until then exact totals are the document value
+    plus the sum of its shards (see Document.total_downloads).
+    """
+
+    __tablename__ = 'counter_shard'
+
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True)
+    shard = db.Column(db.Integer, primary_key=True)
+    downloads = db.Column(db.Integer, default=0, nullable=False)
+    views = db.Column(db.Integer, default=0, nullable=False)
+
+    @classmethod
+    def unfolded_totals(cls, document_ids):
+        """
+        Sum the shards of several documents in one grouped query.
+
+        Args:
+            document_ids (iterable): Ids of the documents
+
+        Returns:
+            dict: Document id -> {'downloads': n, 'views': n}, for the
+                  documents that have shard rows
+        """
+        document_ids = list(document_ids)
+        if not document_ids:
+            return {}
+        rows = (
+            db.session.query(
+                cls.document_id,
+                db.func.sum(cls.downloads),
+                db.func.sum(cls.views)
+            )
+            .filter(cls.document_id.in_(document_ids))
+            .group_by(cls.document_id)
+        )
+        return {
+            document_id: {'downloads': downloads, 'views': views}
+            for document_id, downloads, views in rows
+        }
+
+    def __repr__(self):
+        """String representation for debugging."""
+        return f'<CounterShard document={self.document_id} shard={self.shard}>'
+
+
+class ViewerSketch(db.Model):
+    """
+    HyperLogLog sketch of the distinct users who viewed or downloaded a document.
+
+    A fixed-size blob (see app/hyperloglog.py) instead of one row per
+    (user, document) pair; reloads and repeated downloads by the same
+    user do not change it. Kept out of the document table so listing
+    queries do not load it. Written by the counter buffer (app/counters.py).
+    """
+
+    __tablename__ = 'viewer_sketch'
+
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), primary_key=True)
+    registers = db.Column(db.LargeBinary, nullable=False)
+
+    @classmethod
+    def unique_viewers(cls, document_ids):
+        """
+        Estimate the distinct viewers of several documents in one query.
+
+        Args:
+            document_ids (iterable): Ids of the documents
+
+        Returns:
+            dict: Document id -> estimated distinct viewers (0 if never viewed)
+        """
+        from app.hyperloglog import HyperLogLog
+        document_ids = list(document_ids)
+        estimates = dict.fromkeys(document_ids, 0)
+        if document_ids:
+            rows = db.session.query(cls.document_id, cls.registers).filter(
+                cls.document_id.in_(document_ids)
+            )
+            for document_id, registers in rows:
+                estimates[document_id] = HyperLogLog.from_bytes(registers).estimate()
+        return estimates
+
+    def __repr__(self):
+        """String representation for debugging."""
+        return f'<ViewerSketch document={self.document_id}>'
+
+
+# =============================================================================
+# FILE STORAGE MODELS
+# =============================================================================
+
+class StoredBlob(db.Model):
+    """
+    A file of the content-addressed upload store.
+
+    Uploaded files are stored once per distinct content, named by their
+    SHA-256 hash (see app/upload/storage.py); documents point at the blob
+    through Document.filename. refcount is the number of documents using
+    the blob; the file is unlinked when the last one is deleted.
+    """
+
+    __tablename__ = 'stored_blob'
+
+    hash = db.Column(db.String(64), primary_key=True)  # SHA-256 (hex)
+    size = db.Column(db.Integer, nullable=False)        # Bytes
+    refcount = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        """String representation for debugging."""
+        return f'<StoredBlob {self.hash[:12]} refs={self.refcount}>'
+
+
+class UploadSession(db.Model):
+    """
+    A resumable chunked upload in progress.
+
+    The client declares the file up front and sends it in chunks; the
+    bytes received so far are kept in a partial file of the store's tmp
+    directory (see app/upload/chunked.py). received is the offset the
+    next chunk must start at, so an interrupted upload resumes there.
+    Sessions not updated for UPLOAD_SESSION_TTL seconds are garbage
+    collected together with their partial file.
+    """
+
+    __tablename__ = 'upload_session'
+
+    id = db.Column(db.String(32), primary_key=True)  # Random token (hex)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    original_filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.Integer, nullable=False)            # Declared size (bytes)
+    received = db.Column(db.Integer, default=0, nullable=False)   # Bytes stored so far
+    content_hash = db.Column(db.String(64), nullable=True)        # Declared SHA-256, if any
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    @property
+    def is_complete(self):
+        """
+        Check whether every byte of the file has been received.
+
+        Returns:
+            bool: True once received equals the declared size
+        """
+        return self.received == self.total_size
+
+    def to_dict(self):
+        """
+        Get the session state sent to the client.
+
+        Returns:
+            dict: id, offset (next byte expected) and size
+        """
+        return {'id': self.id, 'offset': self.received, 'size': self.total_size}
+
+    def __repr__(self):
+        """String representation for debugging."""
+        return f'<UploadSession {self.id} {self.received}/{self.total_size}>'
+
+
+# =============================================================================
+# BACKGROUND JOB MODELS
+# =============================================================================
+
+class Job(db.Model):
+    """
+    A unit of background work, such as counting the pages of an upload.
+
+    Jobs are queued in the same transaction as the document they process
+    and run by `flask jobs worker` (see app/jobs.py). A job moves from
+    queued to running when a worker claims it, then to done, back to
+    queued with a later run_after (retry with backoff), or to failed
+    after max_attempts.
+    """
+
+    __tablename__ = 'job'
+    __table_args__ = (
+        # Claim query: next queued jobs that are due
+        db.Index('ix_job_state_run_after', 'state', 'run_after'),
+    )
+
+    # Job states
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # Handler name (e.g. page_count)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'), nullable=True, index=True)
+    state = db.Column(db.String(10), default=QUEUED, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Not before
+    locked_by = db.Column(db.String(100), nullable=True)  # Worker running the job
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    @classmethod
+    def document_states(cls, document_ids):
+        """
+        Summarize the unfinished or failed jobs of several documents in one query.
+
+        Args:
+            document_ids (iterable): Ids of the documents
+
+        Returns:
+            dict: Document id -> 'processing' (jobs queued or running) or
+                  'failed'; documents whose jobs are all done are omitted
+        """
+        document_ids = list(document_ids)
+        states = {}
+        if document_ids:
+            rows = db.session.query(cls.document_id, cls.state).filter(
+                cls.document_id.in_(document_ids),
+                cls.state != cls.DONE
+            )
+            for document_id, state in rows:
+                if state == cls.FAILED:
+                    states.setdefault(document_id, 'failed')
+                else:
+                    states[document_id] = 'processing'  # Still being retried
+        return states
+
+    def __repr__(self):
+        """String representation for debugging."""
+        return f'<Job {self.id} {self.kind} {self.state}>'
+
+
 # =============================================================================
 # SUPPORT AND COMMUNICATION MODELS  
 # =============================================================================
@@ -0,0 +1,169 @@
+"""
+app/upgrade.py - Schema Upgrades for Existing Databases
+
+The schema is created by db.create_all() (init_db.py), which creates
+missing tables but never alters existing ones. Databases created before
+a column or index was added to an existing table are brought up to date
+with the commands of this module, which also backfill the new columns.
+
+Every command first runs db.create_all() for tables that do not exist
+yet, is idempotent and can be re-run safely.
+
+Commands:
+- flask upgrade ratings: Add the rating aggregate columns of the document
+  table and recompute them from the rating totals
+- flask upgrade download-history: Add the download date column and the
+  per-user history index of the user_downloads table
+- flask upgrade file-metadata: Add the content hash and page count columns
+  of the document table; hashes are filled in by `flask storage migrate`
+  (or when a file is served) and page counts by queued jobs
+
+Functions:
+- add_column: Add a column of the model to an existing table
+- create_indexes: Create the missing indexes of a table
+"""
+
+# Import standard library modules
+from datetime import datetime
+
+# Import Flask CLI and SQLAlchemy helpers
+import click
+from flask.cli import AppGroup
+from sqlalchemy import inspect, literal
+from sqlalchemy.orm import load_only
+
+# Import application components
+from app import db
+from app.models import Document, Job, user_downloads
+from app.jobs import enqueue_job
+
+# ============================================================================
+# SCHEMA HELPERS
+# ============================================================================
+
+def add_column(table, name, default=None):
+    """
+    Add a column of the model to an existing table, if it is missing.
+
+    Existing rows get the default value, which also satisfies the
+    column's NOT NULL constraint (SQLite requires a constant default).
+    Nullable columns may be added without a default (NULL).
+
+    Args:
+        table (Table): Table of the model (e.g. Document.__table__)
+        name (str): Name of the column declared on the model
+        default: Constant value stored in the existing rows, or None
+
+    Returns:
+        bool: True if the column was added
+    """
+    existing = {column['name'] for column in inspect(db.engine).get_columns(table.name)}
+    if name in existing:
+        return False
+    dialect = db.engine.dialect
+    column = table.c[name]
+    column_type = column.type.compile(dialect=dialect)
+    null_sql = '' if column.nullable else ' NOT NULL'
+    default_sql = ''
+    if default is not None:
+        value = literal(default).compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+        default_sql = f' DEFAULT {value}'
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(
+            f'ALTER TABLE {table.name} ADD COLUMN {name} {column_type}{null_sql}{default_sql}'
+        )
+    return True
+
+
+def create_indexes(table):
+    """
+    Create the indexes declared on a table that do not exist yet.
+
+    Args:
+        table (Table): Table of the model
+
+    Returns:
+        int: Number of indexes created
+    """
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(table.name)}
+    created = 0
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(db.engine)
+            created += 1
+    return created
+
+# ============================================================================
+# CLI COMMANDS
+# ============================================================================
+
+# Command group registered in the application factory:
+#   flask upgrade ratings
+#   flask upgrade download-history
+#   flask upgrade file-metadata
+upgrade_cli = AppGroup('upgrade', help='Upgrade the schema of an existing database.')
+
+
+@upgrade_cli.command('ratings')
+def ratings_command():
+    """Add the rating aggregate columns and recompute them from the totals."""
+    db.create_all()
+    table = Document.__table__
+    added = [
+        name for name, default in (
+            ('rating_average', 0.0),
+            ('rating_score', Document.RATING_PRIOR_MEAN),
+        )
+        if add_column(table, name, default)
+    ]
+    indexes = create_indexes(table)
+    updated = Document.recompute_rating_aggregates()
+    db.session.commit()
+    if added:
+        click.echo(f'Added columns: {", ".join(added)}.')
+    click.echo(f'Created {indexes} indexes; recomputed the ratings of {updated} documents.')
+
+
+@upgrade_cli.command('download-history')
+def download_history_command():
+    """Add the download date column and history index of user_downloads."""
+    db.create_all()
+    # The real download dates of existing rows are unknown: they are stamped
+    # with the upgrade time (stored in the format of SQLAlchemy's DateTime)
+    upgraded_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    added = add_column(user_downloads, 'downloaded_at', upgraded_at)
+    indexes = create_indexes(user_downloads)
+    if added:
+        click.echo(f'Added column downloaded_at (existing downloads dated {upgraded_at}).')
+    click.echo(f'Created {indexes} indexes.')
+
+
+@upgrade_cli.command('file-metadata')
+def file_metadata_command():
+    """Add the content hash and page count columns of the document table."""
+    db.create_all()
+    # Existing documents get their hash when `flask storage migrate` moves
+    # their file into the store, or when the file is first served
+    if add_column(Document.__table__, 'content_hash'):
+        click.echo('Added column content_hash; run `flask storage migrate` to fill it in.')
+    if add_column(Document.__table__, 'page_count'):
+        click.echo('Added column page_count.')
+
+    # Page counts are computed by the job worker (flask jobs worker); queue
+    # them for documents that have none and no page_count job yet
+    has_job = (
+        db.select(Job.id)
+        .where(Job.document_id == Document.id, Job.kind == 'page_count')
+        .exists()
+    )
+    # Only the ids are loaded: columns added by the other upgrade commands
+    # may still be missing
+    documents = (
+        Document.query.options(load_only(Document.id))
+        .filter(Document.page_count.is_(None), ~has_job)
+        .all()
+    )
+    for doc in documents:
+        enqueue_job('page_count', doc)
+    db.session.commit()
+    click.echo(f'Queued page counting of {len(documents)} documents.')
@@ -7,6 +7,7 @@ The upload blueprint handles:
 - Document metadata collection and validation
 - File processing and storage
 - Upload form handling and validation
+- Resumable chunked uploads of large documents
 
 Blueprint pattern allows modular organization of upload-related routes.
 """
@@ -19,4 +20,4 @@ bp = Blueprint('upload', __name__)
 
 # Import route handlers and utilities after blueprint creation
 # This prevents circular import issues
-from app.upload import upload, utils
+from app.upload import upload, chunked, utils
@@ -0,0 +1,355 @@
+"""
+app/upload/chunked.py - Resumable Chunked Upload Routes
+
+This module lets large documents be uploaded in small pieces, so that a
+single request never exceeds MAX_CONTENT_LENGTH and an interrupted
+upload resumes where it stopped instead of starting over.
+
+Protocol (JSON responses, all routes require login):
+1. POST   /upload/sessions                  {"filename", "size", "sha256"?}
+   → 201 {"id", "offset": 0, "size", "chunk_size"}
+2. PUT    /upload/sessions/<id>?offset=N     raw chunk bytes
+   Header X-Chunk-SHA256: hex digest of the chunk
+   → 200 {"offset": N + len(chunk)}; 409 with the expected offset if N
+     is not where the upload stands; 422 if the checksum does not match
+3. GET    /upload/sessions/<id>              → {"offset", "size"} to resume
+4. POST   /upload/sessions/<id>/finalize     document metadata (form fields)
+   → 201 {"document_id"}; the file moves into the content-addressed store
+5. DELETE /upload/sessions/<id>              cancels the upload
+
+Received bytes are kept in a partial file of the store's tmp directory
+and tracked by an UploadSession row. A chunk is first received and
+verified in its own temporary file; it is copied into the partial file
+only after its offset has been claimed, so a retried chunk racing the
+original never overwrites bytes of the next one. The partial file is
+kept until the document commits, so a failed finalize can be retried.
+Sessions idle for longer than UPLOAD_SESSION_TTL are garbage collected
+by the job worker (every UPLOAD_GC_INTERVAL seconds) and by
+`flask storage gc`, never inside an upload request.
+"""
+
+# Import standard library modules
+import os
+import secrets
+import shutil
+from datetime import datetime
+
+# Import Flask components
+from flask import request, jsonify, url_for, current_app
+
+# Import Flask-Login for authentication
+from flask_login import login_required, current_user
+
+# Import application components
+from app import db
+from . import bp
+from app.models import UploadSession
+from app.upload.forms import DocumentDetailsForm
+from app.upload.upload import save_document
+from app.upload.utils import allowed_file, HASH_CHUNK_SIZE
+from app.upload.storage import (
+    UploadSpool, partial_path, store_file, discard_upload
+)
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _error(message, status):
+    """
+    Build a JSON error response.
+
+    Args:
+        message (str): User-facing error message
+        status (int): HTTP status code
+
+    Returns:
+        tuple: (Response, status)
+    """
+    return jsonify({'status': 'error', 'message': message}), status
+
+
+def _own_session(session_id):
+    """
+    Get an upload session of the current user.
+
+    Args:
+        session_id (str): UploadSession id from the URL
+
+    Returns:
+        UploadSession: The session, or None if it does not exist or
+                       belongs to another user
+    """
+    upload = db.session.get(UploadSession, session_id)
+    if upload is None or upload.user_id != current_user.id:
+        return None
+    return upload
+
+
+def _remove_session(session_id):
+    """
+    Delete an upload session row (in the current transaction).
+
+    Args:
+        session_id (str): UploadSession id
+
+    Returns:
+        bool: True if this call removed the row, False if a concurrent
+              request already had
+    """
+    return bool(db.session.execute(
+        db.delete(UploadSession).where(UploadSession.id == session_id)
+    ).rowcount)
+
+# ============================================================================
+# CHUNKED UPLOAD ROUTES
+# ============================================================================
+
+@bp.route('/sessions', methods=['POST'])
+@login_required
+def chunked_init():
+    """
+    Start a resumable upload.
+
+    Expects JSON with the file name, its total size in bytes and,
+    optionally, the SHA-256 of the whole file (checked on finalize).
+
+    Returns:
+        JSON response: Session state with the maximum chunk size (201),
+                       or an error (400 invalid, 413 file too large)
+    """
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename')
+    size = data.get('size')
+    content_hash = data.get('sha256')
+
+    if not isinstance(filename, str) or not allowed_file(filename):
+        return _error('Invalid file format. Allowed formats: PDF, DOC, DOCX, PPT, PPTX.', 400)
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        return _error('The file size must be a positive number of bytes.', 400)
+    if size > current_app.config['UPLOAD_MAX_FILE_SIZE']:
+        return _error('The file is too large.', 413)
+    if content_hash is not None:
+        if not isinstance(content_hash, str) or len(content_hash) != 64:
+            return _error('sha256 must be a hexadecimal SHA-256 digest.', 400)
+        content_hash = content_hash.lower()
+
+    upload = UploadSession(
+        id=secrets.token_hex(16),
+        user_id=current_user.id,
+        original_filename=filename[:255],
+        total_size=size,
+        content_hash=content_hash
+    )
+    db.session.add(upload)
+    db.session.commit()
+
+    # Create the (empty) partial file that the chunks are written into
+    path = partial_path(upload.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+    state = upload.to_dict()
+    state.update(status='success', chunk_size=current_app.config['UPLOAD_CHUNK_SIZE'])
+    return jsonify(state), 201
+
+
+@bp.route('/sessions/<session_id>', methods=['GET'])
+@login_required
+def chunked_status(session_id):
+    """
+    Report how much of an upload has been received, to resume it.
+
+    Args:
+        session_id (str): UploadSession id
+
+    Returns:
+        JSON response: Session state, or 404
+    """
+    upload = _own_session(session_id)
+    if upload is None:
+        return _error('Upload not found.', 404)
+    return jsonify(dict(upload.to_dict(), status='success'))
+
+
+@bp.route('/sessions/<session_id>', methods=['PUT'])
+@login_required
+def chunked_chunk(session_id):
+    """
+    Store one chunk of an upload.
+
+    The chunk is the raw request body, written at the offset given in
+    the query string. It must start exactly where the upload stands and
+    carry its SHA-256 in the X-Chunk-SHA256 header; a chunk that does
+    not match its checksum is discarded so it can simply be re-sent.
+    Verified chunks are copied into the partial file only after their
+    offset has been claimed.
+
+    Args:
+        session_id (str): UploadSession id
+
+    Returns:
+        JSON response: New offset (200), or an error (400 bad request,
+                       404 unknown session, 409 wrong offset, 411 no
+                       Content-Length, 413 chunk too large, 422 checksum
+                       mismatch)
+    """
+    upload = _own_session(session_id)
+    if upload is None:
+        return _error('Upload not found.', 404)
+
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return _error('The chunk offset is required.', 400)
+    if offset != upload.received:
+        response = jsonify(dict(upload.to_dict(), status='error', message='Unexpected chunk offset.'))
+        return response, 409
+
+    length = request.content_length
+    if length is None:
+        return _error('Content-Length is required.', 411)
+    if length == 0 or offset + length > upload.total_size:
+        return _error('The chunk does not fit in the declared file size.', 400)
+    if length > current_app.config['UPLOAD_CHUNK_SIZE']:
+        return _error('The chunk is too large.', 413)
+
+    expected = request.headers.get('X-Chunk-SHA256', '').lower()
+    if len(expected) != 64:
+        return _error('The X-Chunk-SHA256 header is required.', 400)
+
+    # Receive the chunk into its own temporary file, hashing it on the way
+    spool = UploadSpool.from_stream(request.stream)
+    try:
+        if spool.size != length or spool.hexdigest() != expected:
+            return _error('Chunk checksum mismatch; please send it again.', 422)
+
+        # Claim the offset. The conditional UPDATE locks the session row
+        # until the commit, so a concurrent request for the same offset
+        # waits and then finds it taken; only the winner writes.
+        claimed = db.session.execute(
+            db.update(UploadSession)
+            .where(UploadSession.id == session_id)
+            .where(UploadSession.received == offset)
+            .values(received=offset + length, updated_at=datetime.utcnow())
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            return _error('Unexpected chunk offset.', 409)
+
+        try:
+            with open(partial_path(session_id), 'r+b') as f:
+                f.seek(offset)
+                spool.seek(0)
+                shutil.copyfileobj(spool, f, HASH_CHUNK_SIZE)
+                f.truncate(offset + length)  # Drop bytes of an interrupted attempt
+        except FileNotFoundError:
+            db.session.rollback()
+            return _error('Upload not found.', 404)
+        except OSError:
+            db.session.rollback()
+            raise
+        db.session.commit()
+    finally:
+        spool.close()
+
+    return jsonify({'status': 'success', 'id': session_id,
+                    'offset': offset + length, 'size': upload.total_size})
+
+
+@bp.route('/sessions/<session_id>/finalize', methods=['POST'])
+@login_required
+def chunked_finalize(session_id):
+    """
+    Complete an upload and create its document.
+
+    Expects the DocumentDetailsForm fields (title, description, ...).
+    The assembled file is hashed, checked against the SHA-256 declared
+    on init (if any) and moved into the content-addressed store once the
+    document is committed. If saving the document fails, the session
+    and its partial file are kept and finalize can be retried.
+
+    Args:
+        session_id (str): UploadSession id
+
+    Returns:
+        JSON response: Document id and uploads page URL (201), or an
+                       error (400 invalid metadata, 404 unknown session,
+                       409 incomplete upload, 410 received data lost,
+                       422 hash mismatch, 500)
+    """
+    upload = _own_session(session_id)
+    if upload is None:
+        return _error('Upload not found.', 404)
+
+    form = DocumentDetailsForm()
+    if not form.validate_on_submit():
+        response = jsonify({'status': 'error', 'message': 'Invalid document details.',
+                            'errors': form.errors})
+        return response, 400
+    if not upload.is_complete:
+        response = jsonify(dict(upload.to_dict(), status='error', message='The upload is incomplete.'))
+        return response, 409
+
+    original_filename = upload.original_filename
+    declared_hash = upload.content_hash
+    try:
+        stored = store_file(partial_path(session_id), original_filename)
+    except FileNotFoundError:
+        # Finalized by a concurrent request, or the partial file was lost
+        _remove_session(session_id)
+        db.session.commit()
+        return _error('The uploaded data is no longer available; please upload the file again.', 410)
+    if stored.size != upload.total_size:
+        response = jsonify(dict(upload.to_dict(), status='error', message='The upload is incomplete.'))
+        return response, 409
+
+    if declared_hash and stored.hash != declared_hash:
+        _remove_session(session_id)
+        db.session.commit()
+        discard_upload(stored)
+        return _error('The uploaded file does not match its SHA-256.', 422)
+
+    # Remove the session in the document's transaction; a concurrent
+    # finalize of the same upload then finds it gone
+    if not _remove_session(session_id):
+        db.session.rollback()
+        return _error('Upload not found.', 404)
+
+    try:
+        # Create the document; the partial file moves into the store
+        # once it is committed
+        doc = save_document(form, stored, original_filename)
+    except Exception as e:
+        # Rolled back: the session and its partial file are kept for a retry
+        current_app.logger.error(f'Database error during chunked upload: {e}')
+        return _error(f'An error occurred while saving the document: {e}', 500)
+
+    return jsonify({
+        'status': 'success',
+        'document_id': doc.id,
+        'redirect': url_for('view.uploaded_documents')
+    }), 201
+
+
+@bp.route('/sessions/<session_id>', methods=['DELETE'])
+@login_required
+def chunked_cancel(session_id):
+    """
+    Cancel an upload and remove the bytes received so far.
+
+    Args:
+        session_id (str): UploadSession id
+
+    Returns:
+        JSON response: Success, or 404
+    """
+    upload = _own_session(session_id)
+    if upload is None:
+        return _error('Upload not found.', 404)
+
+    db.session.delete(upload)
+    db.session.commit()
+    path = partial_path(session_id)
+    if os.path.exists(path):
+        os.remove(path)
+    return jsonify({'status': 'success', 'message': 'Upload cancelled.'})
@@ -6,6 +6,7 @@ These forms handle document metadata collection and file uploads with
 proper validation to ensure data integrity and file security.
 
 Forms included:
+- DocumentDetailsForm: Document metadata (used to finalize chunked uploads)
 - UploadDocumentForm: Complete document upload with metadata
 
 All forms include CSRF protection and comprehensive validation.
@@ -23,18 +24,19 @@ from wtforms.validators import DataRequired, Length
 # DOCUMENT UPLOAD FORMS
 # ============================================================================
 
-class UploadDocumentForm(FlaskForm):
+class DocumentDetailsForm(FlaskForm):
     """
-    Form for uploading new documents with comprehensive metadata.
+    Form for the metadata of a new document.
     
     This form collects all necessary information about a document
-    including academic context, descriptive information, and the file itself.
+    including academic context and descriptive information. The file
+    itself is added by UploadDocumentForm, or sent separately in chunks
+    (see app/upload/chunked.py).
     
     Features:
     - Document metadata collection
     - Academic context information (institute, course, subject)
     - Categorization and tagging system
-    - File upload with format validation
     - Comprehensive field validation
     
     Fields:
@@ -46,8 +48,6 @@ class UploadDocumentForm(FlaskForm):
         description: Brief document description (optional, text area)
         category: Document category (optional, max 100 characters)
         tags: Comma-separated tags (optional, max 200 characters)
-        file: Document file upload (required, specific formats only)
-        submit: Submit button to upload document
         
     Note:
         - Author is automatically set to current logged-in user
@@ -67,7 +67,8 @@ class UploadDocumentForm(FlaskForm):
         'Academic Institute', 
         validators=[
             Length(max=200, message='Institute name cannot exceed 200 characters')
-        ]
+        ],
+        render_kw={'data-autocomplete': 'institute'}  # Typeahead from existing values
     )
     
     # Using StringField instead of IntegerField for flexibility
@@ -83,14 +84,16 @@ class UploadDocumentForm(FlaskForm):
         'Academic Course', 
         validators=[
             Length(max=200, message='Course name cannot exceed 200 characters')
-        ]
+        ],
+        render_kw={'data-autocomplete': 'course'}  # Typeahead from existing values
     )
     
     subject = StringField(
         'Subject', 
         validators=[
             Length(max=200, message='Subject cannot exceed 200 characters')
-        ]
+        ],
+        render_kw={'data-autocomplete': 'subject'}  # Typeahead from existing values
     )
     
     description = TextAreaField(
@@ -111,8 +114,21 @@ class UploadDocumentForm(FlaskForm):
         'Tags (comma-separated)', 
         validators=[
             Length(max=200, message='Tags cannot exceed 200 characters')
-        ]
+        ],
+        render_kw={'data-autocomplete': 'tag', 'data-autocomplete-multiple': True}
     )
+
+
+class UploadDocumentForm(DocumentDetailsForm):
+    """
+    Form for uploading new documents with comprehensive metadata.
+    
+    Adds the file itself to the DocumentDetailsForm metadata fields.
+    
+    Fields:
+        file: Document file upload (required, specific formats only)
+        submit: Submit button to upload document
+    """
     
     file = FileField(
         'Select Document', 
@@ -0,0 +1,649 @@
+"""
+app/upload/storage.py - Content-Addressed Document Storage
+
+This module stores uploaded document files once per distinct content.
+Each file is named by the SHA-256 hash of its bytes and kept under a
+sharded directory layout inside UPLOAD_FOLDER:
+
+    uploads/blobs/ab/cd/abcd1234...   (first two byte pairs of the hash)
+
+Identical uploads share one blob, and two different files called
+"notes.pdf" no longer overwrite each other. The original file name is
+kept on the document (Document.original_filename) for downloads.
+
+Single-Pass Uploads:
+Werkzeug normally spools an uploaded file to a temporary file that the
+view then copies again. For the upload routes, UploadRequest has the
+form parser write straight into an UploadSpool inside the store, which
+computes the SHA-256, the size and the magic bytes while the request
+body is parsed. Storing the upload is then a rename; every byte is
+written to disk once and never read back.
+
+Reference Counting:
+- StoredBlob.refcount counts the documents pointing at a blob
+- acquire_blob / release_blob adjust it inside the caller's transaction
+- An upload keeps its own temporary copy until the transaction that
+  references the blob commits, then moves it into place if the blob is
+  missing (its last reference may have been released concurrently)
+- A blob whose last reference is released is unlinked after the
+  transaction commits, and only if no upload re-acquired it meanwhile;
+  a rollback keeps the file
+
+Functions:
+- UploadSpool / UploadRequest: Hash uploads while the request is parsed
+- save_upload: Hash an uploaded file and keep it ready for the store
+- store_file: Hash a completed chunked upload
+- place_blob / discard_upload: Move an upload into the store once its
+  reference is committed, or drop it
+- find_blob: Look up stored content by hash (upload pre-check)
+- acquire_blob / release_blob: Reference counting
+- release_document_file: Release the file of a document being deleted
+- discard_if_unreferenced: Remove a stored file nobody references
+- collect_stale_uploads: Remove abandoned chunked uploads and spools
+- storage_cli: `flask storage migrate` moves legacy files into the store,
+  `flask storage gc` collects abandoned uploads
+"""
+
+# Import standard library modules
+import hashlib
+import os
+import secrets
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# Import Flask CLI and SQLAlchemy helpers
+import click
+from flask import current_app, Request
+from flask.cli import AppGroup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Import application components
+from app import db
+from app.models import Document, StoredBlob, UploadSession
+from app.upload.utils import detect_file_type, HASH_CHUNK_SIZE, MAGIC_BYTES
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Directory of the store inside UPLOAD_FOLDER
+BLOB_DIR = 'blobs'
+
+# Directory for partially written uploads (same filesystem, so the final
+# rename is atomic)
+TMP_DIR = os.path.join(BLOB_DIR, 'tmp')
+
+# Name prefix of the partial files of chunked uploads inside TMP_DIR
+PARTIAL_PREFIX = 'upload-'
+
+# Session.info key listing files to unlink once the transaction commits
+PENDING_UNLINK_KEY = 'storage_pending_unlink'
+
+# Endpoints whose uploaded files are spooled directly into the store
+SPOOLED_ENDPOINTS = {'upload.upload_document'}
+
+# Name prefix of blobs being unlinked inside TMP_DIR
+DISCARD_PREFIX = 'discard-'
+
+# Result of storing an upload; temp_path holds the content until the
+# document's reference is committed (None when the blob was reused as is)
+StoredFile = namedtuple('StoredFile', ['hash', 'size', 'filename', 'file_type', 'temp_path'])
+
+# ============================================================================
+# PATHS
+# ============================================================================
+
+def blob_filename(content_hash):
+    """
+    Get the path of a blob relative to UPLOAD_FOLDER.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the content
+
+    Returns:
+        str: e.g. 'blobs/ab/cd/abcd...' (stored in Document.filename)
+    """
+    return os.path.join(BLOB_DIR, content_hash[:2], content_hash[2:4], content_hash)
+
+
+def _absolute(filename):
+    """Resolve a path relative to UPLOAD_FOLDER."""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+
+
+def partial_path(session_id):
+    """
+    Get the absolute path of a chunked upload's partial file.
+
+    Args:
+        session_id (str): UploadSession id
+
+    Returns:
+        str: Path inside the store's tmp directory
+    """
+    return _absolute(os.path.join(TMP_DIR, PARTIAL_PREFIX + session_id))
+
+
+def is_blob_filename(filename):
+    """
+    Check whether a stored document path points into the blob store.
+
+    Args:
+        filename (str): Document.filename value
+
+    Returns:
+        bool: True for content-addressed paths, False for legacy paths
+    """
+    return filename.startswith(BLOB_DIR + os.sep) or filename.startswith(BLOB_DIR + '/')
+
+# ============================================================================
+# WRITING BLOBS
+# ============================================================================
+
+def save_upload(file_storage):
+    """
+    Hash an uploaded file and keep it ready for the store.
+
+    Files parsed by UploadRequest are already hashed and on disk, so
+    this only detaches their spool. Other streams are copied once
+    through a spool. Does not touch the database: the caller references
+    the blob in the document's transaction and calls place_blob after
+    the commit (save_document does both), or discard_upload on failure.
+
+    Args:
+        file_storage (FileStorage): Uploaded file from the form
+
+    Returns:
+        StoredFile: (hash, size, filename, file_type, temp_path) of the
+                    upload; file_type is detected from the content
+
+    Example:
+        >>> stored = save_upload(form.file.data)
+        >>> acquire_blob(stored.hash, stored.size)
+        >>> doc.filename = stored.filename
+        >>> db.session.commit()
+        >>> place_blob(stored)
+    """
+    spool = file_storage.stream
+    if not isinstance(spool, UploadSpool):
+        spool = UploadSpool.from_stream(spool)
+    try:
+        content_hash = spool.hexdigest()
+        file_type = detect_file_type(spool.head, file_storage.filename)
+        temp_path = spool.detach()
+    finally:
+        spool.close()
+    return StoredFile(content_hash, spool.size, blob_filename(content_hash), file_type, temp_path)
+
+
+def store_file(path, original_filename):
+    """
+    Hash a complete file of the tmp directory for the store.
+
+    Used for chunked uploads, whose bytes arrive over several requests
+    (and possibly workers), so the hash is computed here in one read.
+    The file stays where it is until place_blob moves it.
+
+    Args:
+        path (str): File inside TMP_DIR (e.g. partial_path(session_id))
+        original_filename (str): Uploaded file name, for type detection
+
+    Returns:
+        StoredFile: (hash, size, filename, file_type, temp_path) of the upload
+    """
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+            if len(head) < MAGIC_BYTES:
+                head += chunk[:MAGIC_BYTES - len(head)]
+    content_hash = digest.hexdigest()
+    file_type = detect_file_type(head, original_filename)
+    return StoredFile(content_hash, size, blob_filename(content_hash), file_type, path)
+
+
+def place_blob(stored):
+    """
+    Move an upload into the store once its reference is committed.
+
+    The blob may already exist (duplicate content), in which case the
+    temporary copy is dropped. It may also have been unlinked after its
+    file was seen, by the release of its last reference committing just
+    before ours; keeping the copy until now lets it be put back. The
+    rename is atomic, so readers never see a partially written blob.
+
+    Args:
+        stored (StoredFile): Upload returned by save_upload / store_file
+    """
+    if stored.temp_path is None:
+        return
+    final_path = _absolute(stored.filename)
+    if os.path.exists(final_path):
+        _unlink(stored.temp_path)
+    else:
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(stored.temp_path, final_path)
+
+
+def discard_upload(stored):
+    """
+    Drop the temporary copy of an upload whose document was not saved.
+
+    Args:
+        stored (StoredFile): Upload returned by save_upload / store_file
+    """
+    if stored.temp_path is not None:
+        _unlink(stored.temp_path)
+
+def find_blob(content_hash, size, original_filename):
+    """
+    Look up content that is already in the store.
+
+    Lets a client that knows the SHA-256 and size of its file skip
+    sending the bytes. Only the leading magic bytes of the blob are
+    read, to detect the file type.
+
+    Args:
+        content_hash (str): SHA-256 hex digest claimed by the client
+        size (int): File size claimed by the client
+        original_filename (str): Uploaded file name, for type detection
+
+    Returns:
+        StoredFile: The stored blob, or None if the store does not have
+                    this content (or the size differs)
+    """
+    blob = db.session.get(StoredBlob, content_hash)
+    if blob is None or blob.size != size or blob.refcount <= 0:
+        return None
+    filename = blob_filename(content_hash)
+    try:
+        with open(_absolute(filename), 'rb') as f:
+            head = f.read(MAGIC_BYTES)
+    except FileNotFoundError:
+        return None
+    return StoredFile(content_hash, size, filename, detect_file_type(head, original_filename), None)
+
+# ============================================================================
+# SINGLE-PASS SPOOLING
+# ============================================================================
+
+class UploadSpool:
+    """
+    Temporary file in the store that hashes everything written to it.
+
+    Used as the form parser's file stream: the SHA-256, the byte count
+    and the leading magic bytes are captured in the same pass that
+    writes the file. Closing an undetached spool deletes its file, so
+    rejected uploads leave nothing behind (Flask closes request files
+    at the end of the request).
+
+    Attributes:
+        path (str): Temporary file path, None once detached
+        size (int): Bytes written
+        head (bytes): First MAGIC_BYTES bytes written
+    """
+
+    def __init__(self):
+        tmp_folder = _absolute(TMP_DIR)
+        os.makedirs(tmp_folder, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=tmp_folder)
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+
+    @classmethod
+    def from_stream(cls, stream):
+        """
+        Spool a readable binary stream.
+
+        Args:
+            stream: File-like object to copy
+
+        Returns:
+            UploadSpool: Spool holding the stream's content
+        """
+        spool = cls()
+        try:
+            for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        return spool
+
+    def write(self, data):
+        """Write a chunk, updating the hash, size and magic bytes."""
+        self._digest.update(data)
+        self.size += len(data)
+        if len(self.head) < MAGIC_BYTES:
+            self.head += bytes(data[:MAGIC_BYTES - len(self.head)])
+        return self._file.write(data)
+
+    def hexdigest(self):
+        """Get the SHA-256 hex digest of the bytes written so far."""
+        return self._digest.hexdigest()
+
+    def detach(self):
+        """
+        Close the file and hand it over to the caller (it is no longer
+        deleted on close).
+
+        Returns:
+            str: Path of the complete temporary file
+        """
+        self._file.close()
+        path, self.path = self.path, None
+        return path
+
+    def close(self):
+        """Close the file, deleting it unless it was detached."""
+        self._file.close()
+        if self.path is not None:
+            _unlink(self.path)
+            self.path = None
+
+    def __getattr__(self, name):
+        # seek, read, tell, ... for the form parser and FileStorage.save
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """
+    Request class spooling files of upload routes into the store.
+
+    Installed as app.request_class. Files posted to SPOOLED_ENDPOINTS
+    are written into an UploadSpool; other routes (e.g. profile
+    pictures) keep Werkzeug's default temporary files.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint in SPOOLED_ENDPOINTS:
+            return UploadSpool()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+# ============================================================================
+# REFERENCE COUNTING
+# ============================================================================
+
+def acquire_blob(content_hash, size):
+    """
+    Add a reference to a blob (in the current transaction).
+
+    Uses an atomic UPDATE and creates the row on the first reference.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the blob
+        size (int): Size of the blob in bytes
+    """
+    updated = db.session.execute(
+        db.update(StoredBlob)
+        .where(StoredBlob.hash == content_hash)
+        .values(refcount=StoredBlob.refcount + 1)
+    ).rowcount
+    if not updated:
+        db.session.add(StoredBlob(hash=content_hash, size=size, refcount=1))
+        db.session.flush()
+
+
+def acquire_existing_blob(content_hash):
+    """
+    Add a reference to a blob only if it is still referenced.
+
+    Unlike acquire_blob this never creates the row, so a blob whose last
+    reference is being released concurrently is not revived without
+    its file.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the blob
+
+    Returns:
+        bool: True if the reference was added
+    """
+    return bool(db.session.execute(
+        db.update(StoredBlob)
+        .where(StoredBlob.hash == content_hash)
+        .where(StoredBlob.refcount > 0)
+        .values(refcount=StoredBlob.refcount + 1)
+    ).rowcount)
+
+
+def release_blob(content_hash):
+    """
+    Drop a reference to a blob (in the current transaction).
+
+    When the last reference goes, the row is deleted and the file is
+    scheduled for unlinking after the commit.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the blob
+    """
+    db.session.execute(
+        db.update(StoredBlob)
+        .where(StoredBlob.hash == content_hash)
+        .values(refcount=StoredBlob.refcount - 1)
+    )
+    removed = db.session.execute(
+        db.delete(StoredBlob)
+        .where(StoredBlob.hash == content_hash)
+        .where(StoredBlob.refcount <= 0)
+    ).rowcount
+    if removed:
+        _schedule_unlink(blob_filename(content_hash), content_hash)
+
+
+def release_document_file(doc):
+    """
+    Release the file of a document that is being deleted.
+
+    Blobs lose one reference; legacy (pre-store) files are unlinked
+    after the commit.
+
+    Args:
+        doc (Document): Document about to be deleted
+    """
+    if is_blob_filename(doc.filename) and doc.content_hash:
+        release_blob(doc.content_hash)
+    else:
+        _schedule_unlink(doc.filename, None)
+
+# ============================================================================
+# UNLINKING AFTER COMMIT
+# ============================================================================
+
+def _schedule_unlink(filename, content_hash):
+    """
+    Unlink a file once the current transaction commits.
+
+    Args:
+        filename (str): Path relative to UPLOAD_FOLDER
+        content_hash (str): Blob hash to re-check before unlinking, or
+                            None for legacy files
+    """
+    pending = db.session.info.setdefault(PENDING_UNLINK_KEY, [])
+    pending.append((_absolute(filename), content_hash))
+
+
+def _is_referenced(content_hash):
+    """Check for a committed StoredBlob row (outside the current transaction)."""
+    with db.engine.connect() as connection:
+        return connection.execute(
+            db.select(StoredBlob.hash).where(StoredBlob.hash == content_hash)
+        ).first() is not None
+
+
+def discard_if_unreferenced(content_hash):
+    """
+    Unlink a blob if no StoredBlob row references it.
+
+    Used after releasing the last reference. The blob is first renamed
+    out of the store and the references are checked again: an upload
+    that committed a new reference in between either sees the blob
+    missing and puts its own copy in place (place_blob), or gets the
+    renamed blob back here.
+
+    Args:
+        content_hash (str): SHA-256 hex digest of the blob
+    """
+    if _is_referenced(content_hash):
+        return
+    final_path = _absolute(blob_filename(content_hash))
+    discarded = _absolute(os.path.join(
+        TMP_DIR, f'{DISCARD_PREFIX}{content_hash}-{secrets.token_hex(4)}'
+    ))
+    try:
+        os.replace(final_path, discarded)
+    except FileNotFoundError:
+        return
+    if _is_referenced(content_hash):
+        os.replace(discarded, final_path)
+    else:
+        _unlink(discarded)
+
+
+def _unlink(path):
+    """Remove a file, ignoring files that are already gone."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@event.listens_for(Session, 'after_commit')
+def _unlink_after_commit(session):
+    """Unlink the files released by the committed transaction."""
+    for path, content_hash in session.info.pop(PENDING_UNLINK_KEY, ()):
+        if content_hash is None:
+            _unlink(path)
+        else:
+            discard_if_unreferenced(content_hash)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _keep_after_rollback(session, previous_transaction):
+    """Forget scheduled unlinks when the transaction is rolled back."""
+    session.info.pop(PENDING_UNLINK_KEY, None)
+
+# ============================================================================
+# GARBAGE COLLECTION
+# ============================================================================
+
+def collect_stale_uploads(max_age=None):
+    """
+    Remove chunked uploads abandoned for longer than max_age.
+
+    Deletes expired UploadSession rows with their partial files, and
+    any other file in the tmp directory older than max_age (e.g. left
+    by a worker that died while receiving an upload). Each session is
+    deleted only if it is still expired, and its partial file is removed
+    only by the collector whose delete matched, so a collection racing
+    a new chunk or another collector removes nothing that is in use.
+
+    Args:
+        max_age (int): Idle seconds before removal (default UPLOAD_SESSION_TTL)
+
+    Returns:
+        tuple: (sessions removed, files removed)
+    """
+    if max_age is None:
+        max_age = current_app.config['UPLOAD_SESSION_TTL']
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+
+    expired = db.session.execute(
+        db.select(UploadSession.id).where(UploadSession.updated_at < cutoff)
+    ).scalars().all()
+    sessions = files = 0
+    for session_id in expired:
+        removed = db.session.execute(
+            db.delete(UploadSession)
+            .where(UploadSession.id == session_id, UploadSession.updated_at < cutoff)
+        ).rowcount
+        db.session.commit()
+        if not removed:
+            continue  # Resumed meanwhile, or collected by another process
+        sessions += 1
+        path = partial_path(session_id)
+        if os.path.exists(path):
+            _unlink(path)
+            files += 1
+
+    # Stray temporary files; live sessions touch their file on every chunk
+    tmp_folder = _absolute(TMP_DIR)
+    oldest = time.time() - max_age
+    if os.path.isdir(tmp_folder):
+        for entry in os.scandir(tmp_folder):
+            try:
+                stale = entry.is_file() and entry.stat().st_mtime < oldest
+            except FileNotFoundError:
+                continue  # Removed by another process during the scan
+            if stale:
+                _unlink(entry.path)
+                files += 1
+    return sessions, files
+
+# ============================================================================
+# CLI COMMANDS
+# ============================================================================
+
+# Command group registered in the application factory:
+#   flask storage migrate
+storage_cli = AppGroup('storage', help='Maintain the content-addressed document store.')
+
+
+@storage_cli.command('migrate')
+def migrate_command():
+    """Move legacy per-name upload files into the content-addressed store."""
+    moved = missing = 0
+    saved_bytes = 0
+    legacy_paths = set()  # Removed at the end: documents may share a legacy file
+    for doc in Document.query.order_by(Document.id):
+        if is_blob_filename(doc.filename):
+            continue
+        legacy_path = _absolute(doc.filename)
+        if not os.path.isfile(legacy_path):
+            missing += 1
+            continue
+
+        # Copy into the store, hashing in the same pass
+        with open(legacy_path, 'rb') as source:
+            spool = UploadSpool.from_stream(source)
+        content_hash = spool.hexdigest()
+        size = spool.size
+        duplicate = db.session.get(StoredBlob, content_hash) is not None
+        acquire_blob(content_hash, size)
+
+        doc.original_filename = doc.original_filename or os.path.basename(doc.filename)
+        stored = StoredFile(content_hash, size, blob_filename(content_hash),
+                            detect_file_type(spool.head, doc.original_filename), spool.detach())
+        doc.filename = stored.filename
+        doc.content_hash = content_hash
+        doc.file_size = size
+        doc.file_type = stored.file_type
+        db.session.commit()
+        place_blob(stored)
+
+        legacy_paths.add(legacy_path)
+        moved += 1
+        if duplicate:
+            saved_bytes += size
+
+    for legacy_path in legacy_paths:
+        _unlink(legacy_path)
+
+    click.echo(f'Moved {moved} documents into the store '
+               f'({saved_bytes} bytes deduplicated, {missing} files missing).')
+
+
+@storage_cli.command('gc')
+@click.option('--max-age', type=int, default=None,
+              help='Idle seconds before an upload is abandoned (default UPLOAD_SESSION_TTL).')
+def gc_command(max_age):
+    """Remove abandoned chunked uploads and stray temporary files."""
+    sessions, files = collect_stale_uploads(max_age)
+    click.echo(f'Removed {sessions} abandoned upload sessions and {files} temporary files.')
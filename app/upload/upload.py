@@ -8,6 +8,8 @@ It provides routes for:
 - Database integration for document records
 - Category and tag management
 - File storage and organization
+- Hash pre-check that skips sending files the server already stores
+- save_document: Document record creation, shared with chunked uploads
 
 Features:
 - Secure file upload handling
@@ -17,13 +19,10 @@ Features:
 - File organization in upload directories
 """
 
-# Import standard library modules
-import os
-
 # Import Flask components
 from flask import (
     render_template, request, redirect, url_for, 
-    flash, current_app
+    flash, current_app, jsonify
 )
 
 # Import Flask-Login for authentication
@@ -36,8 +35,14 @@ from werkzeug.utils import secure_filename
 from app import db
 from . import bp
 from app.upload.utils import allowed_file
+from app.upload.storage import (
+    save_upload, find_blob, acquire_blob, acquire_existing_blob, place_blob, discard_upload
+)
 from app.models import Document, Category, Tag
-from app.upload.forms import UploadDocumentForm
+from app.upload.forms import UploadDocumentForm, DocumentDetailsForm
+from app.view.catalog import document_created
+from app.jobs import enqueue_document_jobs
+from app.view.reference_cache import invalidate_categories
 
 # ============================================================================
 # DOCUMENT UPLOAD ROUTES
@@ -80,18 +85,6 @@ def upload_document():
     
     # Process form submission
     if form.validate_on_submit():
-        # ====================================================================
-        # EXTRACT AND VALIDATE FORM DATA
-        # ====================================================================
-        
-        # Extract form data
-        title = form.title.data
-        description = form.description.data
-        institute = form.institute.data
-        course = form.course.data
-        subject = form.subject.data
-        category_name = form.category.data
-        tags_string = form.tags.data
         file = form.file.data
 
         # ====================================================================
@@ -100,106 +93,216 @@ def upload_document():
         
         # Validate uploaded file exists and has allowed extension
         if file and allowed_file(file.filename):
-            # Secure the filename to prevent directory traversal attacks
-            filename = secure_filename(file.filename)
-            
-            # Configure upload directories
-            upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
-            documents_folder = os.path.join(upload_folder, 'documents')
-            
-            # Ensure documents upload directory exists
-            full_documents_path = os.path.join(current_app.root_path, documents_folder)
-            os.makedirs(full_documents_path, exist_ok=True)
-            
-            # Define complete file path for storage
-            file_path = os.path.join(full_documents_path, filename)
-            
-            # Save uploaded file to server
-            file.save(file_path)
-
-            # ================================================================
-            # CREATE DOCUMENT DATABASE RECORD
-            # ================================================================
-            
-            # Create new Document instance with form data
-            doc = Document(
-                title=title,
-                description=description,
-                institute=institute,
-                course=course,
-                subject=subject,
-                # Store relative path with subdirectory for proper serving
-                filename=os.path.join('documents', filename),
-                author=current_user  # Automatically set to current user
-                # category and tags will be handled separately below
-            )
-
-            # ================================================================
-            # HANDLE CATEGORY MANAGEMENT
-            # ================================================================
-            
-            # Process optional category
-            if category_name:
-                # Check if category already exists
-                category = Category.query.filter_by(name=category_name).first()
-                if not category:
-                    # Create new category if it doesn't exist
-                    category = Category(name=category_name)
-                    db.session.add(category)
-                # Associate category with document
-                doc.category = category
-
-            # ================================================================
-            # HANDLE TAG MANAGEMENT
-            # ================================================================
-            
-            # Process comma-separated tags
-            if tags_string:
-                # Split tags by comma and process each one
-                for tag_name in tags_string.split(','):
-                    tag_name = tag_name.strip()  # Remove whitespace
-                    if not tag_name:  # Skip empty tags
-                        continue
-                    
-                    # Check if tag already exists
-                    tag = Tag.query.filter_by(name=tag_name).first()
-                    if not tag:
-                        # Create new tag if it doesn't exist
-                        tag = Tag(name=tag_name)
-                        db.session.add(tag)
-                    
-                    # Associate tag with document (many-to-many relationship)
-                    doc.tags.append(tag)
-
-            # ================================================================
-            # DATABASE COMMIT AND SUCCESS HANDLING
-            # ================================================================
-            
-            # Add document to database session
-            db.session.add(doc)
-            
+            stored = None
             try:
-                # Commit all changes to database
-                db.session.commit()
+                # Hand the spooled file over for the content-addressed store;
+                # its hash, size and type were captured while the request was
+                # parsed and identical files are stored only once
+                stored = save_upload(file)
+
+                # Create the document record with its category and tags
+                save_document(form, stored, file.filename)
                 flash('Document uploaded successfully!', 'success')
                 
                 # Redirect to prevent duplicate submissions on page refresh
                 return redirect(url_for('upload.upload_document'))
                 
             except Exception as e:
-                # Handle database errors
+                # Roll back whatever the failed step left in the session, so
+                # nothing leaks into a later commit, and drop the upload's
+                # temporary file
                 db.session.rollback()
+                if stored is not None:
+                    discard_upload(stored)
                 flash(f'An error occurred while saving the document: {e}', 'danger')
                 current_app.logger.error(f'Database error during upload: {e}')
-                
-                # Optionally remove uploaded file if database save failed
-                try:
-                    os.remove(file_path)
-                except OSError:
-                    pass  # File removal failed, but not critical
         else:
             # File validation failed
             flash('Invalid file format. Allowed formats: PDF, DOC, DOCX, PPT, PPTX.', 'danger')
 
     # Render upload page for GET requests or after form validation failure
-    return render_template('upload/upload.html', form=form)
\ No newline at end of file
+    return render_template('upload/upload.html', form=form)
+
+
+@bp.route('/precheck', methods=['POST'])
+@login_required
+def precheck_upload():
+    """
+    Create a document without its bytes when the server already has them.
+
+    The upload form posts its metadata with the SHA-256, size and name
+    of the selected file (computed in the browser) before sending the
+    file. Re-uploads of content that is already stored, such as the same
+    slide deck shared by several students, then become a new Document
+    pointing at the existing blob and no file crosses the network.
+    Otherwise the client falls back to a normal upload.
+
+    Only hashes of stored documents can be matched, and every stored
+    document is already downloadable by logged-in users, so a hash
+    reveals nothing that is not available anyway.
+
+    Form fields:
+        DocumentDetailsForm fields, plus sha256, size and filename
+
+    Returns:
+        JSON response:
+        - 201 {exists: true, document_id, redirect} when the document was created
+        - 200 {exists: false} when the file must be uploaded
+        - 400 for invalid details or file information
+    """
+    form = DocumentDetailsForm()
+    if not form.validate_on_submit():
+        return jsonify({'status': 'error', 'exists': False, 'errors': form.errors}), 400
+
+    content_hash = request.form.get('sha256', '').lower()
+    size = request.form.get('size', type=int)
+    filename = request.form.get('filename', '')
+    if len(content_hash) != 64 or size is None or not allowed_file(filename):
+        return jsonify({'status': 'error', 'exists': False,
+                        'message': 'Invalid file information.'}), 400
+
+    stored = find_blob(content_hash, size, filename)
+    if stored is None or not acquire_existing_blob(content_hash):
+        db.session.rollback()
+        return jsonify({'status': 'success', 'exists': False})
+
+    try:
+        doc = save_document(form, stored, filename, blob_acquired=True)
+    except Exception as e:
+        # Also drops the blob reference taken above
+        db.session.rollback()
+        current_app.logger.error(f'Database error during upload pre-check: {e}')
+        return jsonify({'status': 'success', 'exists': False})
+
+    flash('Document uploaded successfully!', 'success')
+    return jsonify({
+        'status': 'success',
+        'exists': True,
+        'document_id': doc.id,
+        'redirect': url_for('upload.upload_document')
+    }), 201
+
+
+# ============================================================================
+# DOCUMENT CREATION
+# ============================================================================
+
+def save_document(form, stored, original_filename, blob_acquired=False):
+    """
+    Create and commit the Document record of a stored upload.
+
+    Shared by the form upload and the chunked upload routes. Builds the
+    document from the form metadata, resolves its category and tags,
+    references the stored blob, registers the document with the catalog
+    and queues its background jobs, all in one transaction. Once it has
+    committed, the uploaded file is moved into the store.
+
+    Args:
+        form (DocumentDetailsForm): Validated form with the document metadata
+        stored (StoredFile): Upload from save_upload / store_file / find_blob
+        original_filename (str): File name chosen by the user
+        blob_acquired (bool): True if the caller already referenced the
+                              blob in this transaction
+
+    Returns:
+        Document: The committed document
+
+    Raises:
+        Exception: Any database error, after rolling back; the caller
+                   still owns the upload's temporary file (discard_upload)
+    """
+    # Secure the filename to prevent directory traversal attacks
+    # (kept as the download name; the file is stored by content hash)
+    filename = secure_filename(original_filename)
+
+    # ====================================================================
+    # CREATE DOCUMENT DATABASE RECORD
+    # ====================================================================
+    
+    # Create new Document instance with form data
+    doc = Document(
+        title=form.title.data,
+        description=form.description.data,
+        institute=form.institute.data,
+        course=form.course.data,
+        subject=form.subject.data,
+        # Content-addressed blob path, relative to UPLOAD_FOLDER
+        filename=stored.filename,
+        original_filename=filename,
+        file_size=stored.size,
+        file_type=stored.file_type,  # Detected from the magic bytes
+        content_hash=stored.hash,  # Strong ETag for downloads
+        author=current_user  # Automatically set to current user
+        # category and tags will be handled separately below
+    )
+
+    # ====================================================================
+    # HANDLE CATEGORY MANAGEMENT
+    # ====================================================================
+    
+    # Process optional category
+    category_name = form.category.data
+    if category_name:
+        # Check if category already exists
+        category = Category.query.filter_by(name=category_name).first()
+        if not category:
+            # Create new category if it doesn't exist
+            category = Category(name=category_name)
+            db.session.add(category)
+            invalidate_categories()  # Refresh cached category list
+        # Associate category with document
+        doc.category = category
+
+    # ====================================================================
+    # HANDLE TAG MANAGEMENT
+    # ====================================================================
+    
+    # Process comma-separated tags
+    tags_string = form.tags.data
+    if tags_string:
+        # Split tags by comma and process each one
+        for tag_name in tags_string.split(','):
+            tag_name = tag_name.strip()  # Remove whitespace
+            if not tag_name:  # Skip empty tags
+                continue
+            
+            # Check if tag already exists
+            tag = Tag.query.filter_by(name=tag_name).first()
+            if not tag:
+                # Create new tag if it doesn't exist
+                tag = Tag(name=tag_name)
+                db.session.add(tag)
+            
+            # Associate tag with document (many-to-many relationship)
+            doc.tags.append(tag)
+
+    # ====================================================================
+    # DATABASE COMMIT
+    # ====================================================================
+    
+    # Add document to database session
+    db.session.add(doc)
+    
+    try:
+        # Reference the stored blob in the same transaction
+        if not blob_acquired:
+            acquire_blob(stored.hash, stored.size)
+
+        # Register the document with the search index and facet counts,
+        # invalidating cached search results, in the same transaction
+        document_created(doc)
+
+        # Queue post-upload processing (page count, ...) for the job
+        # worker instead of doing it in this request
+        enqueue_document_jobs(doc)
+
+        # Commit all changes to database
+        db.session.commit()
+        
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # Move the file into the store now that the document references it
+    place_blob(stored)
+    return doc
@@ -7,6 +7,8 @@ used throughout the upload process.
 
 Functions:
 - allowed_file: Validates document file extensions for security
+- file_sha256: Content hash of a stored file
+- detect_file_type: File type from the leading (magic) bytes
 - Additional utility functions can be added here as needed
 
 Security Features:
@@ -15,16 +17,40 @@ Security Features:
 - Case-insensitive extension checking
 """
 
+import hashlib
 import os
 
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
 
+# Read size used when hashing files (1 MB)
+HASH_CHUNK_SIZE = 1024 * 1024
+
 # Define allowed file extensions for document uploads
 # These extensions are considered safe for academic document sharing
 ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'ppt', 'pptx'}
 
+# Leading bytes needed to recognize a file type
+MAGIC_BYTES = 8
+
+# File signatures: (leading bytes, file type). Office formats are
+# containers, so the extension picks the exact type within a family
+MAGIC_SIGNATURES = [
+    (b'%PDF-', 'pdf'),
+    (b'PK\x03\x04', 'zip'),                          # docx, pptx (OOXML)
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'ole'),      # doc, ppt (OLE2)
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF8', 'gif'),
+]
+
+# Extensions accepted as the exact type of a container family
+CONTAINER_TYPES = {
+    'zip': {'docx', 'pptx'},
+    'ole': {'doc', 'ppt'},
+}
+
 # ============================================================================
 # FILE VALIDATION FUNCTIONS
 # ============================================================================
@@ -61,4 +87,57 @@ def allowed_file(filename):
     return (
         '.' in filename 
         and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-    )
\ No newline at end of file
+    )
+
+
+# ============================================================================
+# FILE CONTENT FUNCTIONS
+# ============================================================================
+
+def file_sha256(path):
+    """
+    Compute the SHA-256 hash of a file without loading it into memory.
+
+    Args:
+        path (str): Path of the file to hash
+
+    Returns:
+        str: Hexadecimal SHA-256 digest (64 characters)
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detect_file_type(head, filename=None):
+    """
+    Detect the type of a file from its leading (magic) bytes.
+
+    The content decides the type; the file name only tells apart the
+    formats that share a container (e.g. docx and pptx are both ZIP
+    archives).
+
+    Args:
+        head (bytes): First MAGIC_BYTES bytes of the file
+        filename (str): Uploaded file name, used for container formats
+
+    Returns:
+        str: File type (pdf, docx, png, ...), the container family
+             (zip, ole) if the extension does not name a member of it,
+             or None if the content is not recognized
+
+    Examples:
+        >>> detect_file_type(b'%PDF-1.7', 'notes.docx')
+        'pdf'
+        >>> detect_file_type(b'PK\\x03\\x04', 'slides.pptx')
+        'pptx'
+    """
+    extension = filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else None
+    for signature, file_type in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            if extension in CONTAINER_TYPES.get(file_type, ()):
+                return extension
+            return file_type
+    return None
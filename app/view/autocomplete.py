@@ -0,0 +1,275 @@
+"""
+app/view/autocomplete.py - Prefix Autocomplete for Search and Upload Fields
+
+This module keeps an in-memory prefix index of the distinct institute,
+course, subject and tag values, ranked by how many documents use them.
+It backs the typeahead of the search filters and the upload form, so
+users pick existing values instead of mistyping them.
+
+Index Structure:
+- One PrefixIndex per field: a sorted list of case-folded keys searched
+  with bisect, plus a per-prefix memo of the top ranked values
+- Built from the materialized FacetCount table (one query) when the
+  application starts, and rebuilt when older than AUTOCOMPLETE_REFRESH
+  seconds so that changes made by other worker processes show up
+- Updated in place by the catalog hooks on upload, deletion and tag edits,
+  once the change commits (a rolled back change leaves the index alone)
+
+Lookups never touch the database.
+
+Classes:
+- PrefixIndex: Ranked prefix lookup over a set of counted values
+
+Functions:
+- build_autocomplete: Build the per-field indexes from FacetCount
+- init_autocomplete: Build the indexes when the application starts
+- get_autocomplete: Per-application indexes (rebuilt when stale)
+- queue_autocomplete_update: Apply count changes when the transaction commits
+- update_autocomplete: Apply count changes immediately
+- suggest: Ranked completions of a prefix for one field
+"""
+
+# Import standard library modules
+import bisect
+import heapq
+import threading
+import time
+
+# Import Flask and SQLAlchemy components
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+# Import application components
+from app import db
+from app.models import FacetCount
+
+# ============================================================================
+# PREFIX INDEX
+# ============================================================================
+
+# Fields offered for autocompletion (names match the FacetCount facets)
+AUTOCOMPLETE_FIELDS = ('institute', 'course', 'subject', 'tag')
+
+
+class PrefixIndex:
+    """
+    Thread-safe prefix index returning the most used values first.
+
+    Keys are kept in a sorted list, so all values starting with a prefix
+    form one contiguous slice found with two binary searches. The top
+    values of each queried prefix are memoized; a count change only
+    invalidates the memo entries of that value's own prefixes.
+
+    Example:
+        >>> index = PrefixIndex({'Physics': 12, 'Philosophy': 3, 'Law': 5})
+        >>> index.complete('ph')
+        [('Physics', 12), ('Philosophy', 3)]
+    """
+
+    # Largest number of suggestions memoized per prefix
+    MEMO_LIMIT = 20
+
+    def __init__(self, counts=None):
+        self._counts = {}       # value -> document count
+        self._keys = []         # sorted (folded value, value) tuples
+        self._memo = {}         # folded prefix -> top values (MEMO_LIMIT)
+        self._lock = threading.Lock()
+        for value, count in (counts or {}).items():
+            if count > 0:
+                self._counts[value] = count
+        self._keys = sorted((value.casefold(), value) for value in self._counts)
+
+    def add(self, value, delta=1):
+        """
+        Change the document count of a value, inserting or removing it.
+
+        Args:
+            value (str): Field value
+            delta (int): Amount added to the count (negative to subtract)
+        """
+        if not value:
+            return
+        key = (value.casefold(), value)
+        with self._lock:
+            count = self._counts.get(value, 0) + delta
+            if count > 0:
+                if value not in self._counts:
+                    bisect.insort(self._keys, key)
+                self._counts[value] = count
+            elif value in self._counts:
+                del self._counts[value]
+                del self._keys[bisect.bisect_left(self._keys, key)]
+
+            # Forget memoized rankings of every prefix of this value
+            for length in range(len(key[0]) + 1):
+                self._memo.pop(key[0][:length], None)
+
+    def complete(self, prefix, limit=10):
+        """
+        Get the most used values starting with a prefix (case-insensitive).
+
+        Args:
+            prefix (str): Text typed so far
+            limit (int): Maximum number of suggestions (at most MEMO_LIMIT)
+
+        Returns:
+            list: (value, count) tuples, highest count first
+        """
+        folded = prefix.casefold()
+        with self._lock:
+            top = self._memo.get(folded)
+            if top is None:
+                start = bisect.bisect_left(self._keys, (folded,))
+                end = bisect.bisect_left(self._keys, (folded + '\U0010ffff',))
+                top = heapq.nlargest(
+                    self.MEMO_LIMIT,
+                    (value for _, value in self._keys[start:end]),
+                    key=lambda value: (self._counts[value], value)
+                )
+                self._memo[folded] = top
+            return [(value, self._counts[value]) for value in top[:limit]]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._counts)
+
+# ============================================================================
+# APPLICATION INTEGRATION
+# ============================================================================
+
+# Serializes (re)builds within a worker process
+_build_lock = threading.Lock()
+
+# Session.info key of the count changes waiting for the commit
+PENDING_AUTOCOMPLETE_KEY = 'autocomplete_pending'
+
+
+def build_autocomplete():
+    """
+    Build the prefix indexes of all autocomplete fields.
+
+    Reads the materialized catalog counts in a single query.
+
+    Returns:
+        dict: Field name -> PrefixIndex
+    """
+    counts = {field: {} for field in AUTOCOMPLETE_FIELDS}
+    rows = (
+        db.session.query(FacetCount.facet, FacetCount.value, FacetCount.count)
+        .filter(FacetCount.facet.in_(AUTOCOMPLETE_FIELDS), FacetCount.count > 0)
+    )
+    for facet, value, count in rows:
+        counts[facet][value] = count
+    return {field: PrefixIndex(values) for field, values in counts.items()}
+
+
+def _store(app, indexes):
+    """Store built indexes and their build time in app.extensions."""
+    app.extensions['autocomplete'] = (time.monotonic(), indexes)
+
+
+def init_autocomplete(app):
+    """
+    Build the autocomplete indexes when the application starts.
+
+    Does nothing if the database schema does not exist yet (e.g. before
+    init_db.py has run); the indexes are then built on first use.
+
+    Args:
+        app: Flask application instance
+    """
+    with app.app_context():
+        try:
+            _store(app, build_autocomplete())
+        except SQLAlchemyError:
+            db.session.rollback()
+            app.logger.info('Autocomplete index not built: database not initialized')
+
+
+def get_autocomplete():
+    """
+    Get the autocomplete indexes of the current application.
+
+    Indexes older than AUTOCOMPLETE_REFRESH seconds are rebuilt, which
+    picks up uploads handled by other worker processes.
+
+    Returns:
+        dict: Field name -> PrefixIndex
+    """
+    app = current_app._get_current_object()
+    entry = app.extensions.get('autocomplete')
+    max_age = app.config['AUTOCOMPLETE_REFRESH']
+    if entry is None or time.monotonic() - entry[0] > max_age:
+        with _build_lock:
+            entry = app.extensions.get('autocomplete')
+            if entry is None or time.monotonic() - entry[0] > max_age:
+                _store(app, build_autocomplete())
+                entry = app.extensions['autocomplete']
+    return entry[1]
+
+
+def update_autocomplete(field_values, delta):
+    """
+    Apply document count changes to the indexes of this worker process.
+
+    Indexes that have not been built yet are left alone; they will be
+    built from the database with the change already included.
+
+    Args:
+        field_values (dict): Field name -> iterable of values
+        delta (int): +1 when values were added, -1 when removed
+    """
+    entry = current_app.extensions.get('autocomplete')
+    if entry is None:
+        return
+    indexes = entry[1]
+    for field, values in field_values.items():
+        if field in indexes:
+            for value in values:
+                indexes[field].add(value, delta)
+
+
+def queue_autocomplete_update(field_values, delta):
+    """
+    Apply document count changes once the current transaction commits.
+
+    The catalog hooks run before the commit; deferring the change keeps
+    the in-memory index consistent with the database if the transaction
+    is rolled back.
+
+    Args:
+        field_values (dict): Field name -> iterable of values
+        delta (int): +1 when values were added, -1 when removed
+    """
+    pending = db.session.info.setdefault(PENDING_AUTOCOMPLETE_KEY, [])
+    pending.append(({field: list(values) for field, values in field_values.items()}, delta))
+
+
+@event.listens_for(Session, 'after_commit')
+def _update_after_commit(session):
+    """Apply the count changes of the committed transaction."""
+    for field_values, delta in session.info.pop(PENDING_AUTOCOMPLETE_KEY, ()):
+        update_autocomplete(field_values, delta)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_after_rollback(session, previous_transaction):
+    """Forget queued count changes when the transaction is rolled back."""
+    session.info.pop(PENDING_AUTOCOMPLETE_KEY, None)
+
+
+def suggest(field, prefix, limit=10):
+    """
+    Get ranked completions of a prefix for one field.
+
+    Args:
+        field (str): One of AUTOCOMPLETE_FIELDS
+        prefix (str): Text typed so far
+        limit (int): Maximum number of suggestions
+
+    Returns:
+        list: (value, document count) tuples, most used first
+    """
+    return get_autocomplete()[field].complete(prefix, limit)
@@ -0,0 +1,97 @@
+"""
+app/view/catalog.py - Catalog Change Hooks
+
+This module is the single place that keeps the derived search structures
+in sync with the document table. Every code path that adds, deletes or
+re-tags a document calls one of the hooks below inside its transaction,
+before committing.
+
+Derived Structures:
+- Full-text search index (app/view/search_index.py)
+- Materialized facet counts (app/view/facets.py)
+- Catalog generation used in cache keys (CatalogState)
+- In-memory autocomplete indexes of this worker (app/view/autocomplete.py,
+  updated after the commit)
+- Trending rollup rows (app/view/trending.py)
+- Cached recent documents of this worker (app/view/reference_cache.py)
+- Sharded counter rows and viewer sketches (app/counters.py)
+- Blob references of the document store (app/upload/storage.py)
+- Queued background jobs (app/jobs.py)
+
+Functions:
+- document_created: Register a newly uploaded document
+- document_deleted: Unregister a document about to be deleted
+- document_tags_changed: Propagate tags added to / removed from a document
+"""
+
+# Import application components
+from app import db
+from app.models import CatalogState
+from app.view.search_index import index_document, remove_document
+from app.view.facets import update_facet_counts, adjust_facet, document_facet_values
+from app.view.autocomplete import queue_autocomplete_update
+from app.view.trending import remove_document_trend
+from app.view.reference_cache import invalidate_recent_documents
+from app.counters import remove_counter_shards
+from app.jobs import remove_document_jobs
+
+# ============================================================================
+# CATALOG HOOKS
+# ============================================================================
+
+def document_created(doc):
+    """
+    Register a new document with the derived search structures.
+
+    Flushes the session first so the document has an id.
+
+    Args:
+        doc (Document): Newly added document (tags and category assigned)
+    """
+    db.session.flush()
+    index_document(doc)
+    update_facet_counts(doc, +1)
+    queue_autocomplete_update(document_facet_values(doc), +1)
+    invalidate_recent_documents()
+    CatalogState.bump()
+
+
+def document_deleted(doc):
+    """
+    Unregister a document from the derived search structures.
+
+    Must be called before db.session.delete(doc), while the document's
+    tags are still loaded.
+
+    Args:
+        doc (Document): Document about to be deleted
+    """
+    remove_document(doc.id)
+    update_facet_counts(doc, -1)
+    queue_autocomplete_update(document_facet_values(doc), -1)
+    remove_document_trend(doc.id)
+    remove_counter_shards(doc.id)
+    remove_document_jobs(doc.id)
+
+    # Imported here: app.upload imports this module for document_created
+    from app.upload.storage import release_document_file
+    release_document_file(doc)  # File unlinked after commit if unreferenced
+    invalidate_recent_documents()
+    CatalogState.bump()
+
+
+def document_tags_changed(doc, added=(), removed=()):
+    """
+    Propagate a change of a document's tags.
+
+    Args:
+        doc (Document): Re-tagged document (changes already flushed)
+        added (iterable): Names of tags added to the document
+        removed (iterable): Names of tags removed from the document
+    """
+    index_document(doc)
+    adjust_facet('tag', added, +1)
+    adjust_facet('tag', removed, -1)
+    queue_autocomplete_update({'tag': added}, +1)
+    queue_autocomplete_update({'tag': removed}, -1)
+    CatalogState.bump()
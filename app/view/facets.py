@@ -0,0 +1,361 @@
+"""
+app/view/facets.py - Search Facet Counts
+
+This module computes the number of documents per institute, course,
+subject, category and tag shown next to the search filters, so users can
+see how many results each refinement would produce before clicking it.
+
+Computation Strategy:
+- Unfiltered catalog: read from the FacetCount table, which is adjusted
+  incrementally (+1/-1) by the catalog hooks on upload, deletion and tag
+  edits (see app/view/catalog.py), so no aggregation is needed
+- Filtered searches: one grouped COUNT per facet over the filtered
+  Document query, returning only the top FACET_VALUES_LIMIT values
+- Both results are cached in the search cache, keyed by the catalog
+  generation and the normalized filters
+
+Latency Budget:
+All facet queries of a request share a budget of FACET_TIME_BUDGET_MS.
+On SQLite a progress handler interrupts an aggregate that runs past the
+deadline; on other backends the remaining facets are skipped once the
+budget is spent. Facets that could not be computed in time are reported
+as incomplete instead of delaying the search page.
+
+Functions:
+- document_facet_values: Facet values of a single document
+- update_facet_counts / adjust_facet: Incremental maintenance of FacetCount
+- rebuild_facet_counts: Recompute FacetCount from the document table
+- compute_facets: Facet counts for a normalized filter dictionary
+"""
+
+# Import standard library modules
+import time
+from contextlib import contextmanager
+
+# Import Flask CLI and SQLAlchemy helpers
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, func, insert, select, literal, cast
+from sqlalchemy.exc import OperationalError
+
+# Import application components
+from app import db
+from app.models import Document, Tag, CatalogState, FacetCount, document_tags
+from app.view.utils import build_search_query
+from app.view.search_cache import get_search_cache
+
+# ============================================================================
+# FACET DEFINITIONS
+# ============================================================================
+
+# Facets in display order
+FACETS = ('institute', 'course', 'subject', 'category', 'tag')
+
+# Number of SQLite virtual machine instructions between deadline checks
+PROGRESS_HANDLER_STEPS = 10000
+
+
+def _has_value(column):
+    """
+    Build a criterion excluding documents without a value in a facet column.
+
+    Text columns also exclude the empty string; the check is only applied to
+    String columns, since comparing an integer column (category_id) with ''
+    is an error on stricter backends such as PostgreSQL.
+
+    Args:
+        column: Facet column
+
+    Returns:
+        SQLAlchemy criterion
+    """
+    if isinstance(column.type, db.String):
+        return and_(column.isnot(None), column != '')
+    return column.isnot(None)
+
+
+class FacetCounts:
+    """
+    Facet counts for one search.
+
+    Attributes:
+        counts (dict): Facet name -> list of (value, count), most frequent first.
+                       Category values are category ids (int).
+        incomplete (set): Facets that were not computed within the time budget
+    """
+
+    def __init__(self, counts, incomplete=()):
+        self.counts = counts
+        self.incomplete = set(incomplete)
+
+    @property
+    def complete(self):
+        """bool: True if every facet was computed."""
+        return not self.incomplete
+
+
+def document_facet_values(doc):
+    """
+    Get the facet values of a document.
+
+    Args:
+        doc (Document): Document with category id and tags loaded
+
+    Returns:
+        dict: Facet name -> list of string values
+    """
+    values = {
+        'institute': [doc.institute] if doc.institute else [],
+        'course':    [doc.course] if doc.course else [],
+        'subject':   [doc.subject] if doc.subject else [],
+        'category':  [str(doc.category_id)] if doc.category_id else [],
+        'tag':       [tag.name for tag in doc.tags],
+    }
+    return values
+
+# ============================================================================
+# INCREMENTAL MAINTENANCE
+# ============================================================================
+
+def adjust_facet(facet, values, delta):
+    """
+    Add delta to the catalog count of each facet value.
+
+    Runs in the current transaction; the caller commits. Uses an atomic
+    UPDATE and creates missing rows for positive deltas.
+
+    Args:
+        facet (str): Facet name (see FACETS)
+        values (iterable): Facet values to adjust
+        delta (int): Amount to add (+1 on add, -1 on removal)
+    """
+    for value in values:
+        updated = db.session.execute(
+            db.update(FacetCount)
+            .where(FacetCount.facet == facet, FacetCount.value == value)
+            .values(count=FacetCount.count + delta)
+        ).rowcount
+        if not updated and delta > 0:
+            db.session.add(FacetCount(facet=facet, value=value, count=delta))
+
+
+def update_facet_counts(doc, delta):
+    """
+    Add or remove a document's contribution to the catalog facet counts.
+
+    Args:
+        doc (Document): Document being added or deleted
+        delta (int): +1 when the document is added, -1 when it is deleted
+    """
+    for facet, values in document_facet_values(doc).items():
+        adjust_facet(facet, values, delta)
+
+
+def rebuild_facet_counts():
+    """
+    Recompute all catalog facet counts from the document table.
+
+    Useful for databases created before facet counts existed, or to
+    repair counts after documents were changed outside the application.
+
+    Returns:
+        int: Number of facet values stored
+    """
+    db.session.execute(db.delete(FacetCount))
+
+    grouped_columns = {
+        'institute': Document.institute,
+        'course':    Document.course,
+        'subject':   Document.subject,
+        'category':  Document.category_id,
+    }
+    for facet, column in grouped_columns.items():
+        # Facet values are stored as text (category ids included)
+        value = column if isinstance(column.type, db.String) else cast(column, db.String)
+        db.session.execute(
+            insert(FacetCount).from_select(
+                ['facet', 'value', 'count'],
+                select(literal(facet), value, func.count(Document.id))
+                .where(_has_value(column))
+                .group_by(column)
+            )
+        )
+
+    db.session.execute(
+        insert(FacetCount).from_select(
+            ['facet', 'value', 'count'],
+            select(literal('tag'), Tag.name, func.count(document_tags.c.document_id))
+            .join(document_tags, document_tags.c.tag_id == Tag.id)
+            .group_by(Tag.name)
+        )
+    )
+
+    db.session.commit()
+    return FacetCount.query.count()
+
+# ============================================================================
+# FACET COMPUTATION
+# ============================================================================
+
+@contextmanager
+def _statement_deadline(deadline):
+    """
+    Interrupt SQLite statements that are still running past the deadline.
+
+    Installs a progress handler on the session's DBAPI connection; an
+    interrupted statement raises OperationalError. Does nothing on other
+    database backends.
+
+    Args:
+        deadline (float): time.monotonic() value after which to interrupt
+    """
+    connection = db.session.connection()
+    if connection.dialect.name != 'sqlite':
+        yield
+        return
+
+    dbapi_connection = connection.connection.dbapi_connection
+    dbapi_connection.set_progress_handler(
+        lambda: time.monotonic() > deadline, PROGRESS_HANDLER_STEPS
+    )
+    try:
+        yield
+    finally:
+        dbapi_connection.set_progress_handler(None, 0)
+
+
+def _catalog_facet(facet, limit):
+    """
+    Read the top values of a facet for the unfiltered catalog.
+
+    Args:
+        facet (str): Facet name
+        limit (int): Maximum number of values
+
+    Returns:
+        list: (value, count) tuples, most frequent first
+    """
+    rows = (
+        db.session.query(FacetCount.value, FacetCount.count)
+        .filter(FacetCount.facet == facet, FacetCount.count > 0)
+        .order_by(FacetCount.count.desc())
+        .limit(limit)
+        .all()
+    )
+    return [(value, count) for value, count in rows]
+
+
+def _filtered_facet(facet, filters, limit):
+    """
+    Count the top values of a facet over a filtered search.
+
+    Issues a single grouped aggregate over the filtered Document query.
+
+    Args:
+        facet (str): Facet name
+        filters (dict): Normalized filter dictionary
+        limit (int): Maximum number of values
+
+    Returns:
+        list: (value, count) tuples, most frequent first
+    """
+    query = build_search_query(filters)
+    if facet == 'tag':
+        column = Tag.name
+        query = query.join(Document.tags)
+    elif facet == 'category':
+        column = Document.category_id
+    else:
+        column = getattr(Document, facet)
+
+    doc_count = func.count(Document.id)
+    rows = (
+        query.with_entities(column, doc_count)
+        .filter(_has_value(column))
+        .group_by(column)
+        .order_by(doc_count.desc())
+        .limit(limit)
+        .all()
+    )
+    return [(value, count) for value, count in rows]
+
+
+def _compute_facets(filters):
+    """
+    Compute all facets within the configured time budget.
+
+    Args:
+        filters (dict): Normalized filter dictionary
+
+    Returns:
+        FacetCounts: Counts of the facets computed in time
+    """
+    limit = current_app.config['FACET_VALUES_LIMIT']
+    deadline = time.monotonic() + current_app.config['FACET_TIME_BUDGET_MS'] / 1000.0
+
+    counts, incomplete = {}, set()
+    for facet in FACETS:
+        if time.monotonic() > deadline:
+            incomplete.add(facet)
+            continue
+        try:
+            with _statement_deadline(deadline):
+                if filters:
+                    counts[facet] = _filtered_facet(facet, filters, limit)
+                else:
+                    counts[facet] = _catalog_facet(facet, limit)
+        except OperationalError:
+            # Only swallow interruptions caused by the deadline
+            if time.monotonic() <= deadline:
+                raise
+            incomplete.add(facet)
+
+    # Catalog counts store category ids as text
+    if 'category' in counts and not filters:
+        counts['category'] = [(int(value), count) for value, count in counts['category']]
+
+    return FacetCounts(counts, incomplete)
+
+
+def compute_facets(filters, generation=None):
+    """
+    Get facet counts for a search, served from cache when possible.
+
+    Results missing facets because of the time budget are not cached, so
+    the next request tries again.
+
+    Args:
+        filters (dict): Normalized filter dictionary (see normalize_filters)
+        generation (int): Catalog generation; read from the database if omitted
+
+    Returns:
+        FacetCounts: Facet counts for the filtered document set
+    """
+    if generation is None:
+        generation = CatalogState.current_generation()
+
+    cache = get_search_cache()
+    key = ('facets', generation, tuple(sorted(filters.items())))
+
+    facets = cache.get(key)
+    if facets is None:
+        facets = _compute_facets(filters)
+        if facets.complete:
+            cache.set(key, facets)
+    return facets
+
+# ============================================================================
+# CLI COMMANDS
+# ============================================================================
+
+# Command group registered in the application factory:
+#   flask facets rebuild
+facets_cli = AppGroup('facets', help='Manage the materialized search facet counts.')
+
+
+@facets_cli.command('rebuild')
+def rebuild_command():
+    """Recompute the catalog facet counts from the document table."""
+    count = rebuild_facet_counts()
+    click.echo(f'Stored counts for {count} facet values.')
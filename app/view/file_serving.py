@@ -0,0 +1,380 @@
+"""
+app/view/file_serving.py - Document File Responses
+
+This module builds the HTTP responses for document downloads and
+previews. Responses are cache- and resume-friendly:
+
+- Strong ETag taken from the stored SHA-256 content hash, so conditional
+  requests (If-None-Match) are answered with 304 Not Modified
+- Single byte ranges (206 Partial Content), used by resumed downloads
+- Multiple byte ranges (206 multipart/byteranges), used by PDF viewers
+  that fetch only the pages they display
+- If-Range, so a resumed download of a replaced file restarts cleanly
+- 416 Range Not Satisfiable for ranges outside the file
+
+Offload:
+With FILE_OFFLOAD set to 'x-accel-redirect' (nginx) or 'x-sendfile'
+(Apache, lighttpd) the worker only authenticates, answers 304s and
+counts; the front proxy sends the file and handles byte ranges. When
+FILE_OFFLOAD is unset, files are streamed in-process as described above.
+
+Counting:
+The caller is told whether a response is a new logical fetch of the
+document: a full 200 response or a range starting at the first byte.
+Resumed chunks, later ranges, 304 responses and HEAD requests are not
+counted, so one download bumps the counter exactly once.
+
+Functions:
+- document_path: Absolute path of a document's file
+- download_name: File name presented to the browser
+- ensure_file_metadata: Stored hash and size, computed for older documents
+- serve_document: File response for a download or preview request
+- offload_headers: X-Accel-Redirect / X-Sendfile header for a document
+"""
+
+# Import standard library modules
+import mimetypes
+import os
+import uuid
+from urllib.parse import quote
+
+# Import Flask and Werkzeug components
+from flask import current_app, request, send_file, abort, Response
+from werkzeug.security import safe_join
+
+# Import application components
+from app.upload.utils import file_sha256
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Most ranges honoured in one multipart request; larger requests get the
+# whole file (200) rather than hundreds of tiny parts
+MAX_BYTE_RANGES = 16
+
+# Read size used when streaming ranges (64 KB)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Supported FILE_OFFLOAD modes
+OFFLOAD_MODES = ('x-accel-redirect', 'x-sendfile')
+
+# ============================================================================
+# FILE LOOKUP
+# ============================================================================
+
+def document_path(doc):
+    """
+    Get the absolute path of a document's file inside UPLOAD_FOLDER.
+
+    Args:
+        doc (Document): Document whose file to locate
+
+    Returns:
+        str: Absolute path, or None if the stored name escapes UPLOAD_FOLDER
+    """
+    return safe_join(current_app.config['UPLOAD_FOLDER'], doc.filename)
+
+
+def download_name(doc):
+    """
+    Get the file name presented to the browser for a document.
+
+    Content-addressed files are stored under their hash, so the name
+    (and the content type guessed from it) comes from the uploaded name.
+
+    Args:
+        doc (Document): Document being served
+
+    Returns:
+        str: Original file name, or the stored file's name for older documents
+    """
+    return doc.original_filename or os.path.basename(doc.filename)
+
+
+def ensure_file_metadata(doc, path):
+    """
+    Fill in the content hash and size of older documents.
+
+    Uploads record both, so serving needs no filesystem metadata calls.
+    Documents uploaded before that get them computed on first access.
+    The values are set on the document; the caller commits.
+
+    Args:
+        doc (Document): Document being served
+        path (str): Absolute path of its file (must exist)
+    """
+    if not doc.content_hash:
+        doc.content_hash = file_sha256(path)
+    if doc.file_size is None:
+        doc.file_size = os.path.getsize(path)
+
+# ============================================================================
+# RANGE HANDLING
+# ============================================================================
+
+def _resolve_ranges(byte_ranges, length):
+    """
+    Convert parsed Range header ranges into absolute byte offsets.
+
+    Args:
+        byte_ranges (list): (start, stop) tuples from werkzeug's Range;
+                            stop is exclusive, suffix ranges have a
+                            negative start and no stop
+        length (int): File size in bytes
+
+    Returns:
+        list: Satisfiable (start, stop) tuples with 0 <= start < stop <= length,
+              in request order
+    """
+    resolved = []
+    for start, stop in byte_ranges:
+        if start < 0:
+            # Suffix range: the last -start bytes
+            start, stop = max(length + start, 0), length
+        else:
+            stop = length if stop is None else min(stop, length)
+        if start < stop:
+            resolved.append((start, stop))
+    return resolved
+
+
+def _if_range_matches(etag):
+    """
+    Check the If-Range precondition of the current request.
+
+    Args:
+        etag (str): Current strong ETag of the file
+
+    Returns:
+        bool: True if ranges may be served (no If-Range, or it names
+              the current ETag)
+    """
+    if_range = request.if_range
+    if not if_range.etag and not if_range.date:
+        return True
+    return if_range.etag == etag
+
+
+def _multipart_response(path, ranges, length, mimetype):
+    """
+    Build a 206 multipart/byteranges response for several ranges.
+
+    The body is streamed from the file part by part; Content-Length is
+    computed up front from the part headers.
+
+    Args:
+        path (str): Absolute path of the file
+        ranges (list): Resolved (start, stop) tuples
+        length (int): File size in bytes
+        mimetype (str): Content type of every part
+
+    Returns:
+        Response: Streaming 206 response
+    """
+    boundary = uuid.uuid4().hex
+    headers = [
+        (
+            f'\r\n--{boundary}\r\n'
+            f'Content-Type: {mimetype}\r\n'
+            f'Content-Range: bytes {start}-{stop - 1}/{length}\r\n\r\n'
+        ).encode('ascii')
+        for start, stop in ranges
+    ]
+    closing = f'\r\n--{boundary}--\r\n'.encode('ascii')
+    content_length = (
+        sum(len(header) for header in headers)
+        + sum(stop - start for start, stop in ranges)
+        + len(closing)
+    )
+
+    def generate():
+        with open(path, 'rb') as f:
+            for header, (start, stop) in zip(headers, ranges):
+                yield header
+                f.seek(start)
+                remaining = stop - start
+                while remaining:
+                    chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+        yield closing
+
+    response = Response(
+        generate(),
+        status=206,
+        mimetype=f'multipart/byteranges; boundary={boundary}',
+        direct_passthrough=True
+    )
+    response.content_length = content_length
+    return response
+
+# ============================================================================
+# PROXY OFFLOAD
+# ============================================================================
+
+def offload_headers(doc, path):
+    """
+    Get the header that tells the front proxy which file to send.
+
+    Args:
+        doc (Document): Document being served
+        path (str): Absolute path of its file
+
+    Returns:
+        dict: One header (X-Accel-Redirect or X-Sendfile), or an empty
+              dict when FILE_OFFLOAD is unset
+
+    Raises:
+        ValueError: If FILE_OFFLOAD names an unsupported mode
+    """
+    mode = current_app.config.get('FILE_OFFLOAD')
+    if not mode:
+        return {}
+    mode = mode.lower()
+    if mode == 'x-accel-redirect':
+        # Internal URI of the file under the proxy's protected location
+        prefix = current_app.config['FILE_OFFLOAD_PREFIX'].rstrip('/')
+        return {'X-Accel-Redirect': f"{prefix}/{quote(doc.filename.replace(os.sep, '/'))}"}
+    if mode == 'x-sendfile':
+        return {'X-Sendfile': path}
+    raise ValueError(f'Unsupported FILE_OFFLOAD mode {mode!r}; expected one of {OFFLOAD_MODES}')
+
+
+def _offload_response(doc, path, etag, mimetype, as_attachment):
+    """
+    Build an empty response that hands the file to the front proxy.
+
+    Conditional requests are still answered here (304 without touching
+    the proxy); ranges are served by the proxy from the original
+    request headers.
+
+    Args:
+        doc (Document): Document being served
+        path (str): Absolute path of its file
+        etag (str): Strong ETag of the file
+        mimetype (str): Content type of the file
+        as_attachment (bool): True to force a download, False to display inline
+
+    Returns:
+        tuple: (Response, bool) - the response and whether it starts a new
+               logical fetch that should be counted
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(mimetype=mimetype, headers=offload_headers(doc, path))
+        response.headers.set(
+            'Content-Disposition',
+            'attachment' if as_attachment else 'inline',
+            filename=download_name(doc)
+        )
+    response.set_etag(etag)
+    response.accept_ranges = 'bytes'
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+    # The proxy serves the range the client asked for: count the first one only
+    byte_range = request.range
+    counted = (
+        response.status_code == 200 and request.method == 'GET'
+        and (byte_range is None or not byte_range.ranges or byte_range.ranges[0][0] == 0)
+    )
+    return response, counted
+
+# ============================================================================
+# RESPONSES
+# ============================================================================
+
+def serve_document(doc, as_attachment):
+    """
+    Build the file response for a document download or preview.
+
+    Single ranges, conditional requests and full responses are handled
+    by Flask's send_file (conditional=True) with the strong content-hash
+    ETag; requests for several ranges are answered here with a
+    multipart/byteranges body. With FILE_OFFLOAD set, the file itself is
+    sent by the front proxy instead.
+
+    Args:
+        doc (Document): Document to serve
+        as_attachment (bool): True to force a download, False to display inline
+
+    Returns:
+        tuple: (Response, bool) - the response and whether it starts a new
+               logical fetch that should be counted
+
+    Example:
+        >>> response, counted = serve_document(doc, as_attachment=True)
+        >>> if counted:
+        ...     count_download(doc.id)
+    """
+    path = document_path(doc)
+    if path is None:
+        abort(404)
+
+    # Offloaded responses are built from the stored metadata alone; the
+    # file is only checked when it is sent here or its metadata is missing
+    offload = bool(current_app.config.get('FILE_OFFLOAD'))
+    if not offload or not doc.content_hash or doc.file_size is None:
+        if not os.path.isfile(path):
+            abort(404)
+        ensure_file_metadata(doc, path)
+
+    etag = doc.content_hash
+    length = doc.file_size
+    mimetype = mimetypes.guess_type(download_name(doc))[0] or 'application/octet-stream'
+    is_get = request.method == 'GET'
+
+    if offload:
+        return _offload_response(doc, path, etag, mimetype, as_attachment)
+
+    byte_range = request.range
+    not_modified = request.if_none_match.contains(etag)
+    if (
+        byte_range is not None and byte_range.units == 'bytes'
+        and 1 < len(byte_range.ranges) <= MAX_BYTE_RANGES
+        and not not_modified and _if_range_matches(etag)
+    ):
+        ranges = _resolve_ranges(byte_range.ranges, length)
+        if not ranges:
+            response = Response(status=416)
+            response.headers['Content-Range'] = f'bytes */{length}'
+            counted = False
+        elif len(ranges) == 1:
+            # Only one satisfiable part: send_file answers with the whole file
+            response, counted = None, False
+        else:
+            response = _multipart_response(path, ranges, length, mimetype)
+            counted = is_get and ranges[0][0] == 0
+        if response is not None:
+            response.set_etag(etag)
+            response.accept_ranges = 'bytes'
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response, counted
+
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name(doc),
+        etag=etag,            # Strong validator: changes only with the content
+        conditional=True,     # If-None-Match (304), Range (206), If-Range
+        max_age=None
+    )
+    # Advertise range support on full responses too, so clients can resume
+    response.accept_ranges = 'bytes'
+    # Logged-in content: browsers may keep it but must revalidate (cheap 304)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+
+    if response.status_code == 200:
+        counted = is_get
+    elif response.status_code == 206:
+        counted = is_get and response.content_range.start == 0
+    else:
+        counted = False
+    return response, counted
@@ -0,0 +1,114 @@
+"""
+app/view/reference_cache.py - Cached Reference Data for Listing Pages
+
+This module caches the small, rarely changing data every search page
+request needs: the category list and the recently uploaded documents.
+Without it both are queried on each request, even when no filter was
+submitted.
+
+Caching Strategy:
+- Process-local LRU cache with a short TTL (REFERENCE_CACHE_TTL)
+- Explicit invalidation in this worker on upload, deletion and category
+  creation (called from the catalog hooks and the upload route)
+- Other workers pick up changes when their entries expire
+- Values are plain data (named tuples and dictionaries), never ORM
+  objects, so cached entries are safe to use outside their session
+
+Functions:
+- get_cached_categories: Categories ordered by name
+- get_cached_recent_documents: Recently uploaded documents as dictionaries
+- invalidate_categories / invalidate_recent_documents: Invalidation hooks
+"""
+
+# Import standard library modules
+from collections import namedtuple
+
+# Import Flask components
+from flask import current_app
+
+# Import application components
+from app.cache import get_cache
+from app.models import Category
+from app.view.utils import get_recent_documents, document_to_dict
+
+# ============================================================================
+# CACHE ACCESS
+# ============================================================================
+
+# Lightweight, session-independent category entry
+CategoryEntry = namedtuple('CategoryEntry', ['id', 'name'])
+
+# Cache keys
+CATEGORIES_KEY = 'categories'
+RECENT_DOCUMENTS_KEY = 'recent_documents'
+
+# Fields kept for each recent document
+RECENT_DOCUMENT_FIELDS = (
+    'id', 'title', 'course', 'institute', 'subject', 'author', 'category', 'upload_date'
+)
+
+# Number of recent documents cached (larger requests are not cached)
+RECENT_DOCUMENTS_CACHED = 20
+
+
+def _reference_cache():
+    """
+    Get the reference data cache of the current application.
+
+    Returns:
+        LRUCache: Process-local cache created from REFERENCE_CACHE_TTL
+    """
+    return get_cache('reference', maxsize=32, ttl=current_app.config['REFERENCE_CACHE_TTL'])
+
+
+def get_cached_categories():
+    """
+    Get all categories ordered by name, served from cache when possible.
+
+    Returns:
+        list: CategoryEntry(id, name) tuples
+    """
+    return _reference_cache().get_or_set(
+        CATEGORIES_KEY,
+        lambda: [
+            CategoryEntry(category.id, category.name)
+            for category in Category.query.order_by(Category.name).all()
+        ]
+    )
+
+
+def get_cached_recent_documents(limit=5):
+    """
+    Get the most recently uploaded documents, served from cache when possible.
+
+    Args:
+        limit (int): Maximum number of documents
+
+    Returns:
+        list: Document dictionaries (see RECENT_DOCUMENT_FIELDS), newest first
+    """
+    if limit > RECENT_DOCUMENTS_CACHED:
+        return [document_to_dict(doc, RECENT_DOCUMENT_FIELDS)
+                for doc in get_recent_documents(limit)]
+
+    recent = _reference_cache().get_or_set(
+        RECENT_DOCUMENTS_KEY,
+        lambda: [
+            document_to_dict(doc, RECENT_DOCUMENT_FIELDS)
+            for doc in get_recent_documents(RECENT_DOCUMENTS_CACHED)
+        ]
+    )
+    return recent[:limit]
+
+# ============================================================================
+# INVALIDATION HOOKS
+# ============================================================================
+
+def invalidate_categories():
+    """Forget the cached category list (call when a category is created)."""
+    _reference_cache().delete(CATEGORIES_KEY)
+
+
+def invalidate_recent_documents():
+    """Forget the cached recent documents (call on upload and deletion)."""
+    _reference_cache().delete(RECENT_DOCUMENTS_KEY)
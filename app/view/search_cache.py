@@ -0,0 +1,149 @@
+"""
+app/view/search_cache.py - Search Result Cache
+
+This module caches the document ids of search result pages so that the
+same filter combinations, which are repeated constantly during exam
+season, do not hit the filtering query again.
+
+Caching Strategy:
+- Key: catalog generation + normalized filters + sort order + page
+  cursor + page size
+- Value: ordered document ids of the page and its next/prev cursors
+- Eviction: LRU with a TTL (SEARCH_CACHE_SIZE / SEARCH_CACHE_TTL)
+- Invalidation: upload, deletion and metadata edits bump the catalog
+  generation (CatalogState.bump), so entries for an older catalog are
+  never looked up again and simply age out of the LRU
+
+On a hit the page is hydrated with a single query by primary key.
+
+Functions:
+- normalize_filters: Canonical form of a search filter dictionary
+- get_search_cache: Per-application cache instance
+- cached_search_page: Cached equivalent of keyset_paginate for searches
+"""
+
+# Import Flask components
+from flask import current_app
+
+# Import application components
+from app.cache import get_cache
+from app.models import Document, CatalogState
+from app.view.utils import paginate_search, load_listing, KeysetPage
+
+# ============================================================================
+# FILTER NORMALIZATION
+# ============================================================================
+
+# Filters whose matching is case-insensitive, so case can be folded in the key
+CASE_INSENSITIVE_FILTERS = ('title', 'author')
+
+
+def normalize_filters(filters):
+    """
+    Convert a filter dictionary into its canonical form.
+
+    Strips surrounding whitespace, drops empty values and lower-cases the
+    case-insensitive filters, so equivalent searches share one cache
+    entry. The normalized dictionary is also what gets queried, which
+    keeps cached and uncached results identical.
+
+    Args:
+        filters (dict): Filter dictionary (see get_search_filters)
+
+    Returns:
+        dict: Normalized filters containing only active criteria
+
+    Example:
+        >>> normalize_filters({'title': ' Calculus ', 'course': '', 'category': None})
+        {'title': 'calculus'}
+    """
+    normalized = {}
+    for name, value in filters.items():
+        if isinstance(value, str):
+            value = value.strip()
+            if name in CASE_INSENSITIVE_FILTERS:
+                value = value.lower()
+        if value is None or value == '':
+            continue
+        normalized[name] = value
+    return normalized
+
+# ============================================================================
+# CACHE ACCESS
+# ============================================================================
+
+def get_search_cache():
+    """
+    Get the search result cache of the current application.
+
+    The cache is created on first use from the SEARCH_CACHE_SIZE and
+    SEARCH_CACHE_TTL settings (see app.cache.get_cache).
+
+    Returns:
+        LRUCache: Process-local cache for search result pages
+    """
+    return get_cache(
+        'search',
+        maxsize=current_app.config['SEARCH_CACHE_SIZE'],
+        ttl=current_app.config['SEARCH_CACHE_TTL']
+    )
+
+
+def _hydrate(doc_ids):
+    """
+    Load documents for a list of ids in one query, preserving order.
+
+    Args:
+        doc_ids (list): Ordered document ids
+
+    Returns:
+        list: Documents in the order of doc_ids (missing ids are skipped)
+    """
+    if not doc_ids:
+        return []
+    docs = load_listing(Document.query.filter(Document.id.in_(doc_ids))).all()
+    by_id = {doc.id: doc for doc in docs}
+    return [by_id[doc_id] for doc_id in doc_ids if doc_id in by_id]
+
+
+def cached_search_page(filters, after=None, before=None, per_page=20, generation=None,
+                       sort='relevance'):
+    """
+    Return one page of search results, served from cache when possible.
+
+    Args:
+        filters (dict): Normalized filter dictionary (see normalize_filters)
+        after (str): Keyset cursor of the following page
+        before (str): Keyset cursor of the preceding page
+        per_page (int): Maximum number of results per page
+        generation (int): Catalog generation; read from the database if omitted
+        sort (str): 'relevance', 'newest' or 'rating' (see paginate_search)
+
+    Returns:
+        KeysetPage: Page of Document objects with next/prev cursors
+    """
+    if generation is None:
+        generation = CatalogState.current_generation()
+
+    cache = get_search_cache()
+    key = (
+        generation,
+        tuple(sorted(filters.items())),
+        sort,
+        after,
+        before,
+        per_page,
+    )
+
+    cached = cache.get(key)
+    if cached is not None:
+        # Hit: hydrate the cached ids with a single primary key query
+        doc_ids, next_cursor, prev_cursor = cached
+        return KeysetPage(_hydrate(doc_ids), next_cursor, prev_cursor)
+
+    # Miss: run the filtering query and remember the resulting ids
+    page = paginate_search(
+        filters, sort=sort, after=after, before=before, per_page=per_page
+    )
+    cache.set(key, ([doc.id for doc in page.items], page.next_cursor, page.prev_cursor))
+    return page
@@ -0,0 +1,545 @@
+"""
+app/view/search_index.py - Full-Text Search Index for Documents
+
+This module maintains a full-text index over the searchable document
+metadata so that the search page never has to fall back to a
+`LIKE '%...%'` table scan. On SQLite (the default configuration) the index
+is an FTS5 virtual table; on other database backends the module falls back
+to the original case-insensitive substring matching.
+
+Indexed Columns:
+- title, description, subject, course, institute
+- tags: Space-separated tag names of the document
+
+A second FTS5 table with the trigram tokenizer indexes the title and the
+author's full name. It provides typo-tolerant candidates ("calculs" ->
+"Calculus") that are then ranked by trigram similarity. The tokenizer
+needs SQLite 3.34+; without the table, candidates are found with LIKE.
+
+Functions:
+- search_index_available: Check whether the FTS5 index can be used
+- trigram_supported: Check whether SQLite provides the trigram tokenizer
+- index_document: Insert or refresh a document in the index
+- remove_document: Remove a document from the index
+- rebuild_search_index: Recreate the index from the document table
+- build_match_query: Convert free text into a safe FTS5 MATCH expression
+- full_text_filter: SQL criterion restricting a Document query to matches
+- relevance_ranked: Full-text matches of a Document query with a BM25 score
+- trigram_similarity: Typo-tolerant similarity between a query and a text
+- fuzzy_matches: Similarity-ranked document ids for a misspelled query
+
+The index row id is always the document id, which keeps lookups and
+deletions a single primary key operation.
+"""
+
+# Import standard library modules
+import re
+import sqlite3
+
+# Import Flask CLI and SQLAlchemy helpers (raw DDL, lightweight table constructs)
+import click
+from flask.cli import AppGroup
+from sqlalchemy import DDL, case, event, func, or_, select, text, table, column, literal, literal_column
+from sqlalchemy.orm import joinedload
+
+# Import application components
+from app import db
+from app.models import Document, User
+
+# ============================================================================
+# INDEX DEFINITION
+# ============================================================================
+
+# Name of the FTS5 virtual table holding the search index
+FTS_TABLE = 'document_fts'
+
+# Lightweight table construct used to build queries against the index.
+# It is intentionally NOT part of db.metadata: the virtual table is created
+# by the DDL below, not by SQLAlchemy's regular CREATE TABLE logic.
+document_fts = table(
+    FTS_TABLE,
+    column('rowid'),
+    column('title'),
+    column('description'),
+    column('subject'),
+    column('course'),
+    column('institute'),
+    column('tags'),
+)
+
+# FTS5 table definition
+# - unicode61 with diacritics removal so "Università" matches "universita"
+# - prefix indexes for 2 and 3 characters keep short prefix queries fast
+CREATE_FTS_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    title, description, subject, course, institute, tags,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+DROP_FTS_SQL = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+
+# Relative weight of each indexed column in BM25 relevance ranking, in
+# index column order: title, description, subject, course, institute, tags
+BM25_WEIGHTS = (10.0, 1.0, 3.0, 3.0, 2.0, 5.0)
+
+# Name of the FTS5 trigram table used for typo-tolerant matching
+TRIGRAM_TABLE = 'document_trigram'
+
+document_trigram = table(
+    TRIGRAM_TABLE,
+    column('rowid'),
+    column('title'),
+    column('author'),
+)
+
+# Trigram tokenizer (SQLite 3.34+): every 3-character sequence is a term,
+# so documents sharing many trigrams with a misspelled query are found
+# through the index instead of by scanning titles
+CREATE_TRIGRAM_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_TABLE} USING fts5(
+    title, author,
+    tokenize = 'trigram'
+)
+"""
+
+DROP_TRIGRAM_SQL = f"DROP TABLE IF EXISTS {TRIGRAM_TABLE}"
+
+# SQLite version that introduced the trigram tokenizer
+TRIGRAM_MIN_SQLITE_VERSION = (3, 34, 0)
+
+
+def trigram_supported():
+    """
+    Check whether the SQLite library supports the trigram tokenizer.
+
+    On older SQLite builds the trigram table is not created and fuzzy
+    matching falls back to LIKE lookups (see fuzzy_matches).
+
+    Returns:
+        bool: True if the trigram table can be created
+    """
+    return sqlite3.sqlite_version_info >= TRIGRAM_MIN_SQLITE_VERSION
+
+
+def _trigram_ddl_supported(ddl, target, bind, **kw):
+    """execute_if() callable: only create the trigram table where supported."""
+    return trigram_supported()
+
+
+# Create/drop the virtual tables together with the regular tables
+# (db.create_all() / db.drop_all()), but only on SQLite
+event.listen(db.metadata, 'after_create', DDL(CREATE_FTS_SQL).execute_if(dialect='sqlite'))
+event.listen(db.metadata, 'after_create', DDL(CREATE_TRIGRAM_SQL).execute_if(
+    dialect='sqlite', callable_=_trigram_ddl_supported
+))
+for _drop_sql in (DROP_FTS_SQL, DROP_TRIGRAM_SQL):
+    event.listen(db.metadata, 'before_drop', DDL(_drop_sql).execute_if(dialect='sqlite'))
+
+# Per-engine cache of the index tables known to exist
+# Avoids querying sqlite_master on every search request. Missing tables are
+# not cached: `flask search-index rebuild` runs in another process, and the
+# web workers must start using the index as soon as it has been created.
+_availability = set()
+
+
+@event.listens_for(db.metadata, 'after_drop')
+def _forget_availability(target, connection, **kw):
+    """Forget the cached index tables when the schema is dropped (db.drop_all())."""
+    _availability.clear()
+
+# ============================================================================
+# INDEX AVAILABILITY
+# ============================================================================
+
+def search_index_available(table_name=FTS_TABLE):
+    """
+    Check whether an FTS5 search index can be used.
+
+    The index is only available on SQLite databases where the virtual
+    table has been created (by db.create_all() or `flask search-index
+    rebuild`). Once found, the table is cached per database engine; until
+    then every call checks sqlite_master again.
+
+    Args:
+        table_name (str): FTS_TABLE or TRIGRAM_TABLE
+
+    Returns:
+        bool: True if full-text queries can be run against the index
+    """
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    if table_name == TRIGRAM_TABLE and not trigram_supported():
+        return False  # Never created on this SQLite build
+
+    key = (str(engine.url), table_name)
+    if key in _availability:
+        return True
+
+    row = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': table_name}
+    ).first()
+    if row is None:
+        return False
+    _availability.add(key)
+    return True
+
+# ============================================================================
+# INDEX MAINTENANCE FUNCTIONS
+# ============================================================================
+
+def _index_values(doc):
+    """
+    Collect the indexed column values for a document.
+
+    Args:
+        doc (Document): Document to index (must have an id)
+
+    Returns:
+        dict: Bind parameters for the index INSERT statement
+    """
+    return {
+        'rowid': doc.id,
+        'title': doc.title or '',
+        'description': doc.description or '',
+        'subject': doc.subject or '',
+        'course': doc.course or '',
+        'institute': doc.institute or '',
+        'tags': ' '.join(tag.name for tag in doc.tags),
+    }
+
+
+def _trigram_values(doc):
+    """
+    Collect the trigram index column values for a document.
+
+    Args:
+        doc (Document): Document to index (must have an id)
+
+    Returns:
+        dict: Bind parameters for the trigram index INSERT statement
+    """
+    author = doc.author
+    return {
+        'rowid': doc.id,
+        'title': doc.title or '',
+        'author': f'{author.first_name} {author.last_name}' if author else '',
+    }
+
+
+def index_document(doc):
+    """
+    Insert or refresh a document in the search index.
+
+    The statements run in the current database session, so the index
+    update is committed (or rolled back) together with the document.
+    The document must already be flushed so that it has an id.
+
+    Args:
+        doc (Document): Document to (re)index
+    """
+    if not search_index_available():
+        return
+
+    remove_document(doc.id)
+    db.session.execute(
+        document_fts.insert().values(**_index_values(doc))
+    )
+    if search_index_available(TRIGRAM_TABLE):
+        db.session.execute(
+            document_trigram.insert().values(**_trigram_values(doc))
+        )
+
+
+def remove_document(doc_id):
+    """
+    Remove a document from the search index.
+
+    Args:
+        doc_id (int): Id of the document to remove
+    """
+    if not search_index_available():
+        return
+
+    db.session.execute(
+        document_fts.delete().where(document_fts.c.rowid == doc_id)
+    )
+    if search_index_available(TRIGRAM_TABLE):
+        db.session.execute(
+            document_trigram.delete().where(document_trigram.c.rowid == doc_id)
+        )
+
+
+def rebuild_search_index():
+    """
+    Recreate the search index from scratch.
+
+    Creates the virtual tables if needed, clears them and re-indexes every
+    document. Useful for databases created before the indexes existed.
+    The trigram table is skipped where SQLite lacks the trigram tokenizer.
+
+    Returns:
+        int: Number of documents indexed
+    """
+    with_trigrams = trigram_supported()
+    db.session.execute(text(CREATE_FTS_SQL))
+    db.session.execute(document_fts.delete())
+    if with_trigrams:
+        db.session.execute(text(CREATE_TRIGRAM_SQL))
+        db.session.execute(document_trigram.delete())
+
+    count = 0
+    query = Document.query.options(joinedload(Document.author)).order_by(Document.id)
+    for doc in query.yield_per(500):
+        db.session.execute(document_fts.insert().values(**_index_values(doc)))
+        if with_trigrams:
+            db.session.execute(document_trigram.insert().values(**_trigram_values(doc)))
+        count += 1
+
+    db.session.commit()
+    return count
+
+# ============================================================================
+# QUERY FUNCTIONS
+# ============================================================================
+
+def build_match_query(raw_query):
+    """
+    Convert user-entered text into a safe FTS5 MATCH expression.
+
+    Every word is quoted (so FTS5 operators typed by users are treated
+    as plain text) and turned into a prefix query, so partial words
+    still match as they did with the old substring search. Words are
+    combined with an implicit AND.
+
+    Args:
+        raw_query (str): Free text entered in the search bar
+
+    Returns:
+        str: MATCH expression, or empty string if no searchable words
+
+    Example:
+        >>> build_match_query('Calc. "II"')
+        '"calc"* "ii"*'
+    """
+    words = re.findall(r'\w+', raw_query.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def full_text_filter(raw_query):
+    """
+    Build a SQL criterion restricting a Document query to search matches.
+
+    Uses the FTS5 index when available; otherwise falls back to a
+    case-insensitive substring match on the document title.
+
+    Args:
+        raw_query (str): Free text entered in the search bar
+
+    Returns:
+        SQLAlchemy criterion usable in Query.filter()
+    """
+    match_query = build_match_query(raw_query)
+
+    if not match_query or not search_index_available():
+        return Document.title.ilike(f"%{raw_query}%")
+
+    matching_ids = (
+        select(document_fts.c.rowid)
+        .where(literal_column(FTS_TABLE).match(match_query))
+    )
+    return Document.id.in_(matching_ids)
+
+def relevance_ranked(query, raw_query):
+    """
+    Restrict a Document query to full-text matches and score them.
+
+    Joins the FTS5 index so SQLite computes a BM25 score per match, with
+    columns weighted by BM25_WEIGHTS (title > tags > subject/course >
+    institute > description). Ordering by the score with a LIMIT lets
+    SQLite keep only the top rows while scanning the matches, so the
+    application never sorts the whole match set.
+
+    Args:
+        query: Document query, possibly already filtered
+        raw_query (str): Free text entered in the search bar
+
+    Returns:
+        tuple: (filtered query, score expression where higher is more
+               relevant), or None if the index cannot rank this query
+    """
+    match_query = build_match_query(raw_query)
+    if not match_query or not search_index_available():
+        return None
+
+    # bm25() is lower for better matches; negate it so that results can be
+    # ordered by descending score like every other listing
+    score = (-func.bm25(literal_column(FTS_TABLE), *BM25_WEIGHTS)).label('relevance')
+    ranked_query = (
+        query.join(document_fts, document_fts.c.rowid == Document.id)
+        .filter(literal_column(FTS_TABLE).match(match_query))
+    )
+    return ranked_query, score
+
+# ============================================================================
+# FUZZY MATCHING
+# ============================================================================
+
+def _word_trigrams(word):
+    """
+    Get the set of 3-character sequences of a word.
+
+    Words shorter than three characters are their own single "trigram",
+    so short words still count when comparing texts.
+
+    Args:
+        word (str): Lower-cased word
+
+    Returns:
+        set: Trigrams of the word
+    """
+    if len(word) < 3:
+        return {word}
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def trigram_similarity(query, text_value):
+    """
+    Measure how closely a text matches a possibly misspelled query.
+
+    Each query word is compared with its most similar word of the text
+    (Jaccard similarity of their trigram sets), and the scores are
+    averaged over the query words. Long titles are therefore not
+    penalized for containing extra words.
+
+    Args:
+        query (str): Text entered in the search bar
+        text_value (str): Document title or author name
+
+    Returns:
+        float: Similarity between 0.0 (unrelated) and 1.0 (all words found)
+
+    Example:
+        >>> round(trigram_similarity('calculs', 'Calculus II - Exam notes'), 2)
+        0.57
+    """
+    query_words = [_word_trigrams(w) for w in re.findall(r'\w+', query.lower())]
+    text_words = [_word_trigrams(w) for w in re.findall(r'\w+', text_value.lower())]
+    if not query_words or not text_words:
+        return 0.0
+
+    total = 0.0
+    for query_trigrams in query_words:
+        total += max(
+            len(query_trigrams & word) / len(query_trigrams | word)
+            for word in text_words
+        )
+    return total / len(query_words)
+
+
+def _like_candidates(trigrams, limit):
+    """
+    Find fuzzy match candidates without the trigram index.
+
+    Documents are ranked by the number of query trigrams contained in
+    their title or author name, tested with LIKE. This scans the document
+    table, so it is only used where the trigram table does not exist.
+
+    Args:
+        trigrams (set): Trigrams of the query
+        limit (int): Maximum number of candidates
+
+    Returns:
+        list: (document id, title, author name) rows
+    """
+    title = func.lower(Document.title)
+    author = func.coalesce(User.first_name + ' ' + User.last_name, '')
+    shared = sum(
+        (
+            case((or_(title.contains(trigram, autoescape=True),
+                      func.lower(author).contains(trigram, autoescape=True)), 1), else_=0)
+            for trigram in sorted(trigrams)
+        ),
+        literal(0)
+    )
+    return db.session.execute(
+        select(Document.id, Document.title, author)
+        .outerjoin(User, Document.user_id == User.id)
+        .where(shared > 0)
+        .order_by(shared.desc(), Document.id.desc())
+        .limit(limit)
+    ).all()
+
+
+def fuzzy_matches(raw_query, limit=10, threshold=0.3, candidates=100):
+    """
+    Find documents whose title or author name resembles a query.
+
+    Candidates are the documents sharing the most query trigrams, found
+    and ranked (BM25, so rare trigrams weigh more) by the trigram index
+    with the top-k taken inside SQLite. Without the trigram table (SQLite
+    older than 3.34, other backends) they are found with LIKE instead
+    (see _like_candidates). Only those candidates are scored with
+    trigram_similarity().
+
+    Args:
+        raw_query (str): Free text entered in the search bar
+        limit (int): Maximum number of matches returned
+        threshold (float): Minimum similarity for a match
+        candidates (int): Number of index candidates scored
+
+    Returns:
+        list: (document id, similarity) tuples, most similar first
+    """
+    trigrams = set()
+    for word in re.findall(r'\w+', raw_query.lower()):
+        if len(word) >= 3:
+            trigrams |= _word_trigrams(word)
+
+    if not trigrams:
+        return []
+
+    if search_index_available(TRIGRAM_TABLE):
+        # Quoted terms OR-ed together: any shared trigram makes a candidate
+        match_query = ' OR '.join(f'"{trigram}"' for trigram in sorted(trigrams))
+        rows = db.session.execute(
+            select(document_trigram.c.rowid, document_trigram.c.title, document_trigram.c.author)
+            .where(literal_column(TRIGRAM_TABLE).match(match_query))
+            .order_by(literal_column('rank'))
+            .limit(candidates)
+        ).all()
+    else:
+        rows = _like_candidates(trigrams, candidates)
+
+    scored = []
+    for doc_id, title, author in rows:
+        similarity = max(
+            trigram_similarity(raw_query, title),
+            trigram_similarity(raw_query, author)
+        )
+        if similarity >= threshold:
+            scored.append((doc_id, similarity))
+
+    scored.sort(key=lambda match: match[1], reverse=True)
+    return scored[:limit]
+
+# ============================================================================
+# CLI COMMANDS
+# ============================================================================
+
+# Command group registered in the application factory:
+#   flask search-index rebuild
+search_index_cli = AppGroup('search-index', help='Manage the document full-text search index.')
+
+
+@search_index_cli.command('rebuild')
+def rebuild_command():
+    """Recreate the full-text search index from the document table."""
+    if db.engine.dialect.name != 'sqlite':
+        click.echo('Full-text index is only supported on SQLite; nothing to do.')
+        return
+    count = rebuild_search_index()
+    click.echo(f'Indexed {count} documents.')
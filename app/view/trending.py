@@ -0,0 +1,199 @@
+"""
+app/view/trending.py - Trending Documents
+
+This module maintains the trending rollup: one TrendingScore row per
+recently active document, holding an exponentially time-decayed sum of
+its downloads, views and favorites.
+
+Scoring:
+- Each event adds TRENDING_WEIGHTS[event] to the document's score
+- Scores halve every TRENDING_HALF_LIFE_HOURS without new activity
+- Forward decay: events are weighted by exp(rate * (t - epoch)) when they
+  are recorded, so existing rows never need to be rewritten as time
+  passes and ordering by the stored score is ordering by trend
+
+Compaction (`flask trending compact`, or automatically once the epoch is
+older than TRENDING_COMPACT_AFTER_HOURS) moves the epoch to the current
+time, rescales the scores and deletes rows below TRENDING_MIN_SCORE.
+
+Functions:
+- record_event: Add a download/view/favorite to a document's score
+- remove_document_trend: Drop the trending row of a deleted document
+- compact_trending: Rebase scores on the current time and prune them
+- get_trending_documents: Top N trending documents (single indexed read)
+"""
+
+# Import standard library modules
+import math
+import time
+
+# Import Flask CLI and SQLAlchemy helpers
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+# Import application components
+from app import db
+from app.models import Document, TrendingScore, TrendingState
+from app.view.utils import load_listing
+
+# ============================================================================
+# SCORE ARITHMETIC
+# ============================================================================
+
+def _decay_rate():
+    """
+    Get the exponential decay rate per second.
+
+    Returns:
+        float: ln(2) divided by the configured half-life in seconds
+    """
+    return math.log(2) / (current_app.config['TRENDING_HALF_LIFE_HOURS'] * 3600.0)
+
+
+def _scale(epoch, now):
+    """
+    Get the factor converting a current-time score into stored units.
+
+    Args:
+        epoch (float): Epoch of the stored scores (Unix time)
+        now (float): Current Unix time
+
+    Returns:
+        float: exp(rate * (now - epoch))
+    """
+    return math.exp(_decay_rate() * (now - epoch))
+
+# ============================================================================
+# EVENT RECORDING
+# ============================================================================
+
+def record_event(document_id, event, count=1):
+    """
+    Add an activity event to a document's trending score.
+
+    Runs in the current transaction; the caller commits. Uses an atomic
+    UPDATE and creates the row on the document's first event.
+
+    Args:
+        document_id (int): Id of the document
+        event (str): 'download', 'view' or 'favorite'
+        count (int): Number of events (batched counter flushes)
+    """
+    now = time.time()
+    epoch = TrendingState.current_epoch(default=now)
+
+    # Rebase before the exponential weights grow too large
+    if now - epoch > current_app.config['TRENDING_COMPACT_AFTER_HOURS'] * 3600.0:
+        compact_trending(now=now)
+        epoch = now
+
+    increment = count * current_app.config['TRENDING_WEIGHTS'][event] * _scale(epoch, now)
+    updated = db.session.execute(
+        db.update(TrendingScore)
+        .where(TrendingScore.document_id == document_id)
+        .values(score=TrendingScore.score + increment)
+    ).rowcount
+    if not updated:
+        db.session.add(TrendingScore(document_id=document_id, score=increment))
+
+
+def remove_document_trend(document_id):
+    """
+    Delete the trending row of a document (called when it is deleted).
+
+    Args:
+        document_id (int): Id of the document
+    """
+    db.session.execute(
+        db.delete(TrendingScore).where(TrendingScore.document_id == document_id)
+    )
+
+# ============================================================================
+# COMPACTION
+# ============================================================================
+
+def compact_trending(now=None):
+    """
+    Move the score epoch to the current time and prune inactive documents.
+
+    Rescales every stored score to current-time units in one UPDATE,
+    then deletes rows whose decayed score fell below TRENDING_MIN_SCORE.
+    Runs in the current transaction; the caller commits.
+
+    Args:
+        now (float): Current Unix time (defaults to time.time())
+
+    Returns:
+        int: Number of pruned rows
+    """
+    now = time.time() if now is None else now
+    epoch = TrendingState.current_epoch(default=now)
+    factor = 1.0 / _scale(epoch, now)
+
+    db.session.execute(
+        db.update(TrendingScore).values(score=TrendingScore.score * factor)
+    )
+    pruned = db.session.execute(
+        db.delete(TrendingScore)
+        .where(TrendingScore.score < current_app.config['TRENDING_MIN_SCORE'])
+    ).rowcount
+    db.session.execute(
+        db.update(TrendingState)
+        .where(TrendingState.id == TrendingState.SINGLETON_ID)
+        .values(epoch=now)
+    )
+    return pruned
+
+# ============================================================================
+# QUERY FUNCTIONS
+# ============================================================================
+
+def get_trending_documents(limit=10):
+    """
+    Get the currently trending documents.
+
+    Reads the top rows of the trending score index joined to their
+    documents, with the usual listing eager loads.
+
+    Args:
+        limit (int): Maximum number of documents to return
+
+    Returns:
+        list: (Document, current score) tuples, most trending first
+
+    Example:
+        >>> for doc, score in get_trending_documents(5):
+        ...     print(doc.title, round(score, 1))
+    """
+    rows = (
+        load_listing(Document.query)
+        .join(TrendingScore, TrendingScore.document_id == Document.id)
+        .add_columns(TrendingScore.score)
+        .order_by(TrendingScore.score.desc())
+        .limit(limit)
+        .all()
+    )
+    if not rows:
+        return []
+
+    # Convert stored scores into current, decayed units for display
+    epoch = db.session.get(TrendingState, TrendingState.SINGLETON_ID).epoch
+    factor = 1.0 / _scale(epoch, time.time())
+    return [(doc, score * factor) for doc, score in rows]
+
+# ============================================================================
+# CLI COMMANDS
+# ============================================================================
+
+# Command group registered in the application factory:
+#   flask trending compact
+trending_cli = AppGroup('trending', help='Maintain the trending documents rollup.')
+
+
+@trending_cli.command('compact')
+def compact_command():
+    """Rebase trending scores on the current time and prune stale rows."""
+    pruned = compact_trending()
+    db.session.commit()
+    click.echo(f'Pruned {pruned} inactive documents.')
@@ -6,20 +6,69 @@ It includes functions for applying dynamic filters, retrieving popular
 and recent documents, and other helper functions for the view module.
 
 Functions:
+- get_search_filters: Extract search filters from request arguments
 - apply_filters: Dynamic query filtering for documents
+- build_search_query: Filtered Document query for a filter dictionary
+- fuzzy_search: Typo-tolerant fallback results for the free-text query
+- keyset_paginate: Cursor-based pagination without OFFSET scans
+- paginate_search: One page of search results, by relevance or newest first
+- parse_api_fields / document_to_dict / documents_to_dicts: Field selection
+  for JSON APIs
+- load_listing: Eager-load relationships rendered on document cards
+- assert_max_queries / enforce_query_budget: Query-count guards for listings
 - get_recent_documents: Retrieve recently uploaded documents
 - get_popular_documents: Retrieve most downloaded documents
+- get_download_history: One page of a user's downloaded documents
 
 These utilities help organize and retrieve documents based on various criteria.
 """
 
-# Import database models
-from app.models import Document, User
+# Import standard library modules
+import base64
+import binascii
+import json
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+# Import Flask and SQLAlchemy components
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, selectinload
+
+# Import application components
+from app import db
+from app.models import Document, User, Tag, user_downloads
+
+# Import full-text search index helpers
+from app.view.search_index import full_text_filter, fuzzy_matches, relevance_ranked
 
 # ============================================================================
 # DOCUMENT FILTERING FUNCTIONS
 # ============================================================================
 
+def get_search_filters(args):
+    """
+    Extract the supported search filters from request arguments.
+
+    Args:
+        args: Request arguments (e.g. request.args MultiDict)
+
+    Returns:
+        dict: Filter dictionary accepted by apply_filters()/build_search_query()
+    """
+    return {
+        'title':      args.get('title'),
+        'institute':  args.get('institute'),
+        'course':     args.get('course'),
+        'subject':    args.get('subject'),
+        'author':     args.get('author'),
+        'min_rating': args.get('min_rating', type=float),
+        'category':   args.get('category', type=int),
+        'tag':        args.get('tag')
+    }
+
+
 def apply_filters(query, filters):
     """
     Apply dynamic filters to a Document query based on provided criteria.
@@ -30,12 +79,14 @@ def apply_filters(query, filters):
     structured data.
     
     Supported Filters:
-    - title: Partial text match (case-insensitive)
+    - title: Full-text match over title, description, subject, course,
+             institute and tags (uses the FTS5 index when available)
     - institute: Exact match for academic institute
     - course: Exact match for course name
     - subject: Exact match for subject area
     - author: Partial match in author's first name (case-insensitive)
-    - min_rating: Minimum rating threshold (if rating system exists)
+    - min_rating: Minimum average rating (indexed rating_average column)
+    - tag: Exact match for one of the document's tag names
     
     Args:
         query: SQLAlchemy query object for Document model
@@ -50,9 +101,10 @@ def apply_filters(query, filters):
         >>> filtered_query = apply_filters(Document.query, filters)
         >>> results = filtered_query.all()
     """
-    # Apply title filter with partial, case-insensitive matching
+    # Apply free-text search through the full-text index
+    # Falls back to partial, case-insensitive title matching without FTS5
     if filters.get('title'):
-        query = query.filter(Document.title.ilike(f"%{filters['title']}%"))
+        query = query.filter(full_text_filter(filters['title']))
     
     # Apply institute filter with exact matching
     if filters.get('institute'):
@@ -73,12 +125,477 @@ def apply_filters(query, filters):
             User.first_name.ilike(f"%{filters['author']}%")
         )
     
-    # Note: min_rating filter implementation would go here if rating system exists
-    # if filters.get('min_rating'):
-    #     query = query.filter(Document.rating >= filters['min_rating'])
+    # Apply tag filter with exact matching on the tag name
+    if filters.get('tag'):
+        query = query.filter(Document.tags.any(Tag.name == filters['tag']))
+    
+    # Apply minimum average rating as a range condition on the indexed
+    # rating_average column (maintained by Document.add_rating)
+    if filters.get('min_rating'):
+        query = query.filter(Document.rating_average >= filters['min_rating'])
     
     return query
 
+
+def build_search_query(filters):
+    """
+    Build the filtered Document query used by the search page and APIs.
+
+    Applies the category filter followed by all apply_filters() criteria.
+
+    Args:
+        filters (dict): Filter dictionary (see get_search_filters)
+
+    Returns:
+        SQLAlchemy query object: Unordered, filtered Document query
+    """
+    # Start with base Document query
+    query = Document.query
+
+    # Apply category filter if specified
+    if filters.get('category'):
+        query = query.filter_by(category_id=filters['category'])
+
+    # Apply other dynamic filters
+    return apply_filters(query, filters)
+
+
+def fuzzy_search(filters, exclude_ids=(), limit=10):
+    """
+    Find documents resembling a misspelled free-text query.
+
+    Used as a fallback when the exact search returns few results. The
+    free-text query is matched against titles and author names through
+    the trigram index; all other filters still apply exactly.
+
+    Args:
+        filters (dict): Normalized filter dictionary with a 'title' query
+        exclude_ids (iterable): Document ids already shown as exact results
+        limit (int): Maximum number of documents returned
+
+    Returns:
+        list: Documents ordered by decreasing similarity
+    """
+    config = current_app.config
+    matches = fuzzy_matches(
+        filters['title'],
+        limit=limit + len(exclude_ids),
+        threshold=config['FUZZY_SIMILARITY_THRESHOLD']
+    )
+    exclude_ids = set(exclude_ids)
+    ranked_ids = [doc_id for doc_id, _ in matches if doc_id not in exclude_ids]
+    if not ranked_ids:
+        return []
+
+    # Apply the remaining exact filters to the candidates in one query
+    other_filters = {name: value for name, value in filters.items() if name != 'title'}
+    docs = load_listing(
+        build_search_query(other_filters).filter(Document.id.in_(ranked_ids))
+    ).all()
+
+    by_id = {doc.id: doc for doc in docs}
+    return [by_id[doc_id] for doc_id in ranked_ids if doc_id in by_id][:limit]
+
+# ============================================================================
+# KEYSET PAGINATION
+# ============================================================================
+
+class KeysetPage:
+    """
+    One page of results produced by keyset_paginate().
+
+    Attributes:
+        items (list): Rows on this page, in display order
+        next_cursor (str): Cursor for the following page (None on the last page)
+        prev_cursor (str): Cursor for the preceding page (None on the first page)
+    """
+
+    def __init__(self, items, next_cursor, prev_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        """bool: True if a following page exists."""
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        """bool: True if a preceding page exists."""
+        return self.prev_cursor is not None
+
+
+def encode_cursor(sort_key, row_id):
+    """
+    Encode a (sort key, id) position as an opaque, URL-safe cursor.
+
+    Args:
+        sort_key (str|float): Sort key value of the boundary row
+        row_id (int): Id of the boundary row
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    raw = json.dumps([sort_key, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor().
+
+    Args:
+        cursor (str): Cursor string from the URL
+
+    Returns:
+        tuple: (sort_key, row_id), or None if the cursor is missing or invalid
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_key, row_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if isinstance(sort_key, bool) or not isinstance(sort_key, (str, int, float)):
+        return None
+    if not isinstance(row_id, int):
+        return None
+    return sort_key, row_id
+
+
+def keyset_paginate(query, sort_column, id_column, after=None, before=None, per_page=20,
+                    compare_as_text=True):
+    """
+    Paginate a query newest-first using keyset (cursor) pagination.
+
+    Rows are ordered by (sort_column DESC, id_column DESC). Instead of
+    OFFSET, each page continues from the boundary row of the previous one
+    with a row-value comparison, so the database seeks directly into the
+    (sort_column, id_column) index and page N costs the same as page 1.
+
+    By default the sort column is compared in its raw stored form
+    (type_coerce to String), which keeps cursors exact on SQLite where
+    server-generated timestamps and Python-bound datetimes use different
+    text formats. Numeric sort expressions such as relevance scores pass
+    compare_as_text=False.
+
+    Args:
+        query: SQLAlchemy query to paginate (must not be ordered already)
+        sort_column: Column to order by (e.g. Document.upload_date)
+        id_column: Unique tie-breaker column (e.g. Document.id)
+        after (str): Cursor; return the page following this position
+        before (str): Cursor; return the page preceding this position
+        per_page (int): Maximum number of rows per page
+        compare_as_text (bool): Compare sort values as stored text
+
+    Returns:
+        KeysetPage: Page with items and next/prev cursors
+
+    Example:
+        >>> page = keyset_paginate(Document.query, Document.upload_date, Document.id)
+        >>> next_page = keyset_paginate(Document.query, Document.upload_date,
+        ...                             Document.id, after=page.next_cursor)
+    """
+    sort_key = db.type_coerce(sort_column, db.String) if compare_as_text else sort_column
+    position = db.tuple_(sort_key, id_column)
+
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+
+    # Fetch one extra row to know whether another page exists
+    query = query.add_columns(sort_key, id_column)
+
+    if before_key is not None:
+        # Walk backwards (ascending) from the cursor, then restore display order
+        rows = (
+            query.filter(position > db.tuple_(*before_key))
+            .order_by(sort_key.asc(), id_column.asc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_prev = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after_key is not None:
+            query = query.filter(position < db.tuple_(*after_key))
+        rows = (
+            query.order_by(sort_key.desc(), id_column.desc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = after_key is not None
+
+    items = [row[0] for row in rows]
+    next_cursor = encode_cursor(*rows[-1][1:]) if rows and has_next else None
+    prev_cursor = encode_cursor(*rows[0][1:]) if rows and has_prev else None
+
+    return KeysetPage(items, next_cursor, prev_cursor)
+
+
+# Result orders accepted by the search page and API
+SEARCH_SORTS = ('relevance', 'newest', 'rating')
+
+
+def paginate_search(filters, sort='relevance', after=None, before=None, per_page=20):
+    """
+    Return one page of search results in the requested order.
+
+    Relevance ordering applies to free-text searches: the full-text
+    engine scores the matches (see relevance_ranked) and the exact
+    filters restrict them in the same query. Rating ordering walks the
+    (rating_score, id) index, best Bayesian score first. Everything else
+    is ordered newest first.
+
+    Args:
+        filters (dict): Filter dictionary (see get_search_filters)
+        sort (str): 'relevance', 'newest' or 'rating'
+        after (str): Keyset cursor of the following page
+        before (str): Keyset cursor of the preceding page
+        per_page (int): Maximum number of results per page
+
+    Returns:
+        KeysetPage: Page of Document objects with next/prev cursors
+    """
+    if sort == 'relevance' and filters.get('title'):
+        other_filters = {name: value for name, value in filters.items() if name != 'title'}
+        ranked = relevance_ranked(
+            load_listing(build_search_query(other_filters)), filters['title']
+        )
+        if ranked is not None:
+            query, score = ranked
+            return keyset_paginate(
+                query, score, Document.id,
+                after=after, before=before, per_page=per_page,
+                compare_as_text=False
+            )
+
+    if sort == 'rating':
+        return keyset_paginate(
+            load_listing(build_search_query(filters)),
+            Document.rating_score, Document.id,
+            after=after, before=before, per_page=per_page,
+            compare_as_text=False
+        )
+
+    return keyset_paginate(
+        load_listing(build_search_query(filters)),
+        Document.upload_date,
+        Document.id,
+        after=after,
+        before=before,
+        per_page=per_page
+    )
+
+# ============================================================================
+# LISTING LOADERS
+# ============================================================================
+
+def load_listing(query):
+    """
+    Apply the shared eager-loading options for document listings.
+
+    Document cards touch doc.author, doc.category and doc.tags. Without
+    eager loading each access costs one query per row (N+1); with these
+    options a listing costs a fixed number of queries regardless of size.
+
+    Args:
+        query: Document query or dynamic relationship
+               (e.g. current_user.favorites)
+
+    Returns:
+        SQLAlchemy query object: Query with eager-loading options applied
+
+    Example:
+        >>> uploads = load_listing(current_user.documents).all()
+    """
+    # Options are built per call: author/category/tags are backrefs that
+    # only exist once the mappers have been configured
+    return query.options(
+        joinedload(Document.author),      # many-to-one: joined into the SELECT
+        joinedload(Document.category),    # many-to-one: joined into the SELECT
+        selectinload(Document.tags),      # many-to-many: one extra SELECT per page
+    )
+
+# ============================================================================
+# QUERY-COUNT GUARDS
+# ============================================================================
+
+class QueryCounter:
+    """
+    Count SQL statements issued by the current thread.
+
+    Listens to the engine's before_cursor_execute event while active.
+    Statements from other threads (concurrent requests) are ignored.
+
+    Attributes:
+        count (int): Number of statements executed so far
+        statements (list): SQL text of each executed statement
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+        self._engine = None
+        self._thread_id = None
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id:
+            self.count += 1
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self._engine = db.engine
+        self._thread_id = threading.get_ident()
+        event.listen(self._engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.remove(self._engine, 'before_cursor_execute', self._on_execute)
+        return False
+
+
+@contextmanager
+def assert_max_queries(limit):
+    """
+    Fail if the enclosed block issues more than `limit` SQL statements.
+
+    Intended for tests guarding listing pages against N+1 regressions.
+
+    Args:
+        limit (int): Maximum number of statements allowed
+
+    Raises:
+        AssertionError: If the block executed more statements than allowed
+
+    Example:
+        >>> with assert_max_queries(10):
+        ...     client.get('/view/favorites')
+    """
+    with QueryCounter() as counter:
+        yield counter
+    if counter.count > limit:
+        statements = '\n'.join(
+            f'  {number}. {statement}'
+            for number, statement in enumerate(counter.statements, 1)
+        )
+        raise AssertionError(
+            f'Expected at most {limit} queries, {counter.count} were issued:\n{statements}'
+        )
+
+
+def enforce_query_budget(view):
+    """
+    Route decorator applying the LISTING_MAX_QUERIES budget to a listing page.
+
+    When the LISTING_MAX_QUERIES setting is configured (e.g. in
+    TestingConfig), every request to the decorated view fails with an
+    AssertionError if it issues more queries than allowed, including
+    lazy loads triggered while rendering the template. When the setting
+    is None (production default) the view runs unchanged.
+
+    Args:
+        view: Flask view function
+
+    Returns:
+        Wrapped view function
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        limit = current_app.config.get('LISTING_MAX_QUERIES')
+        if limit is None:
+            return view(*args, **kwargs)
+        with assert_max_queries(limit):
+            return view(*args, **kwargs)
+    return wrapper
+
+# ============================================================================
+# JSON SERIALIZATION
+# ============================================================================
+
+# Fields clients may request from the JSON APIs, mapped to value getters
+DOCUMENT_API_FIELDS = {
+    'id':          lambda doc: doc.id,
+    'title':       lambda doc: doc.title,
+    'description': lambda doc: doc.description,
+    'course':      lambda doc: doc.course,
+    'institute':   lambda doc: doc.institute,
+    'subject':     lambda doc: doc.subject,
+    'author':      lambda doc: doc.author.full_name if doc.author else "",
+    'category':    lambda doc: doc.category.name if doc.category else "",
+    'upload_date': lambda doc: doc.upload_date.isoformat() if doc.upload_date else None,
+    'downloads':   lambda doc: doc.total_downloads,
+    'views':       lambda doc: doc.total_views,
+}
+
+# Fields read from the (possibly sharded) usage counters
+COUNTER_API_FIELDS = frozenset(('downloads', 'views'))
+
+# Fields returned when the client does not ask for specific ones
+DEFAULT_API_FIELDS = (
+    'id', 'title', 'course', 'institute', 'subject', 'author', 'category', 'downloads'
+)
+
+
+def parse_api_fields(fields_param):
+    """
+    Parse a comma-separated field selection from a query string.
+
+    Unknown field names are ignored; an empty or missing selection
+    returns the default field set.
+
+    Args:
+        fields_param (str): Value of the `fields` parameter (e.g. "id,title")
+
+    Returns:
+        tuple: Field names to serialize, in the requested order
+    """
+    if not fields_param:
+        return DEFAULT_API_FIELDS
+    fields = tuple(
+        name for name in (part.strip() for part in fields_param.split(','))
+        if name in DOCUMENT_API_FIELDS
+    )
+    return fields or DEFAULT_API_FIELDS
+
+
+def document_to_dict(doc, fields=DEFAULT_API_FIELDS):
+    """
+    Convert a document into a JSON-serializable dictionary.
+
+    Args:
+        doc (Document): Document to serialize
+        fields (tuple): Field names to include (see DOCUMENT_API_FIELDS)
+
+    Returns:
+        dict: Selected document fields
+    """
+    return {name: DOCUMENT_API_FIELDS[name](doc) for name in fields}
+
+
+def documents_to_dicts(docs, fields=DEFAULT_API_FIELDS):
+    """
+    Convert a list of documents into JSON-serializable dictionaries.
+
+    Counter fields include the increments still held in counter shards;
+    those are loaded for all documents in one query.
+
+    Args:
+        docs (iterable): Documents to serialize
+        fields (tuple): Field names to include (see DOCUMENT_API_FIELDS)
+
+    Returns:
+        list: Selected fields of each document
+    """
+    docs = list(docs)
+    if COUNTER_API_FIELDS.intersection(fields):
+        Document.load_counter_totals(docs)
+    return [document_to_dict(doc, fields) for doc in docs]
+
 # ============================================================================
 # DOCUMENT RETRIEVAL FUNCTIONS
 # ============================================================================
@@ -101,7 +618,12 @@ def get_recent_documents(limit=5):
         >>> recent_docs = get_recent_documents(10)
         >>> print(f"Found {len(recent_docs)} recent documents")
     """
-    return Document.query.order_by(Document.upload_date.desc()).limit(limit).all()
+    return (
+        load_listing(Document.query)
+        .order_by(Document.upload_date.desc(), Document.id.desc())
+        .limit(limit)
+        .all()
+    )
 
 
 def get_popular_documents(limit=5):
@@ -123,4 +645,39 @@ def get_popular_documents(limit=5):
         >>> for doc in popular_docs:
         ...     print(f"{doc.title}: {doc.downloads} downloads")
     """
-    return Document.query.order_by(Document.downloads.desc()).limit(limit).all()
\ No newline at end of file
+    return Document.query.order_by(Document.downloads.desc()).limit(limit).all()
+
+
+def get_download_history(user, after=None, before=None, per_page=20):
+    """
+    Retrieve one page of the documents a user has downloaded.
+
+    Pages through the (user_id, downloaded_at, document_id) index of
+    user_downloads with keyset pagination, newest download first.
+
+    Args:
+        user (User): User whose history to list
+        after (str): Cursor; return the page following this position
+        before (str): Cursor; return the page preceding this position
+        per_page (int): Maximum number of documents per page
+
+    Returns:
+        KeysetPage: Page of Document objects with next/prev cursors
+
+    Example:
+        >>> page = get_download_history(current_user)
+        >>> older = get_download_history(current_user, after=page.next_cursor)
+    """
+    query = (
+        load_listing(Document.query)
+        .join(user_downloads, user_downloads.c.document_id == Document.id)
+        .filter(user_downloads.c.user_id == user.id)
+    )
+    return keyset_paginate(
+        query,
+        user_downloads.c.downloaded_at,
+        user_downloads.c.document_id,
+        after=after,
+        before=before,
+        per_page=per_page
+    )
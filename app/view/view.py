@@ -19,8 +19,8 @@ Features:
 
 # Import Flask components
 from flask import (
-    render_template, request, send_from_directory, current_app,
-    jsonify, abort, Response
+    render_template, request, current_app,
+    jsonify, abort, Response, stream_with_context
 )
 
 # Import Flask-Login for authentication
@@ -28,11 +28,28 @@ from flask_login import login_required, current_user
 
 # Import additional utilities
 import os
+import json
+from itertools import islice
+from sqlalchemy.orm import joinedload
 
 # Import application components
 from app.view import bp
-from app.models import Document, Category
-from app.view.utils import apply_filters, get_recent_documents, get_popular_documents
+from app.models import Document, CatalogState, ViewerSketch, Job
+from app.view.utils import (
+    get_search_filters, build_search_query, load_listing, fuzzy_search, SEARCH_SORTS,
+    enforce_query_budget, parse_api_fields, documents_to_dicts,
+    get_popular_documents, get_download_history
+)
+from app.view.search_cache import normalize_filters, cached_search_page
+from app.view.facets import compute_facets
+from app.view.catalog import document_deleted
+from app.view.autocomplete import AUTOCOMPLETE_FIELDS, PrefixIndex, suggest
+from app.view.search_index import relevance_ranked
+from app.view.trending import record_event, get_trending_documents
+from app.view.reference_cache import get_cached_categories, get_cached_recent_documents
+from app.view.file_serving import serve_document
+from app.cache import cache_stats
+from app.counters import count_download, count_view, counter_stats
 from app import db
 
 # ============================================================================
@@ -40,6 +57,7 @@ from app import db
 # ============================================================================
 
 @bp.route('/', methods=['GET'])
+@enforce_query_budget
 def search():
     """
     Display search page and handle document filtering with advanced options.
@@ -57,8 +75,14 @@ def search():
         course: Exact match for course name
         subject: Exact match for subject area
         author: Partial match in author's first name
-        min_rating: Minimum rating threshold (if implemented)
+        min_rating: Minimum average rating (1-5)
         category: Category ID for category-based filtering
+        tag: Exact tag name
+        sort: 'relevance' (default, for free-text searches), 'newest'
+              or 'rating' (best Bayesian rating score first)
+        after: Cursor of the page to continue from (next page)
+        before: Cursor of the page to go back from (previous page)
+        per_page: Results per page (capped at SEARCH_MAX_PAGE_SIZE)
     
     Features:
     - Dynamic query building based on provided filters
@@ -69,67 +93,111 @@ def search():
     
     Returns:
         Rendered search template with:
-        - Filtered document results
+        - One page of filtered document results (most relevant or newest first)
+        - Similar documents when an exact title search finds few results
+        - Keyset pagination cursors for next/previous pages
         - Recent documents for discovery
+        - Trending documents
         - User favorites (if authenticated)
         - Applied filters for form persistence
         - Available categories for filtering
+        - Facet counts for refining the search
     """
     # ========================================================================
     # LOAD CATEGORIES FOR FILTER DROPDOWN
     # ========================================================================
     
     # Load all categories ordered alphabetically for filter dropdown
-    categories = Category.query.order_by(Category.name).all()
+    # (cached per worker; invalidated when a category is created)
+    categories = get_cached_categories()
 
     # ========================================================================
     # COLLECT AND PROCESS FILTERS FROM QUERY PARAMETERS
     # ========================================================================
     
     # Extract filter parameters from URL query string
-    filters = {
-        'title':      request.args.get('title'),
-        'institute':  request.args.get('institute'),
-        'course':     request.args.get('course'),
-        'subject':    request.args.get('subject'),
-        'author':     request.args.get('author'),
-        'min_rating': request.args.get('min_rating', type=float),
-        'category':   request.args.get('category', type=int)
-    }
+    filters = get_search_filters(request.args)
+    normalized_filters = normalize_filters(filters)
+
+    # Catalog generation shared by the result and facet cache keys
+    generation = CatalogState.current_generation()
 
     # ========================================================================
-    # APPLY FILTERS AND RETRIEVE DOCUMENTS
+    # RETRIEVE ONE PAGE OF RESULTS
     # ========================================================================
-    
-    # Start with base Document query
-    docs_query = Document.query
-    
-    # Apply category filter if specified
-    if filters.get('category'):
-        docs_query = docs_query.filter_by(category_id=filters['category'])
-    
-    # Apply other dynamic filters using utility function
-    docs_query = apply_filters(docs_query, filters)
-    
-    # Execute query to get filtered results
-    results = docs_query.all()
+
+    # Determine page size from query string, bounded by configuration
+    per_page = request.args.get(
+        'per_page', current_app.config['SEARCH_PAGE_SIZE'], type=int
+    )
+    per_page = max(1, min(per_page, current_app.config['SEARCH_MAX_PAGE_SIZE']))
+
+    # Free-text searches are ranked by relevance unless newest is requested
+    sort = request.args.get('sort', 'relevance')
+    if sort not in SEARCH_SORTS:
+        sort = 'relevance'
+
+    # Fetch a single page using keyset pagination over (relevance score, id)
+    # or (upload_date, id). Cursors come from the previous page, so no
+    # OFFSET scan is ever needed.
+    # Repeated searches are served from the result cache (keyed by the
+    # normalized filters and the catalog generation) and hydrated in one query.
+    page = cached_search_page(
+        normalized_filters,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=per_page,
+        generation=generation,
+        sort=sort
+    )
+    results = page.items
+
+    # Typo-tolerant fallback: when the first page of an exact free-text
+    # search has few hits, add documents with similar titles/author names
+    similar_docs = []
+    if (normalized_filters.get('title') and not page.has_prev
+            and len(results) < current_app.config['FUZZY_MIN_RESULTS']):
+        similar_docs = fuzzy_search(
+            normalized_filters,
+            exclude_ids=[doc.id for doc in results],
+            limit=current_app.config['FUZZY_MAX_RESULTS']
+        )
+
+    # Document counts per institute/course/subject/category/tag for the
+    # filtered set (one grouped aggregate per facet, within a time budget)
+    facets = compute_facets(normalized_filters, generation=generation)
+
+    # Query string without cursors, used to build next/prev page links
+    page_args = {
+        key: value for key, value in request.args.items()
+        if key not in ('after', 'before')
+    }
 
     # ========================================================================
     # LOAD ADDITIONAL DATA FOR TEMPLATE
     # ========================================================================
     
     # Get recent documents for discovery section
-    recent_docs = get_recent_documents()
-    
-    # Load user's favorites if authenticated
-    user_favorites_docs = current_user.favorites.all() if current_user.is_authenticated else []
+    # (cached per worker; invalidated on upload and deletion)
+    recent_docs = get_cached_recent_documents()
 
-    # ========================================================================
-    # DEBUG LOGGING (DEVELOPMENT)
-    # ========================================================================
+    # Trending documents (time-decayed downloads/views/favorites)
+    trending_docs = [
+        doc for doc, _ in get_trending_documents(current_app.config['TRENDING_LIMIT'])
+    ]
     
-    # Debug information for development (remove in production)
-    print(f"DEBUG: User {current_user.id if current_user.is_authenticated else 'not authenticated'} favorites: {[doc.id for doc in user_favorites_docs]}")
+    user_favorites_docs = []
+    favorite_ids = set()
+    if current_user.is_authenticated:
+        # Star state of the cards shown on this page: one IN query on
+        # user_favorites, without loading the user's favorite documents
+        shown_ids = [doc.id for doc in (*results, *similar_docs, *trending_docs)]
+        favorite_ids = current_user.favorite_document_ids(shown_ids)
+
+        # A few favorites for the "Your Favorites" section
+        user_favorites_docs = load_listing(current_user.favorites).limit(
+            current_app.config['SEARCH_FAVORITES_PREVIEW']
+        ).all()
 
     # ========================================================================
     # RENDER TEMPLATE WITH ALL DATA
@@ -137,11 +205,20 @@ def search():
     
     return render_template(
         'view/search.html',
-        documents=results,              # Filtered search results
+        documents=results,              # Current page of filtered results
+        similar_documents=similar_docs, # Fuzzy matches for few exact hits
+        page=page,                      # Keyset pagination cursors
+        page_args=page_args,            # Filters to preserve in page links
         recent_documents=recent_docs,   # Recent documents for discovery
-        user_favorites_docs=user_favorites_docs,  # User's favorites
+        trending_documents=trending_docs,  # Currently trending documents
+        user_favorites_docs=user_favorites_docs,  # Preview of the user's favorites
+        favorites_preview=current_app.config['SEARCH_FAVORITES_PREVIEW'],  # Preview size for JS refresh
+        favorite_ids=favorite_ids,      # Favorited ids for membership checks
         filters=filters,                # Applied filters for form persistence
-        categories=categories           # Available categories for dropdown
+        sort=sort,                      # Result order for the sort selector
+        categories=categories,          # Available categories for dropdown
+        category_names={c.id: c.name for c in categories},  # Facet labels
+        facets=facets                   # Facet counts for refinement links
     )
 
 # ============================================================================
@@ -160,8 +237,10 @@ def download(doc_id):
     
     Features:
     - Document existence validation (404 if not found)
-    - Download counter increment for analytics
+    - Download counter increment for analytics, once per logical download
+      (resumed range requests and 304 revalidations are not counted)
     - Secure file serving from upload directory
+    - Byte ranges, strong ETag and conditional GET (see file_serving)
     - Forced download (as_attachment=True)
     - Database transaction handling
     
@@ -170,6 +249,7 @@ def download(doc_id):
         
     Returns:
         File response: Document file served as attachment for download
+        (200, 206 for range requests or 304 if unchanged)
         OR 404 error if document doesn't exist
         
     Security Notes:
@@ -180,18 +260,17 @@ def download(doc_id):
     # Validate document exists, return 404 if not found
     doc = Document.query.get_or_404(doc_id)
     
-    # Increment download counter for analytics
-    doc.downloads += 1
-    
-    # Save updated download count to database
+    # Serve file from configured upload folder as attachment (forces download)
+    response, counted = serve_document(doc, as_attachment=True)
+
+    # Save a newly computed content hash and size (no-op for most requests)
     db.session.commit()
 
-    # Serve file from configured upload folder as attachment (forces download)
-    return send_from_directory(
-        current_app.config['UPLOAD_FOLDER'],
-        doc.filename,
-        as_attachment=True  # Forces download instead of browser display
-    )
+    # Increment download counter for analytics (first request of a download only)
+    # Buffered and written in batches together with the trending event
+    if counted:
+        count_download(doc.id, user_id=current_user.id)
+    return response
 
 
 @bp.route('/preview/<int:doc_id>')
@@ -208,7 +287,9 @@ def preview(doc_id):
     - Document existence validation with custom error page
     - Inline file serving for browser preview
     - Custom 404 response for missing documents
-    - No download counter increment (preview only)
+    - Counts a view (views counter and trending score), not a download
+    - Byte ranges (including multi-range for PDF viewers), strong ETag
+      and conditional GET; only the first request of a preview is counted
     
     Args:
         doc_id (int): Unique identifier of the document to preview
@@ -250,16 +331,33 @@ def preview(doc_id):
         )
     
     # Serve file inline for preview (not as attachment)
-    return send_from_directory(
-        current_app.config['UPLOAD_FOLDER'],
-        doc.filename,
-        as_attachment=False  # Serve inline for preview in browser
-    )
+    response, counted = serve_document(doc, as_attachment=False)
+
+    # Save a newly computed content hash and size (no-op for most requests)
+    db.session.commit()
+
+    # Count the preview as a view for analytics and trending (buffered)
+    if counted:
+        count_view(doc.id, user_id=current_user.id)
+    return response
 
 # ============================================================================
 # FAVORITES MANAGEMENT ROUTES
 # ============================================================================
 
+def _require_document_id(doc_id):
+    """
+    Abort with 404 unless a document with the given id exists.
+
+    Only the primary key is selected, so no Document row is loaded.
+
+    Args:
+        doc_id (int): Document id to check
+    """
+    if db.session.query(Document.id).filter_by(id=doc_id).first() is None:
+        abort(404)
+
+
 @bp.route('/toggle_favorite/<int:doc_id>', methods=['POST'])
 @login_required
 def toggle_favorite(doc_id):
@@ -289,18 +387,19 @@ def toggle_favorite(doc_id):
     HTTP Method: POST (for state-changing operation)
     Access Control: Requires user authentication
     """
-    # Validate document exists, return 404 JSON if not found
-    document = Document.query.get_or_404(doc_id)
+    # Validate document exists, return 404 if not found
+    _require_document_id(doc_id)
     
-    # Check current favorite status and toggle accordingly
-    if document in current_user.favorites:
-        # Document is currently favorited - remove it
-        current_user.favorites.remove(document)
+    # Toggle with one indexed DELETE on user_favorites; if nothing was
+    # deleted the document was not favorited, so insert it instead
+    if current_user.remove_favorite(doc_id):
+        # Document was favorited - it has just been removed
         is_favorited = False
         message = "Document removed from favorites"
     else:
-        # Document is not favorited - add it
-        current_user.favorites.append(document)
+        # Document was not favorited - add it
+        if current_user.add_favorite(doc_id):
+            record_event(doc_id, 'favorite')
         is_favorited = True
         message = "Document added to favorites"
     
@@ -315,8 +414,58 @@ def toggle_favorite(doc_id):
     })
 
 
+@bp.route('/favorites/<int:doc_id>', methods=['PUT', 'DELETE'])
+@login_required
+def set_favorite(doc_id):
+    """
+    Idempotently add (PUT) or remove (DELETE) a document from favorites.
+
+    Unlike toggle_favorite, repeating the same request leaves the state
+    unchanged, so clients can safely retry after network errors.
+
+    Args:
+        doc_id (int): Unique identifier of the document
+
+    Returns:
+        JSON response containing:
+        - status: 'success'
+        - is_favorited: boolean indicating the resulting favorite status
+        - changed: boolean, False if the document was already in that state
+        - message: User-friendly status message
+
+    HTTP Methods:
+        PUT: Ensure the document is favorited
+        DELETE: Ensure the document is not favorited
+    Access Control: Requires user authentication
+    """
+    # Validate document exists, return 404 if not found
+    _require_document_id(doc_id)
+
+    if request.method == 'PUT':
+        changed = current_user.add_favorite(doc_id)
+        if changed:
+            record_event(doc_id, 'favorite')
+        is_favorited = True
+        message = "Document added to favorites" if changed else "Document already in favorites"
+    else:
+        changed = current_user.remove_favorite(doc_id)
+        is_favorited = False
+        message = "Document removed from favorites" if changed else "Document was not in favorites"
+
+    # Save changes to database
+    db.session.commit()
+
+    return jsonify({
+        'status': 'success',
+        'is_favorited': is_favorited,
+        'changed': changed,
+        'message': message
+    })
+
+
 @bp.route('/favorites')
 @login_required
+@enforce_query_budget
 def favorites():
     """
     Display user's favorited documents page.
@@ -334,16 +483,87 @@ def favorites():
         
     Access Control: Requires user authentication
     """
-    # Load all documents favorited by current user
-    user_favorites_docs = current_user.favorites.all()
+    # Load all documents favorited by current user (with card relationships)
+    user_favorites_docs = load_listing(current_user.favorites).all()
     
     # Render favorites template with user's favorite documents
     return render_template('view/favorites.html', favorites=user_favorites_docs)
 
+
+def _history_page():
+    """
+    Get the download history page selected by the request arguments.
+
+    Reads the after/before cursors and per_page (capped at
+    SEARCH_MAX_PAGE_SIZE) from the query string.
+
+    Returns:
+        KeysetPage: Page of the current user's downloaded documents
+    """
+    per_page = request.args.get(
+        'per_page', current_app.config['SEARCH_PAGE_SIZE'], type=int
+    )
+    per_page = max(1, min(per_page, current_app.config['SEARCH_MAX_PAGE_SIZE']))
+    return get_download_history(
+        current_user,
+        after=request.args.get('after') or None,
+        before=request.args.get('before') or None,
+        per_page=per_page
+    )
+
+
+@bp.route('/downloads')
+@login_required
+@enforce_query_budget
+def download_history():
+    """
+    Display the documents the current user has downloaded.
+
+    Newest first, one row per document (the first download counts), with
+    keyset pagination. Downloads are recorded in batches, so the most
+    recent ones can take up to COUNTER_FLUSH_INTERVAL_MS to appear.
+
+    URL Parameters (all optional):
+        after / before: Page cursors
+        per_page: Documents per page (capped at SEARCH_MAX_PAGE_SIZE)
+
+    Returns:
+        Rendered download history template
+
+    Access Control: Requires user authentication
+    """
+    return render_template('view/downloads.html', page=_history_page())
+
 # ============================================================================
 # API ENDPOINTS FOR AJAX OPERATIONS
 # ============================================================================
 
+@bp.route('/api/downloads')
+@login_required
+def api_download_history():
+    """
+    API endpoint returning one page of the user's download history.
+
+    URL Parameters (all optional):
+        after / before: Page cursors from a previous response
+        per_page: Documents per page (capped at SEARCH_MAX_PAGE_SIZE)
+
+    Returns:
+        JSON object containing:
+        - documents: Downloaded documents, newest download first
+        - next_cursor / prev_cursor: Cursors of the adjacent pages (or null)
+
+    Access Control: Requires user authentication
+    Content-Type: application/json
+    """
+    page = _history_page()
+    return jsonify({
+        'documents': documents_to_dicts(page.items),
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor
+    })
+
+
 @bp.route('/api/favorites')
 @login_required
 def api_favorites():
@@ -374,8 +594,11 @@ def api_favorites():
     Access Control: Requires user authentication
     Content-Type: application/json
     """
-    # Load user's favorite documents
-    user_favorites_docs = current_user.favorites.all()
+    # Load user's favorite documents with author and category eager-loaded
+    user_favorites_docs = load_listing(current_user.favorites).all()
+
+    # Unfolded counter shard increments of all favorites (one query)
+    Document.load_counter_totals(user_favorites_docs)
     
     # Convert documents to JSON-serializable format
     favorites_data = [
@@ -387,13 +610,278 @@ def api_favorites():
             'subject': doc.subject,
             'author': f"{doc.author.first_name} {doc.author.last_name}" if doc.author else "",
             'category': doc.category.name if doc.category else "",
-            'downloads': doc.downloads
+            'downloads': doc.total_downloads
         }
         for doc in user_favorites_docs
     ]
     
     return jsonify(favorites_data)
 
+# Maximum number of document ids accepted by the favorites state endpoint
+FAVORITES_STATE_MAX_IDS = 500
+
+
+@bp.route('/api/favorites/state')
+def api_favorites_state():
+    """
+    API endpoint reporting favorite status for a batch of document ids.
+
+    Pages can be rendered without per-user favorite state (and cached),
+    then hydrate every favorite button in a single round trip. The check
+    is one indexed IN query against user_favorites.
+
+    URL Parameters:
+        ids: Comma-separated document ids (at most FAVORITES_STATE_MAX_IDS)
+
+    Returns:
+        JSON object containing:
+        - authenticated: whether the request has a logged-in user
+        - favorites: mapping of each requested id (as string) to a boolean
+        400 error if more than FAVORITES_STATE_MAX_IDS ids are requested
+
+    Access Control: Public; anonymous users get all ids as not favorited
+    Content-Type: application/json
+    """
+    # Parse ids, ignoring anything that is not an integer
+    document_ids = []
+    for part in request.args.get('ids', '').split(','):
+        part = part.strip()
+        if part.isdigit():
+            document_ids.append(int(part))
+    document_ids = list(dict.fromkeys(document_ids))  # De-duplicate, keep order
+
+    if len(document_ids) > FAVORITES_STATE_MAX_IDS:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {FAVORITES_STATE_MAX_IDS} ids can be checked per request.'
+        }), 400
+
+    # Single IN query for authenticated users; nothing to check otherwise
+    favorited = set()
+    if current_user.is_authenticated and document_ids:
+        favorited = current_user.favorite_document_ids(document_ids)
+
+    response = jsonify({
+        'authenticated': current_user.is_authenticated,
+        'favorites': {str(doc_id): doc_id in favorited for doc_id in document_ids}
+    })
+    # Per-user data: never store in shared caches
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
+
+
+@bp.route('/api/autocomplete')
+def api_autocomplete():
+    """
+    API endpoint suggesting existing values for a search or upload field.
+
+    Answers from the in-memory prefix index without touching the database,
+    so it can be called on every keystroke.
+
+    URL Parameters:
+        field: One of institute, course, subject, tag
+        q: Text typed so far (case-insensitive prefix)
+        limit: Maximum number of suggestions (default 10, at most 20)
+
+    Returns:
+        JSON object containing:
+        - field: the requested field
+        - suggestions: list of {value, count}, most used values first
+        400 error for an unknown field
+
+    Access Control: Public
+    Content-Type: application/json
+    """
+    field = request.args.get('field', '')
+    if field not in AUTOCOMPLETE_FIELDS:
+        return jsonify({
+            'status': 'error',
+            'message': f"Unknown field. Use one of: {', '.join(AUTOCOMPLETE_FIELDS)}."
+        }), 400
+
+    limit = request.args.get('limit', 10, type=int)
+    limit = max(1, min(limit, PrefixIndex.MEMO_LIMIT))
+
+    suggestions = suggest(field, request.args.get('q', '').strip(), limit)
+    response = jsonify({
+        'field': field,
+        'suggestions': [
+            {'value': value, 'count': count} for value, count in suggestions
+        ]
+    })
+    # Same answer for every user; let browsers reuse it while typing
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
+@bp.route('/api/trending')
+def api_trending():
+    """
+    API endpoint listing the currently trending documents.
+
+    Reads the top rows of the trending rollup (one indexed read, see
+    app/view/trending.py).
+
+    URL Parameters:
+        limit: Number of documents (default TRENDING_LIMIT, at most 50)
+        fields: Comma-separated document fields to return
+
+    Returns:
+        JSON array of documents, most trending first, each with a
+        'trending_score' (current decayed score)
+
+    Access Control: Public
+    Content-Type: application/json
+    """
+    limit = request.args.get('limit', current_app.config['TRENDING_LIMIT'], type=int)
+    limit = max(1, min(limit, 50))
+    fields = parse_api_fields(request.args.get('fields'))
+
+    top = get_trending_documents(limit)
+    trending = documents_to_dicts((doc for doc, _ in top), fields)
+    for item, (_, score) in zip(trending, top):
+        item['trending_score'] = round(score, 3)
+
+    return jsonify(trending)
+
+
+@bp.route('/api/cache/stats')
+@login_required
+def api_cache_stats():
+    """
+    API endpoint reporting the cache statistics of this worker process.
+
+    Caches are process-local, so each worker reports its own counters;
+    the process id identifies which worker answered.
+
+    Returns:
+        JSON object containing:
+        - pid: id of the worker process
+        - caches: per cache size, maxsize, ttl, hits, misses and hit_rate
+        - counters: write-behind counter buffer (pending increments, flushes)
+
+    Access Control: Requires user authentication
+    Content-Type: application/json
+    """
+    response = jsonify({
+        'pid': os.getpid(),
+        'caches': cache_stats(),
+        'counters': counter_stats()
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+# Search types accepted by the `type` parameter of the search API
+# 'all' searches the full-text index; the others target a single filter
+API_SEARCH_TYPES = ('all', 'title', 'institute', 'course', 'subject', 'author')
+
+# Number of rows fetched from the database per round trip while streaming
+API_SEARCH_BATCH_SIZE = 200
+
+
+@bp.route('/api/search')
+def api_search():
+    """
+    API endpoint streaming search results as NDJSON or a JSON array.
+
+    This endpoint exposes the same filtering as the search page to
+    JavaScript clients. Results are loaded in batches with yield_per and
+    serialized one document at a time inside a streamed response, so large
+    result sets are never materialized in memory or encoded in one
+    blocking jsonify call.
+
+    URL Parameters (all optional):
+        q: Search text
+        type: How to apply q: 'all' (full-text, default), 'title',
+              'institute', 'course', 'subject' or 'author'
+        title, institute, course, subject, author, category, tag, min_rating:
+              Same filters as the search page
+        sort: 'relevance' (default; applies when there is search text),
+              'newest' or 'rating'
+        fields: Comma-separated fields to return (e.g. "id,title")
+        format: 'ndjson' (default, one JSON object per line) or 'json'
+                (a single JSON array, streamed in chunks)
+        limit: Maximum number of results
+
+    Returns:
+        Streamed response with documents ordered by relevance for
+        full-text searches, by rating for sort=rating, newest first
+        otherwise:
+        - application/x-ndjson for format=ndjson
+        - application/json for format=json
+
+    Content-Type: application/x-ndjson or application/json
+    """
+    # Collect filters, mapping q onto the filter selected by `type`
+    filters = get_search_filters(request.args)
+    query_text = request.args.get('q', '').strip()
+    search_type = request.args.get('type', 'all')
+    if search_type not in API_SEARCH_TYPES:
+        search_type = 'all'
+    if query_text:
+        filters['title' if search_type == 'all' else search_type] = query_text
+
+    fields = parse_api_fields(request.args.get('fields'))
+    output_format = request.args.get('format', 'ndjson')
+    limit = request.args.get('limit', type=int)
+
+    # Build filtered query in a stable order: BM25 relevance computed by
+    # the full-text engine (top-k taken there through the LIMIT), or newest
+    # first. Only the many-to-one relationships the selected fields need
+    # are eager loaded.
+    ranked = None
+    if request.args.get('sort', 'relevance') == 'relevance' and filters.get('title'):
+        other_filters = {name: value for name, value in filters.items() if name != 'title'}
+        ranked = relevance_ranked(build_search_query(other_filters), filters['title'])
+    if ranked is not None:
+        docs_query, score = ranked
+        docs_query = docs_query.order_by(score.desc(), Document.id.desc())
+    elif request.args.get('sort') == 'rating':
+        docs_query = build_search_query(filters).order_by(
+            Document.rating_score.desc(), Document.id.desc()
+        )
+    else:
+        docs_query = build_search_query(filters).order_by(
+            Document.upload_date.desc(), Document.id.desc()
+        )
+    if 'author' in fields:
+        docs_query = docs_query.options(joinedload(Document.author))
+    if 'category' in fields:
+        docs_query = docs_query.options(joinedload(Document.category))
+    if limit is not None and limit > 0:
+        docs_query = docs_query.limit(limit)
+
+    def serialized_documents():
+        # Serialize batch by batch, so counter totals cost one query per batch
+        rows = iter(docs_query.yield_per(API_SEARCH_BATCH_SIZE))
+        for batch in iter(lambda: list(islice(rows, API_SEARCH_BATCH_SIZE)), []):
+            yield from documents_to_dicts(batch, fields)
+
+    def generate_ndjson():
+        # One JSON document per line, flushed as rows are fetched
+        for item in serialized_documents():
+            yield json.dumps(item) + '\n'
+
+    def generate_json_array():
+        # Same rows, wrapped in a JSON array for clients expecting json()
+        yield '['
+        separator = ''
+        for item in serialized_documents():
+            yield separator + json.dumps(item)
+            separator = ','
+        yield ']'
+
+    if output_format == 'json':
+        return Response(
+            stream_with_context(generate_json_array()),
+            mimetype='application/json'
+        )
+    return Response(
+        stream_with_context(generate_ndjson()),
+        mimetype='application/x-ndjson'
+    )
+
 # ============================================================================
 # DOCUMENT MANAGEMENT ROUTES
 # ============================================================================
@@ -410,7 +898,7 @@ def delete_document(doc_id):
     Features:
     - Document existence validation
     - Owner authorization checking
-    - Physical file deletion from filesystem
+    - Stored file released (unlinked with its last reference)
     - Database record cleanup
     - Transaction rollback on errors
     - JSON response for AJAX integration
@@ -448,22 +936,15 @@ def delete_document(doc_id):
         }), 403
     
     try:
-        # ====================================================================
-        # PHYSICAL FILE DELETION
-        # ====================================================================
-        
-        # Construct full path to the document file
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], doc.filename)
-        
-        # Delete physical file if it exists
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
         # ====================================================================
         # DATABASE RECORD DELETION
         # ====================================================================
         
-        # Delete document record from database
+        # Delete document record, updating the search index, facet counts
+        # and catalog generation so cached searches are invalidated.
+        # This also releases the stored file: it is unlinked after the
+        # commit, and only when no other document shares its content
+        document_deleted(doc)
         db.session.delete(doc)
         db.session.commit()
         
@@ -483,6 +964,7 @@ def delete_document(doc_id):
 
 @bp.route('/uploaded_documents')
 @login_required
+@enforce_query_budget
 def uploaded_documents():
     """
     Display all documents uploaded by the current user.
@@ -504,9 +986,30 @@ def uploaded_documents():
     
     Template Context:
         uploads: List of all documents uploaded by current user
+        favorite_ids: Set of ids of the user's favorited documents
+        unique_viewers: Document id -> estimated distinct viewers
+        job_states: Document id -> 'processing' or 'failed' background jobs
     """
-    # Load all documents uploaded by current user
-    user_uploads = current_user.documents.all()
+    # Load all documents uploaded by current user (with card relationships)
+    user_uploads = load_listing(current_user.documents).all()
+
+    # Favorited document ids for constant-time star state per card
+    favorite_ids = current_user.favorite_document_ids()
+
+    # Estimated distinct viewers per document (one query for all sketches)
+    unique_viewers = ViewerSketch.unique_viewers(doc.id for doc in user_uploads)
+
+    # Post-upload processing still pending or failed (one query for all jobs)
+    job_states = Job.document_states(doc.id for doc in user_uploads)
+
+    # Unfolded counter shard increments of all uploads (one query)
+    Document.load_counter_totals(user_uploads)
     
     # Render uploaded documents template
-    return render_template('view/uploaded.html', uploads=user_uploads)
\ No newline at end of file
+    return render_template(
+        'view/uploaded.html',
+        uploads=user_uploads,
+        favorite_ids=favorite_ids,
+        unique_viewers=unique_viewers,
+        job_states=job_states
+    )
\ No newline at end of file
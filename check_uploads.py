@@ -34,7 +34,8 @@ License: MIT
 
 import os  # Operating system interface for file operations
 from app import create_app, db  # Flask application factory and database
-from app.models import Document  # Document model for database operations
+from app.models import Document  # Database models
+from app.view.catalog import document_deleted  # Keep search structures in sync
 
 # =============================================================================
 # UPLOAD VALIDATION LOGIC
@@ -94,7 +95,9 @@ def validate_uploads():
                 missing_files.append((doc.id, doc.title, doc.filename))
                 print(f"❌ [MISSING] ID: {doc.id} | Title: {doc.title} | File: {doc.filename}")
                 
-                # Remove orphaned database record
+                # Remove orphaned database record, its search index entry
+                # and facet counts
+                document_deleted(doc)
                 db.session.delete(doc)
             else:
                 print(f"✅ [EXISTS] ID: {doc.id} | Title: {doc.title} | File: {doc.filename}")
@@ -65,6 +65,9 @@ class Config:
         SQLALCHEMY_TRACK_MODIFICATIONS: SQLAlchemy event tracking (disabled for performance)
         UPLOAD_FOLDER: Directory path for user-uploaded files
         MAX_CONTENT_LENGTH: Maximum file upload size in bytes
+        UPLOAD_CHUNK_SIZE / UPLOAD_MAX_FILE_SIZE: Limits of resumable chunked uploads
+        FILE_OFFLOAD: Hand document files to the front proxy (X-Accel-Redirect/X-Sendfile)
+        SEARCH_PAGE_SIZE: Default number of search results per page
         MAIL_*: SMTP configuration for email functionality
     """
     
@@ -104,7 +107,104 @@ class Config:
     # Maximum file upload size: 16 MB
     # This prevents abuse and ensures reasonable server resource usage
     # Users trying to upload larger files will receive a clear error message
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB in bytes    # =============================================================================
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB in bytes
+
+    # Resumable chunked uploads (upload.chunked_* routes)
+    # Each chunk is its own request, so files may exceed MAX_CONTENT_LENGTH;
+    # sessions idle for longer than the TTL are garbage collected
+    UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024                                    # Max bytes per chunk
+    UPLOAD_MAX_FILE_SIZE = int(os.environ.get('UPLOAD_MAX_FILE_SIZE') or 512 * 1024 * 1024)
+    UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL') or 24 * 3600)  # Seconds
+    UPLOAD_GC_INTERVAL = 3600  # Seconds between collections by the job worker (0 = never)
+
+    # Background post-upload processing (`flask jobs worker`, app/jobs.py)
+    # Jobs queued for every new document; failed attempts are retried after
+    # JOBS_RETRY_BASE * 2^(attempt - 1) seconds, capped at JOBS_RETRY_MAX
+    JOBS_ON_UPLOAD = ['page_count']
+    JOBS_PROCESSES = int(os.environ.get('JOBS_PROCESSES') or os.cpu_count() or 2)  # Pool size
+    JOBS_POLL_INTERVAL = 1.0          # Seconds between queue polls when idle
+    JOBS_MAX_ATTEMPTS = 5
+    JOBS_RETRY_BASE = 30              # Seconds
+    JOBS_RETRY_MAX = 3600             # Seconds
+    JOBS_LEASE = 600                  # Running jobs of a dead worker are requeued after this
+    JOBS_KEEP_DONE = 7 * 24 * 3600    # Finished jobs are kept this long for inspection
+
+    # Document file offload to the front proxy
+    # None streams files from the Python worker (development default)
+    # 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache mod_xsendfile,
+    # lighttpd): Flask only authenticates and counts, the proxy sends the bytes
+    FILE_OFFLOAD = os.environ.get('FILE_OFFLOAD') or None
+
+    # Internal nginx location that maps onto UPLOAD_FOLDER (x-accel-redirect only)
+    FILE_OFFLOAD_PREFIX = os.environ.get('FILE_OFFLOAD_PREFIX') or '/protected-uploads/'
+
+    # =============================================================================
+    # SEARCH CONFIGURATION
+    # =============================================================================
+
+    # Number of documents shown per search results page
+    # Pages use keyset (cursor) pagination, so deep pages stay as fast as the first
+    SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE') or 20)
+
+    # Upper bound for the per_page query parameter
+    SEARCH_MAX_PAGE_SIZE = 100
+
+    # Favorites previewed in the "Your Favorites" section of the search page
+    # (the full list is on the favorites page)
+    SEARCH_FAVORITES_PREVIEW = 6
+
+    # Search result cache (per worker process)
+    # Pages of result ids are cached per normalized filter combination and
+    # invalidated by the catalog generation on upload/delete/metadata edits
+    SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE') or 512)  # Max cached pages
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL') or 300)    # Seconds
+
+    # Category list and recent documents shown on listing pages
+    # Invalidated in the worker that changes them; other workers refresh
+    # when their entries expire
+    REFERENCE_CACHE_TTL = int(os.environ.get('REFERENCE_CACHE_TTL') or 60)  # Seconds
+
+    # Facet counts shown next to the search filters
+    # Facets not computed within the time budget are reported as incomplete
+    FACET_VALUES_LIMIT = 10                                                       # Values per facet
+    FACET_TIME_BUDGET_MS = int(os.environ.get('FACET_TIME_BUDGET_MS') or 200)     # Per request
+
+    # Typo-tolerant fallback shown when an exact search finds few documents
+    FUZZY_MIN_RESULTS = 3                 # Exact hits below which the fallback runs
+    FUZZY_MAX_RESULTS = 10                # Similar documents shown
+    FUZZY_SIMILARITY_THRESHOLD = 0.3      # Minimum trigram similarity (0-1)
+
+    # Trending documents: exponentially time-decayed activity scores
+    TRENDING_WEIGHTS = {'download': 3.0, 'view': 1.0, 'favorite': 5.0}
+    TRENDING_HALF_LIFE_HOURS = 72          # Score halves after 3 days without activity
+    TRENDING_MIN_SCORE = 0.05              # Rows below this are pruned on compaction
+    TRENDING_COMPACT_AFTER_HOURS = 24 * 7  # Automatic compaction interval
+    TRENDING_LIMIT = 6                     # Documents shown on the search page
+
+    # In-memory autocomplete index of institute/course/subject/tag values
+    # Updated in place on upload; rebuilt after this many seconds so that
+    # uploads handled by other worker processes are picked up
+    AUTOCOMPLETE_REFRESH = int(os.environ.get('AUTOCOMPLETE_REFRESH') or 600)  # Seconds
+
+    # Write-behind download/view counters (per worker process)
+    # Increments are flushed in one batched UPDATE every interval or once
+    # this many are pending; a hard crash loses at most that window
+    COUNTER_FLUSH_INTERVAL_MS = int(os.environ.get('COUNTER_FLUSH_INTERVAL_MS') or 1000)
+    COUNTER_FLUSH_EVENTS = int(os.environ.get('COUNTER_FLUSH_EVENTS') or 200)
+
+    # Optional counter sharding for hot documents (0 disables it)
+    # Flushes add to one of N rows per document, picked per worker; shards
+    # are folded into the document counters every COUNTER_FOLD_INTERVAL
+    # seconds by each worker and by `flask counters fold`
+    COUNTER_SHARDS = int(os.environ.get('COUNTER_SHARDS') or 0)
+    COUNTER_FOLD_INTERVAL = int(os.environ.get('COUNTER_FOLD_INTERVAL') or 60)  # Seconds
+
+    # Maximum SQL queries a document listing page may issue
+    # None disables the check; TestingConfig enables it so that N+1 query
+    # regressions on listing pages fail the request with an AssertionError
+    LISTING_MAX_QUERIES = None
+
+    # =============================================================================
     # EMAIL CONFIGURATION (OPTIONAL)
     # =============================================================================
     
@@ -144,6 +244,13 @@ class Config:
         export MAIL_USERNAME="your-email@gmail.com"
         export MAIL_PASSWORD="your-app-password"
     
+    Serving documents through nginx (FILE_OFFLOAD="x-accel-redirect"):
+        location /protected-uploads/ {
+            internal;                       # Only reachable via X-Accel-Redirect
+            alias /path/to/studyhub/uploads/;
+            etag off;                       # Flask sends the content-hash ETag
+        }
+    
     File Permissions:
         - Ensure the uploads/ directory is writable by the web server
         - Set appropriate permissions: chmod 755 uploads/
@@ -155,4 +262,39 @@ class Config:
         - Implement rate limiting for file uploads
         - Validate all uploaded files before processing
         - Consider using cloud storage for uploaded files in production
-    """
\ No newline at end of file
+    """
+
+
+# =============================================================================
+# TESTING CONFIGURATION
+# =============================================================================
+
+class TestingConfig(Config):
+    """
+    Configuration for automated tests.
+
+    Uses an in-memory SQLite database, disables CSRF so forms can be
+    posted directly, writes usage counters through immediately, and
+    enables the listing query budget so that N+1 query regressions on
+    document listing pages fail loudly.
+
+    Usage:
+        app = create_app('config.TestingConfig')
+    """
+
+    TESTING = True
+
+    # Fresh in-memory database for every application instance
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+    # Allow tests to post forms without CSRF tokens
+    WTF_CSRF_ENABLED = False
+
+    # Write counters through immediately so tests see them without waiting
+    COUNTER_FLUSH_INTERVAL_MS = 0
+
+    # Listing pages (search, favorites, uploads, profile) must render
+    # with a fixed number of queries, independent of the number of documents
+    # (the search page worst case: results, five facets, fuzzy fallback,
+    # favorite stars and the favorites preview)
+    LISTING_MAX_QUERIES = 17
@@ -262,6 +262,73 @@ function handleAvatarError(img) {
     return true;
 }
 
+// Favorite State Hydration
+// Fetches the favorite state of every favorite button on the page with batched
+// requests to /view/api/favorites/state, so pages do not need per-user markup
+function fetchFavoriteStates() {
+    const buttons = document.querySelectorAll('.favorite-button, .add-to-favorites-button'); // All favorite buttons
+    const ids = Array.from(new Set(Array.from(buttons, button => button.dataset.docId))); // Unique document IDs
+    const batchSize = 200; // Stay below the server limit per request
+    const requests = [];
+
+    for (let i = 0; i < ids.length; i += batchSize) {
+        const batch = ids.slice(i, i + batchSize).join(',');
+        requests.push(
+            fetch(`/view/api/favorites/state?ids=${batch}`)
+                .then(response => response.json())
+                .then(data => data.favorites)
+        );
+    }
+
+    // Merge all batches into one {docId: isFavorited} map
+    return Promise.all(requests).then(results => Object.assign({}, ...results));
+}
+
+// Field Autocomplete
+// Attaches a suggestion list to every input with a data-autocomplete attribute
+// (institute, course, subject or tag), filled from /view/api/autocomplete.
+// Inputs with data-autocomplete-multiple hold comma-separated values and only
+// the value being typed (after the last comma) is completed.
+function initAutocomplete() {
+    document.querySelectorAll('input[data-autocomplete]').forEach(function(input) {
+        const field = input.dataset.autocomplete; // Field to complete
+        const multiple = input.hasAttribute('data-autocomplete-multiple');
+        const datalist = document.createElement('datalist'); // Native suggestion dropdown
+        datalist.id = `${input.name || field}-autocomplete`;
+        input.after(datalist);
+        input.setAttribute('list', datalist.id);
+        input.setAttribute('autocomplete', 'off'); // Hide browser history suggestions
+
+        let timer = null;
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(function() { // Short debounce while typing
+                const parts = input.value.split(',');
+                const prefix = multiple ? parts.pop().trim() : input.value.trim();
+                const head = multiple && parts.length ? parts.join(',') + ', ' : '';
+                if (!prefix) {
+                    datalist.innerHTML = '';
+                    return;
+                }
+                fetch(`/view/api/autocomplete?field=${field}&q=${encodeURIComponent(prefix)}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        datalist.innerHTML = '';
+                        (data.suggestions || []).forEach(function(suggestion) {
+                            const option = document.createElement('option');
+                            option.value = head + suggestion.value;
+                            option.label = `${suggestion.value} (${suggestion.count})`;
+                            datalist.appendChild(option);
+                        });
+                    })
+                    .catch(error => console.error('Autocomplete error:', error));
+            }, 100);
+        });
+    });
+}
+
+document.addEventListener('DOMContentLoaded', initAutocomplete);
+
 // Initialize any counters with data attributes
 document.addEventListener('DOMContentLoaded', function() {
     var counters = document.querySelectorAll('[data-counter]');
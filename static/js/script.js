@@ -182,22 +182,19 @@ if (searchForm) {
                 searchResults.innerHTML = '<div class="loading">Searching...</div>'; // Show loading message
             }
             
-            // Make API call to search endpoint
-            const response = await fetch(`/api/search?q=${encodeURIComponent(searchQuery)}&type=${searchType}`);
+            // Make API call to search endpoint (JSON array format for response.json())
+            const response = await fetch(`/view/api/search?q=${encodeURIComponent(searchQuery)}&type=${searchType}&format=json&fields=id,title,author,course,category,upload_date&limit=50`);
             const results = await response.json(); // Parse JSON response
             
-            // Simulate API call delay for demonstration
-            await new Promise(resolve => setTimeout(resolve, 1000)); // Add delay for UX
-            
             // Display search results in the results container
             if (searchResults) {
                 searchResults.innerHTML = `
                     <div class="search-meta">
                         <p>Showing results for: <strong>${searchQuery}</strong></p>
-                        <p class="text-muted">5 documents found</p>
+                        <p class="text-muted">${results.length} documents found</p>
                     </div>
                     <div class="document-grid">
-                        ${generateMockDocuments()}
+                        ${generateDocumentCards(results)}
                     </div>
                 `; // Display search results and metadata
             }
@@ -208,55 +205,11 @@ if (searchForm) {
     });
 }
 
-// Mock Document Generator
-// Creates sample document data for search results demonstration
-function generateMockDocuments() {
-    // Sample document data for testing and demonstration
-    const mockDocs = [
-        {
-            title: 'Introduction to Computer Science', // Document title
-            author: 'Prof. John Smith', // Document author
-            course: 'CS101', // Associated course code
-            type: 'Lecture Notes', // Document type/category
-            date: '2023-10-15', // Publication date
-            pages: 24 // Number of pages
-        },
-        {
-            title: 'Algorithms and Data Structures', // Document title
-            author: 'Dr. Sarah Johnson', // Document author
-            course: 'CS201', // Associated course code
-            type: 'Textbook', // Document type/category
-            date: '2023-09-28', // Publication date
-            pages: 156 // Number of pages
-        },
-        {
-            title: 'Web Development Fundamentals', // Document title
-            author: 'Prof. Michael Brown', // Document author
-            course: 'WEB101', // Associated course code
-            type: 'Slides', // Document type/category
-            date: '2023-11-02', // Publication date
-            pages: 42 // Number of pages
-        },
-        {
-            title: 'Database Systems', // Document title
-            author: 'Dr. Emily Davis', // Document author
-            course: 'CS301', // Associated course code
-            type: 'Study Guide', // Document type/category
-            date: '2023-10-10', // Publication date
-            pages: 87 // Number of pages
-        },
-        {
-            title: 'Artificial Intelligence Basics', // Document title
-            author: 'Prof. Robert Wilson', // Document author
-            course: 'CS401', // Associated course code
-            type: 'Research Paper', // Document type/category
-            date: '2023-09-15', // Publication date
-            pages: 12 // Number of pages
-        }
-    ];
-    
+// Document Card Generator
+// Creates document cards from search API results
+function generateDocumentCards(docs) {
     // Generate HTML for each document card
-    return mockDocs.map(doc => `
+    return docs.map(doc => `
         <div class="document-card">
             <div class="document-icon">
                 <i class="fas fa-file-alt"></i>
@@ -265,17 +218,15 @@ function generateMockDocuments() {
                 <h4>${doc.title}</h4>
                 <p class="document-meta">
                     <span><i class="fas fa-user"></i> ${doc.author}</span>
-                    <span><i class="fas fa-book"></i> ${doc.course}</span>
-                    <span><i class="fas fa-tag"></i> ${doc.type}</span>
+                    <span><i class="fas fa-book"></i> ${doc.course || ''}</span>
+                    <span><i class="fas fa-tag"></i> ${doc.category}</span>
                 </p>
                 <p class="document-info">
-                    <span><i class="far fa-calendar"></i> ${doc.date}</span>
-                    <span><i class="far fa-file"></i> ${doc.pages} pages</span>
+                    <span><i class="far fa-calendar"></i> ${(doc.upload_date || '').slice(0, 10)}</span>
                 </p>
                 <div class="document-actions">
-                    <button class="btn btn-outline btn-sm"><i class="far fa-eye"></i> Preview</button>
-                    <button class="btn btn-primary btn-sm"><i class="fas fa-download"></i> Download</button>
-                    <button class="btn btn-icon" title="Save for later"><i class="far fa-bookmark"></i></button>
+                    <a class="btn btn-outline btn-sm" href="/view/preview/${doc.id}"><i class="far fa-eye"></i> Preview</a>
+                    <a class="btn btn-primary btn-sm" href="/view/download/${doc.id}"><i class="fas fa-download"></i> Download</a>
                 </div>
             </div>
         </div>
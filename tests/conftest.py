@@ -0,0 +1,60 @@
+"""
+tests/conftest.py - Shared Test Fixtures
+
+Every test gets a fresh application created with config.TestingConfig
+(in-memory SQLite database, CSRF disabled, listing query budget enabled)
+and the schema created by db.create_all().
+
+Fixtures:
+- app: Application with an active application context and an empty database
+- client: Test client of the application
+- user: Registered user the client can log in as
+- login: Log the test client in as a user
+"""
+
+# Import testing framework
+import pytest
+
+# Import application components
+from app import create_app, db
+from app.models import User
+
+# Password of the users created by the fixtures
+PASSWORD = 'password123'
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Application with a fresh database, inside an application context."""
+    app = create_app('config.TestingConfig')
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    """Test client of the application."""
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    """Registered user (the client is not logged in)."""
+    user = User(first_name='Ada', last_name='Lovelace', email='ada@example.com')
+    user.set_password(PASSWORD)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def login(client):
+    """Log the test client in as the given user."""
+    def login(user):
+        response = client.post('/auth/login', data={'email': user.email, 'password': PASSWORD})
+        assert response.status_code == 302
+    return login
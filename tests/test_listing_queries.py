@@ -0,0 +1,141 @@
+"""
+tests/test_listing_queries.py - Query Budget of the Document Listing Pages
+
+The document listing pages must render with a fixed number of SQL
+queries, however many documents they show. TestingConfig sets
+LISTING_MAX_QUERIES, so every request to a listing page fails with an
+AssertionError when it exceeds the budget (enforce_query_budget), and the
+tests below also check that the number of queries does not grow with the
+number of listed documents (no N+1 lazy loads while rendering the cards).
+"""
+
+# Import testing framework
+import pytest
+
+# Import Flask helpers
+from flask import url_for
+
+# Import application components
+from app import db
+from app.models import User, Document, Category, Tag
+from app.view.catalog import document_created
+from app.view.utils import QueryCounter, assert_max_queries
+
+# Listing pages guarded by the query budget: (endpoint, query string)
+LISTING_PAGES = [
+    ('view.search', {}),
+    ('view.search', {'title': 'thermodynamics'}),
+    ('view.search', {'title': 'thermodinamics'}),  # No exact hits: fuzzy fallback
+    ('view.search', {'sort': 'rating'}),
+    ('view.favorites', {}),
+    ('view.uploaded_documents', {}),
+    ('auth.profile', {}),
+]
+
+# Number of documents in the catalog at each measurement; free-text
+# searches always have enough hits to skip the fuzzy fallback query
+CATALOG_SIZES = (5, 15, 40)
+
+
+def seed_documents(user, count):
+    """
+    Add documents with authors, categories, tags, favorites and ratings.
+
+    Every document has its own author (every other one the logged-in
+    user, so they also appear on the uploads and profile pages), its own
+    category and two tags, so a listing that lazy-loads any of them
+    issues more queries as documents are added. The user favorites two
+    documents out of three, by both kinds of authors, and every third
+    document is rated.
+
+    Args:
+        user (User): Logged-in user
+        count (int): Number of documents to add
+    """
+    exam_tag = Tag.query.filter_by(name='exam').first() or Tag(name='exam')
+    start = Document.query.count()
+    for number in range(start, start + count):
+        author = user
+        if number % 2:
+            author = User(first_name=f'Author{number}', last_name='Test',
+                          email=f'author{number}@example.com')
+            author.set_password('password123')
+            db.session.add(author)
+
+        doc = Document(
+            title=f'Thermodynamics notes {number}',
+            filename=f'notes{number}.pdf',
+            original_filename=f'notes{number}.pdf',
+            file_type='pdf',
+            institute='Politecnico',
+            course='Physics I',
+            subject='Thermodynamics',
+            author=author,
+            category=Category(name=f'Category {number}'),
+        )
+        doc.tags.append(exam_tag)
+        doc.tags.append(Tag(name=f'chapter{number}'))
+        db.session.add(doc)
+        document_created(doc)
+        if number % 3:
+            user.favorites.append(doc)
+    db.session.commit()
+
+    for doc in Document.query.filter(Document.id > start).all():
+        if doc.id % 3 == 0:
+            doc.add_rating(4.0)
+
+
+def page_url(app, endpoint, args):
+    """Build the URL of a listing page outside of a request."""
+    with app.test_request_context():
+        return url_for(endpoint, **args)
+
+
+def count_queries(client, url):
+    """
+    Request a listing page and count its SQL queries.
+
+    The page is requested twice so that per-worker caches (categories,
+    recent documents, search results) are in the same state at every
+    catalog size; the second request is counted.
+
+    Returns:
+        int: Number of queries issued by the second request
+    """
+    assert client.get(url).status_code == 200
+    with QueryCounter() as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return counter.count
+
+
+@pytest.mark.parametrize('endpoint, args', LISTING_PAGES)
+def test_listing_query_budget(app, client, user, login, endpoint, args):
+    """Listing pages stay within LISTING_MAX_QUERIES as the catalog grows."""
+    login(user)
+    url = page_url(app, endpoint, args)
+    limit = app.config['LISTING_MAX_QUERIES']
+    counts = []
+    for size in CATALOG_SIZES:
+        seed_documents(user, size - Document.query.count())
+
+        # First request after the catalog changed: caches are cold
+        with assert_max_queries(limit):
+            assert client.get(url).status_code == 200
+
+        counts.append(count_queries(client, url))
+
+    assert counts == [counts[0]] * len(counts), (
+        f'Query count of {endpoint} grows with the number of documents: '
+        f'{dict(zip(CATALOG_SIZES, counts))}'
+    )
+
+
+def test_query_budget_is_enforced(app, client, user, login):
+    """A listing page exceeding the budget fails instead of rendering."""
+    login(user)
+    seed_documents(user, 3)
+    app.config['LISTING_MAX_QUERIES'] = 1
+    with pytest.raises(AssertionError, match='Expected at most 1 queries'):
+        client.get(page_url(app, 'view.favorites', {}))